@@ -0,0 +1,147 @@
+"""Per-extractor timings and allocations over fixture and synthetic pages.
+
+    python benchmarks/bench_extractors.py [--repeat 50] [--budget 1.0] [--only amazon]
+    python benchmarks/bench_extractors.py --save      # write a baseline
+    python benchmarks/bench_extractors.py --compare   # fail on regressions
+
+Every extractor gets a fresh ParsedDocument per call, so the numbers
+include parsing, as in production. Reports ops/sec, p50/p99 and the
+tracemalloc peak of one call. Baselines are JSON; --compare exits 1 when
+any p50 is more than --tolerance slower than the saved one. No network
+access.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+# product_analyzer exits at import time without API_KEY
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("ENABLE_PLAYWRIGHT", "false")
+
+import product_analyzer as pa  # noqa: E402
+import synthetic_pages  # noqa: E402
+
+FIXTURES = ROOT / "tests" / "fixtures"
+BASELINE = Path(__file__).resolve().parent / "baselines" / "extractors.json"
+
+AE_KEYS = ["priceModule", "imageModule", "specsModule", "titleModule"]
+
+
+def _doc(url, html):
+    return pa.ParsedDocument(html, url)
+
+
+EXTRACTORS = {
+    # Raw HTML, as the partial path passes it (strained head scan)
+    "quick_parse_head": lambda url, html: pa.quick_parse_head(html),
+    "_parse_aliexpress": lambda url, html: pa._parse_aliexpress(_doc(url, html)),
+    "_extract_json_from_scripts": lambda url, html: pa._extract_json_from_scripts(_doc(url, html), AE_KEYS),
+    "_parse_jsonld_product": lambda url, html: pa.SCRAPER._parse_jsonld_product(_doc(url, html)),
+    "price_chain": lambda url, html: price_chain(url, _doc(url, html)),
+    "parse_product_static": lambda url, html: pa.parse_product_static(html, url),
+}
+
+
+def price_chain(url, doc):
+    """The details job's static tier order, without short-circuiting."""
+    domain = pa.urlparse(url).netloc
+    return [
+        pa.PriceExtractor.from_jsonld(doc),
+        pa.PriceExtractor.from_meta(doc),
+        pa.PriceExtractor.site_specific(domain, doc),
+        pa.PriceExtractor.from_dom_html(doc),
+        pa.PriceExtractor.from_inline_json(doc),
+        pa.PriceExtractor.generic_regex(doc),
+    ]
+
+
+def load_pages():
+    pages = {}
+    for path in sorted(FIXTURES.glob("*.html")):
+        url = "https://www.aliexpress.com/item/1.html" if "aliexpress" in path.stem else "https://shop.example.org/p/1"
+        pages[f"fixture {path.stem}"] = (url, path.read_text(encoding="utf-8"))
+    pages.update(synthetic_pages.pages())
+    return pages
+
+
+def measure(fn, url, html, repeat, budget_s):
+    fn(url, html)  # warm-up
+    times = []
+    deadline = time.perf_counter() + budget_s
+    # At least 3 samples; slow cells stop at the time budget
+    while len(times) < repeat and (len(times) < 3 or time.perf_counter() < deadline):
+        t0 = time.perf_counter()
+        fn(url, html)
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(url, html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "ops_per_s": round(len(times) / sum(times), 1),
+        "p50_ms": round(statistics.median(times) * 1000, 3),
+        "p99_ms": round(times[min(len(times) - 1, int(len(times) * 0.99))] * 1000, 3),
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, row in results.items():
+        old = baseline.get(key)
+        if old and row["p50_ms"] > old["p50_ms"] * (1 + tolerance) and row["p50_ms"] - old["p50_ms"] > 0.05:
+            regressions.append(f"{key}: p50 {old['p50_ms']}ms -> {row['p50_ms']}ms")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--budget", type=float, default=1.0, help="max seconds per page/extractor cell")
+    ap.add_argument("--only", default="", help="substring filter on page or extractor name")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save", action="store_true", help="write results to --baseline")
+    ap.add_argument("--compare", action="store_true", help="compare against --baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    args = ap.parse_args()
+    logging.disable(logging.CRITICAL)  # extractors log every hit at INFO
+
+    results = {}
+    print(f"{'page':<34}{'extractor':<28}{'ops/s':>10}{'p50':>10}{'p99':>10}{'peak':>11}")
+    for page, (url, html) in load_pages().items():
+        for name, fn in EXTRACTORS.items():
+            if args.only and args.only not in page and args.only not in name:
+                continue
+            row = measure(fn, url, html, args.repeat, args.budget)
+            results[f"{page} | {name}"] = row
+            print(f"{page:<34}{name:<28}{row['ops_per_s']:>10}{row['p50_ms']:>8.2f}ms"
+                  f"{row['p99_ms']:>8.2f}ms{row['peak_alloc_kb']:>9.0f}KB")
+
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+    if args.save:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"python": sys.version.split()[0], "parser_backend": pa.PARSER_BACKEND,
+                   "extractor_version": pa.EXTRACTOR_VERSION, "repeat": args.repeat, "results": results}
+        args.baseline.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+        print(f"saved {len(results)} rows to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
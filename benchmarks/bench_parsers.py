@@ -0,0 +1,68 @@
+"""Compare ParsedDocument backends on the head/meta/JSON-LD hot path.
+
+    python benchmarks/bench_parsers.py [--repeat 200]
+
+Runs quick_parse_head plus the JSON-LD and meta price tiers on each
+fixture in tests/fixtures, and on the same fixtures padded to ~500 KB of
+body markup (closer to a real product page). No network access.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# product_analyzer exits at import time without API_KEY
+os.environ.setdefault("API_KEY", "bench")
+os.environ.setdefault("ENABLE_PLAYWRIGHT", "false")
+
+import product_analyzer as pa  # noqa: E402
+
+FIXTURES = ROOT / "tests" / "fixtures"
+BACKENDS = ("lxml", "bs4", "strained")
+
+
+def padded(html: str, size: int = 500_000) -> str:
+    filler = '<div class="item"><span>lorem ipsum dolor</span><img src="/x.jpg"></div>\n'
+    body = filler * (size // len(filler))
+    return html.replace("</body>", body + "</body>") if "</body>" in html else html + body
+
+
+def head_path(html: str, backend: str):
+    doc = pa.ParsedDocument(html, backend=backend)
+    pa.quick_parse_head(doc)
+    pa.PriceExtractor.from_jsonld(doc)
+    pa.PriceExtractor.from_meta(doc)
+
+
+def bench(html: str, backend: str, repeat: int) -> float:
+    """Mean milliseconds per document."""
+    head_path(html, backend)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        head_path(html, backend)
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    pages = {}
+    for path in sorted(FIXTURES.glob("*.html")):
+        html = path.read_text(encoding="utf-8")
+        pages[path.stem] = html
+        pages[f"{path.stem} (500KB)"] = padded(html)
+
+    print(f"{'page':<36}" + "".join(f"{b:>12}" for b in BACKENDS) + f"{'best vs bs4':>13}")
+    for name, html in pages.items():
+        repeat = args.repeat if len(html) < 50_000 else max(5, args.repeat // 20)
+        ms = [bench(html, b, repeat) for b in BACKENDS]
+        print(f"{name:<36}" + "".join(f"{m:>10.3f}ms" for m in ms) + f"{ms[1] / min(ms):>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
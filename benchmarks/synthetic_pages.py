@@ -0,0 +1,97 @@
+"""Deterministic AliExpress- and Amazon-shaped product pages of a target size.
+
+The shapes follow what the extractors actually walk: a long <head> with
+meta/JSON-LD, a runParams blob with SKU matrices (AliExpress) or a
+twister/price script (Amazon), and body markup full of recommendation
+tiles. Same seed, same bytes, so timings are comparable across runs.
+"""
+import json
+import random
+
+SIZES = {"100KB": 100_000, "500KB": 500_000, "2MB": 2_000_000}
+
+
+def _tiles(rng: random.Random, size: int, price_class: str) -> str:
+    parts, total, i = [], 0, 0
+    while total < size:
+        i += 1
+        tile = (
+            f'<div class="rec-item" data-id="{rng.randrange(10**9)}">'
+            f'<a href="/item/{rng.randrange(10**12)}.html"><img src="https://img.example/{i}.jpg" alt="item {i}"></a>'
+            f'<span class="rec-title">Recommended product {i} with a fairly long title</span>'
+            f'<span class="{price_class}">${rng.randrange(1, 300)}.{rng.randrange(100):02d}</span></div>\n'
+        )
+        parts.append(tile)
+        total += len(tile)
+    return "".join(parts)
+
+
+def _head(title: str, extra: str = "") -> str:
+    metas = "".join(
+        f'<meta name="x-{i}" content="tracking value {i}">' for i in range(40)
+    )
+    return (
+        f'<head><meta charset="utf-8"><title>{title}</title>{metas}'
+        f'<meta property="og:title" content="{title}">'
+        f'<meta property="og:image" content="https://img.example/main.jpg">'
+        f"{extra}"
+        + "".join(f'<link rel="preload" href="/static/chunk-{i}.js" as="script">' for i in range(30))
+        + "</head>"
+    )
+
+
+def aliexpress_page(size: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    skus = [
+        {"skuId": rng.randrange(10**12), "skuAttr": f"14:{rng.randrange(10**6)}#Color {n}",
+         "skuVal": {"skuAmount": {"value": round(rng.uniform(5, 50), 2), "currency": "USD"},
+                    "availQuantity": rng.randrange(999)}}
+        for n in range(max(10, size // 4000))
+    ]
+    run_params = {"data": {
+        "titleModule": {"subject": "Wireless Earbuds Bluetooth 5.3 Noise Cancelling"},
+        "imageModule": {"imagePathList": [f"https://ae01.alicdn.com/kf/img{n}.jpg" for n in range(8)]},
+        "priceModule": {"formatedActivityPrice": "US $19.99", "formatedPrice": "US $29.99"},
+        "specsModule": {"props": [{"attrName": f"Spec {n}", "attrValue": f"Value {n}"} for n in range(20)]},
+        "crossLinkModule": {"breadCrumbPathList": [{"name": "Home"}, {"name": "Audio"}, {"name": "Earbuds"}]},
+        "skuModule": {"skuPriceList": skus},
+        "feedbackModule": {"reviews": [{"text": "good " * 20, "stars": 5} for _ in range(size // 20000)]},
+    }}
+    scripts = (
+        "<script>window._dida_config_ = {\"lang\": \"en\", \"debug\": false};</script>"
+        f"<script>window.runParams = {json.dumps(run_params)};</script>"
+    )
+    head = _head("Wireless Earbuds - AliExpress")
+    body_budget = max(0, size - len(head) - len(scripts))
+    return f"<!DOCTYPE html><html>{head}<body>{scripts}{_tiles(rng, body_budget, 'rec-price')}</body></html>"
+
+
+def amazon_page(size: int, seed: int = 2) -> str:
+    rng = random.Random(seed)
+    jsonld = json.dumps({
+        "@context": "https://schema.org", "@type": "Product",
+        "name": "Stainless Steel Electric Kettle 1.7L",
+        "image": [f"https://m.media-amazon.com/images/I/{n}.jpg" for n in range(6)],
+        "offers": {"@type": "Offer", "price": "34.99", "priceCurrency": "USD"},
+    })
+    head = _head("Amazon.com: Electric Kettle", f'<script type="application/ld+json">{jsonld}</script>')
+    twister = json.dumps({"dimensionValues": [
+        {"asin": f"B0{rng.randrange(10**8):08d}", "priceAmount": round(rng.uniform(20, 60), 2),
+         "displayPrice": f"${rng.randrange(20, 60)}.99"} for _ in range(max(10, size // 5000))
+    ]})
+    buybox = (
+        '<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">$34.99</span>'
+        '<span class="a-price-whole">34</span></span></div>'
+        f"<script>P.register('twister-js-init-dpx-data', function() {{ return {twister}; }});</script>"
+    )
+    body_budget = max(0, size - len(head) - len(buybox))
+    return f"<!DOCTYPE html><html>{head}<body>{buybox}{_tiles(rng, body_budget, 'a-color-price')}</body></html>"
+
+
+def pages():
+    """{name: (url, html)} for every shape and size."""
+    out = {}
+    for label, size in SIZES.items():
+        out[f"aliexpress {label}"] = ("https://www.aliexpress.com/item/1005001.html", aliexpress_page(size))
+        out[f"amazon {label}"] = ("https://www.amazon.com/dp/B000TEST01", amazon_page(size))
+    return out
@@ -43,6 +43,45 @@ export PARTIAL_TIMEOUT_MS=300                   # partial analysis timeout
 export QUICK_HTML_MAX_BYTES=163840              # ~160 KB max for quick fetch
 export QUICK_CONNECT_TIMEOUT_MS=150             # quick connect timeout
 export QUICK_READ_TIMEOUT_MS=120                # quick read timeout
+export HEDGE_ENABLED=true                       # hedge slow partial fetches
+export HEDGE_PERCENTILE=90                      # hedge after this header-latency percentile
+export HEDGE_MIN_SAMPLES=20                     # observations needed before hedging
+export AE_HEDGE_ORIGIN=https://www.aliexpress.us  # AliExpress mirror for the hedge
+export AE_MIRROR_FANOUT=2                       # AliExpress storefronts raced at once
+export DOMAIN_CONCURRENCY_INITIAL=2             # per-domain scrape slots (AIMD start)
+export DOMAIN_CONCURRENCY_MAX=6                 # per-domain scrape slot ceiling
+export DOMAIN_TIMEOUT_MULTIPLIER=2.0            # timeout = observed p95 x this
+export PLAYWRIGHT_MAX_PAGES=0                   # warm browser pages overall (0 = size from free RAM/cores)
+export PLAYWRIGHT_CONTEXTS=0                    # browser contexts the pages are spread over (0 = auto)
+export PLAYWRIGHT_PAGE_MEMORY_MB=300            # RAM budgeted per page when sizing automatically
+export PLAYWRIGHT_RECYCLE_NAVIGATIONS=200       # replace a context after this many page loads
+export PLAYWRIGHT_RECYCLE_MEMORY_MB=256         # ... or once its JS heap grew this much
+export BLOCK_RESOURCES=true                     # abort images/fonts/trackers in browser scrapes
+export READY_MAX_WAIT_MS=8000                   # AliExpress: hard cap on waiting for product data to render
+export BLOCK_POLICIES='{"amazon": {"types": ["image", "font"], "patterns": ["/uedata"]}}'  # per-marketplace overrides
+export BREAKER_FAILURE_THRESHOLD=5              # consecutive failures that open a host's breaker
+export BREAKER_RESET_S=30                       # open -> half-open probe delay (doubles per failed probe)
+export BREAKER_MAX_RESET_S=300
+export WARM_CONNECTIONS_PER_HOST=2              # pre-opened connections per marketplace (0=off)
+export WARM_REFRESH_S=20                        # re-touch idle connections this often
+export WARM_RECENT_S=600                        # warm only marketplace hosts scraped this recently
+export WARM_STOREFRONT_HOSTS="www.aliexpress.com,www.amazon.com,www.amazon.sa,www.amazon.ae,www.noon.com"  # warmed from startup
+export WARM_EXTRA_HOSTS="ae01.alicdn.com,m.media-amazon.com"  # image CDNs to warm
+
+# Scraping connection pool (shared keep-alive client)
+export SCRAPE_MAX_CONNECTIONS=100               # total open connections
+export SCRAPE_MAX_KEEPALIVE=20                  # idle connections kept for reuse
+export SCRAPE_KEEPALIVE_EXPIRY_S=30             # idle connection lifetime
+export SCRAPE_HTTP2=false                       # negotiate HTTP/2 when h2 is installed
+export DNS_CACHE_TTL_S=60                       # resolved-address cache lifetime
+export DNS_NEGATIVE_TTL_S=10                    # failed-lookup cache lifetime
+
+# HTML parsing
+export PARSER_BACKEND=lxml                      # head/meta/JSON-LD views: lxml | bs4 | strained
+export QUICK_PARSE_STRAINED=true                # partial head parse scans only title/meta/script tags
+export PARSE_EXECUTOR=thread                    # where page parsing runs: inline | thread | process
+export PARSE_WORKERS=4                          # parse pool size (default: CPU count)
+export PARSE_CACHE_ENTRIES=256                  # parse results kept by body hash (0=off)
 
 Run
 ---
@@ -50,26 +89,37 @@ uvicorn product_analyzer:app --host 0.0.0.0 --port 8080 --proxy-headers
 """
 import asyncio
 import base64
+import bisect
+import codecs
+import copy
 import io
 import ipaddress
+import multiprocessing
 import json
 import logging
 import os
 import re
 import socket
+import threading
 import time
 import uuid
 import hashlib
 from collections import deque, defaultdict, OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from html import unescape as html_unescape
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from urllib.parse import urlparse, urljoin, parse_qs
 
+import httpcore
 import httpx
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 from dotenv import load_dotenv
+from lxml import etree
 from fastapi import (
     FastAPI, HTTPException, Request, Depends, BackgroundTasks
 )
@@ -83,9 +133,17 @@ from google.cloud import vision
 PLAYWRIGHT_AVAILABLE = True
 try:
     from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+    from playwright.async_api import Error as PlaywrightError
 except Exception:
     PLAYWRIGHT_AVAILABLE = False
 
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = True
+try:
+    import h2  # noqa: F401
+except Exception:
+    HTTP2_AVAILABLE = False
+
 # ---------------------- Load ENV ----------------------
 load_dotenv()
 
@@ -114,9 +172,63 @@ PARTIAL_TIMEOUT_MS = int(os.getenv("PARTIAL_TIMEOUT_MS", "600"))  # Increased fo
 QUICK_HTML_MAX_BYTES = int(os.getenv("QUICK_HTML_MAX_BYTES", "163840"))  # ~160KB
 QUICK_CONNECT_TIMEOUT_MS = int(os.getenv("QUICK_CONNECT_TIMEOUT_MS", "150"))
 QUICK_READ_TIMEOUT_MS = int(os.getenv("QUICK_READ_TIMEOUT_MS", "120"))
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_MS = int(os.getenv("HEDGE_MIN_DELAY_MS", "30"))
+AE_HEDGE_ORIGIN = os.getenv("AE_HEDGE_ORIGIN", "https://www.aliexpress.us")
+AE_MIRROR_FANOUT = int(os.getenv("AE_MIRROR_FANOUT", "2"))
+
+# --------- Per-domain scraping control ----------
+DOMAIN_CONCURRENCY_INITIAL = int(os.getenv("DOMAIN_CONCURRENCY_INITIAL", "2"))
+DOMAIN_CONCURRENCY_MAX = int(os.getenv("DOMAIN_CONCURRENCY_MAX", "6"))
+DOMAIN_TIMEOUT_MULTIPLIER = float(os.getenv("DOMAIN_TIMEOUT_MULTIPLIER", "2.0"))
+PLAYWRIGHT_MAX_PAGES = int(os.getenv("PLAYWRIGHT_MAX_PAGES", "0"))  # 0 = auto
+PLAYWRIGHT_CONTEXTS = int(os.getenv("PLAYWRIGHT_CONTEXTS", "0"))  # 0 = auto
+PLAYWRIGHT_PAGE_MEMORY_MB = int(os.getenv("PLAYWRIGHT_PAGE_MEMORY_MB", "300"))
+PLAYWRIGHT_RECYCLE_NAVIGATIONS = int(os.getenv("PLAYWRIGHT_RECYCLE_NAVIGATIONS", "200"))
+PLAYWRIGHT_RECYCLE_MEMORY_MB = float(os.getenv("PLAYWRIGHT_RECYCLE_MEMORY_MB", "256"))
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "true").lower() == "true"
+READY_MAX_WAIT_MS = int(os.getenv("READY_MAX_WAIT_MS", "8000"))
+BLOCK_POLICIES = os.getenv("BLOCK_POLICIES", "")  # JSON: {"marketplace": {"types": [...], "patterns": [...]}}
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_S = float(os.getenv("BREAKER_RESET_S", "30"))
+BREAKER_MAX_RESET_S = float(os.getenv("BREAKER_MAX_RESET_S", "300"))
+
+# --------- Scraping connection pool ----------
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", "100"))
+SCRAPE_MAX_KEEPALIVE = int(os.getenv("SCRAPE_MAX_KEEPALIVE", "20"))
+SCRAPE_KEEPALIVE_EXPIRY_S = float(os.getenv("SCRAPE_KEEPALIVE_EXPIRY_S", "30"))
+SCRAPE_HTTP2 = HTTP2_AVAILABLE and os.getenv("SCRAPE_HTTP2", "false").lower() == "true"
+WARM_CONNECTIONS_PER_HOST = int(os.getenv("WARM_CONNECTIONS_PER_HOST", "2"))  # 0 disables warming
+WARM_REFRESH_S = float(os.getenv("WARM_REFRESH_S", "20"))  # keep below SCRAPE_KEEPALIVE_EXPIRY_S
+WARM_RECENT_S = float(os.getenv("WARM_RECENT_S", "600"))
+WARM_EXTRA_HOSTS = os.getenv("WARM_EXTRA_HOSTS", "ae01.alicdn.com,m.media-amazon.com")
+WARM_STOREFRONT_HOSTS = os.getenv(
+    "WARM_STOREFRONT_HOSTS", "www.aliexpress.com,www.amazon.com,www.amazon.sa,www.amazon.ae,www.noon.com"
+)
+
+# --------- DNS cache ----------
+DNS_CACHE_TTL_S = float(os.getenv("DNS_CACHE_TTL_S", "60"))
+DNS_NEGATIVE_TTL_S = float(os.getenv("DNS_NEGATIVE_TTL_S", "10"))
+
+# --------- HTML parsing ----------
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "lxml").lower()  # lxml | bs4 | strained
+QUICK_PARSE_STRAINED = os.getenv("QUICK_PARSE_STRAINED", "true").lower() == "true"
+PARSE_EXECUTOR = os.getenv("PARSE_EXECUTOR", "thread").lower()  # inline | thread | process
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 2)))
+PARSE_CACHE_ENTRIES = int(os.getenv("PARSE_CACHE_ENTRIES", "256"))
+
+# Pool limits of every outbound client; keep-alive outlives WARM_REFRESH_S
+# so the connections the warmer (below) opens are still there to reuse
+_POOL_LIMITS = httpx.Limits(
+    max_connections=SCRAPE_MAX_CONNECTIONS,
+    max_keepalive_connections=SCRAPE_MAX_KEEPALIVE,
+    keepalive_expiry=SCRAPE_KEEPALIVE_EXPIRY_S,
+)
 
 # Ultra-fast httpx client for partial (tiny timeouts)
-_fast_transport = httpx.AsyncHTTPTransport(retries=0)
+_fast_transport = httpx.AsyncHTTPTransport(retries=0, limits=_POOL_LIMITS)
 fast_client = httpx.AsyncClient(
     timeout=httpx.Timeout(
         connect=QUICK_CONNECT_TIMEOUT_MS/1000,
@@ -133,6 +245,289 @@ fast_client = httpx.AsyncClient(
     http2=False,
 )
 
+class LatencyWindow:
+    """Rolling window of latency samples (seconds) with percentile lookup."""
+    def __init__(self, size: int = 256, min_samples: int = 1):
+        self.samples: deque = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """pct in 0..100; None until min_samples observations exist."""
+        if len(self.samples) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[idx]
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """True when an exception means the remote host is slow, down or blocking us."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500 or exc.response.status_code in (403, 429)
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    return PLAYWRIGHT_AVAILABLE and isinstance(exc, PlaywrightError)
+
+@dataclass
+class DomainState:
+    limit: float
+    latency: LatencyWindow
+    in_use: int = 0
+    error_rate: float = 0.0  # EWMA
+    waiters: List[asyncio.Future] = field(default_factory=list)
+
+class DomainController:
+    """
+    Per-domain concurrency and timeout controller for scraping. Concurrency
+    follows AIMD (+1/limit per success, halved on upstream failure), so a
+    slow marketplace shrinks its own share instead of starving the others.
+    Timeouts derive from each domain's observed p95 latency.
+    """
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 6,
+                 min_samples: int = 20, multiplier: float = 2.0):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self.domains: Dict[str, DomainState] = {}
+
+    def state(self, host: str) -> DomainState:
+        st = self.domains.get(host)
+        if st is None:
+            st = DomainState(float(self.initial), LatencyWindow(min_samples=self.min_samples))
+            self.domains[host] = st
+        return st
+
+    def percentile(self, host: str, pct: float) -> Optional[float]:
+        return self.state(host).latency.percentile(pct)
+
+    def timeout(self, host: str, default: float, floor: float, ceiling: float) -> float:
+        """Seconds: p95 x multiplier clamped to [floor, ceiling]; default until enough samples."""
+        p95 = self.percentile(host, 95)
+        if p95 is None:
+            return default
+        return min(ceiling, max(floor, p95 * self.multiplier))
+
+    def observe(self, host: str, elapsed: float, ok: bool):
+        st = self.state(host)
+        st.latency.add(elapsed)
+        st.error_rate = 0.9 * st.error_rate + (0.0 if ok else 0.1)
+        if ok:
+            st.limit = min(float(self.max_limit), st.limit + 1.0 / st.limit)
+        else:
+            st.limit = max(float(self.min_limit), st.limit / 2)
+        self._wake(st)
+
+    def _wake(self, st: DomainState):
+        free = max(1, int(st.limit)) - st.in_use
+        while free > 0 and st.waiters:
+            fut = st.waiters.pop(0)
+            if not fut.done():
+                fut.set_result(None)
+                free -= 1
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """Hold one of the domain's concurrency slots; the outcome feeds AIMD."""
+        st = self.state(host)
+        while st.in_use >= max(1, int(st.limit)):
+            fut = asyncio.get_running_loop().create_future()
+            st.waiters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut in st.waiters:
+                    st.waiters.remove(fut)
+                self._wake(st)  # pass on a wake-up we may have consumed
+                raise
+        st.in_use += 1
+        t0 = time.monotonic()
+        try:
+            yield st
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if is_upstream_failure(exc):
+                self.observe(host, time.monotonic() - t0, ok=False)
+            raise
+        else:
+            self.observe(host, time.monotonic() - t0, ok=True)
+        finally:
+            st.in_use -= 1
+            self._wake(st)
+
+    def stats(self) -> Dict[str, Any]:
+        out = {}
+        for host, st in self.domains.items():
+            p95 = st.latency.percentile(95)
+            out[host] = {"limit": round(st.limit, 2), "in_use": st.in_use,
+                         "error_rate": round(st.error_rate, 3),
+                         "p95_ms": round(p95 * 1000) if p95 is not None else None}
+        return out
+
+# Full scrapes (page jobs) and quick partial fetches (time-to-headers)
+SCRAPE_DOMAINS = DomainController(
+    initial=DOMAIN_CONCURRENCY_INITIAL, max_limit=DOMAIN_CONCURRENCY_MAX, multiplier=DOMAIN_TIMEOUT_MULTIPLIER
+)
+QUICK_DOMAINS = DomainController(min_samples=HEDGE_MIN_SAMPLES, multiplier=DOMAIN_TIMEOUT_MULTIPLIER)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open."""
+    def __init__(self, host: str):
+        super().__init__(f"circuit open for {host}")
+        self.host = host
+
+@dataclass
+class BreakerState:
+    state: str = "closed"  # closed | open | half_open
+    failures: int = 0      # consecutive
+    opened_at: float = 0.0
+    reset_after: float = 0.0
+    probes: int = 0        # half-open probes in flight
+    trips: int = 0
+
+class CircuitBreakers:
+    """
+    Per-host circuit breakers. After `threshold` consecutive upstream
+    failures a host opens and callers fail fast with CircuitOpenError.
+    Once `reset_s` has passed it goes half-open and lets `probes` requests
+    through: a success closes it, a failure re-opens it with the wait
+    doubled (up to `max_reset_s`).
+    """
+    def __init__(self, threshold: int = 5, reset_s: float = 30.0, max_reset_s: float = 300.0, probes: int = 1):
+        self.threshold = threshold
+        self.reset_s = reset_s
+        self.max_reset_s = max_reset_s
+        self.max_probes = probes
+        self.hosts: Dict[str, BreakerState] = {}
+
+    def state(self, host: str) -> BreakerState:
+        st = self.hosts.get(host)
+        if st is None:
+            st = self.hosts[host] = BreakerState(reset_after=self.reset_s)
+        return st
+
+    def is_open(self, host: str) -> bool:
+        st = self.hosts.get(host)
+        return st is not None and st.state == "open" and time.monotonic() < st.opened_at + st.reset_after
+
+    def _acquire(self, host: str) -> bool:
+        """Admit a call; half-open admissions count as probes."""
+        st = self.state(host)
+        if st.state == "closed":
+            return False
+        if st.state == "open":
+            if time.monotonic() < st.opened_at + st.reset_after:
+                raise CircuitOpenError(host)
+            st.state = "half_open"
+        if st.probes >= self.max_probes:
+            raise CircuitOpenError(host)
+        st.probes += 1
+        return True
+
+    def _open(self, st: BreakerState, backoff: bool):
+        if backoff:
+            st.reset_after = min(self.max_reset_s, st.reset_after * 2)
+        st.state = "open"
+        st.opened_at = time.monotonic()
+        st.trips += 1
+
+    def record(self, host: str, ok: bool):
+        st = self.state(host)
+        if ok:
+            st.state = "closed"
+            st.failures = 0
+            st.reset_after = self.reset_s
+            return
+        st.failures += 1
+        if st.state == "half_open":
+            self._open(st, backoff=True)
+        elif st.state == "closed" and st.failures >= self.threshold:
+            self._open(st, backoff=False)
+
+    @asynccontextmanager
+    async def guard(self, host: str, failure=is_upstream_failure):
+        """Run a call against `host` unless its breaker is open; `failure` decides which errors count."""
+        probe = self._acquire(host)
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if failure(exc):
+                self.record(host, ok=False)
+            raise
+        else:
+            self.record(host, ok=True)
+        finally:
+            if probe:
+                self.state(host).probes -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        out = {}
+        for host, st in self.hosts.items():
+            if st.state == "closed" and not st.failures and not st.trips:
+                continue
+            retry_in = st.opened_at + st.reset_after - now if st.state == "open" else 0
+            out[host] = {"state": st.state, "failures": st.failures, "trips": st.trips,
+                         "retry_in_s": round(max(0.0, retry_in), 1)}
+        return out
+
+BREAKERS = CircuitBreakers(threshold=BREAKER_FAILURE_THRESHOLD, reset_s=BREAKER_RESET_S, max_reset_s=BREAKER_MAX_RESET_S)
+
+def _quick_failure(exc: BaseException) -> bool:
+    # The partial path's sub-second budgets time out on healthy-but-slow
+    # hosts; only hard failures there count against the breaker.
+    return is_upstream_failure(exc) and not isinstance(exc, (httpx.TimeoutException, asyncio.TimeoutError))
+
+def _image_failure(exc: BaseException) -> bool:
+    # A 403 on an image is about that one object (expired signature,
+    # hotlink rule), not the CDN refusing us.
+    if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 403:
+        return False
+    return is_upstream_failure(exc)
+
+def _quick_timeout(host: str) -> httpx.Timeout:
+    """Fast-path timeouts: the configured values are floors, stretched to p95 when a domain is consistently slower."""
+    connect = QUICK_CONNECT_TIMEOUT_MS / 1000
+    read = QUICK_READ_TIMEOUT_MS / 1000
+    p95 = QUICK_DOMAINS.percentile(host, 95)
+    if p95 is not None:
+        cap = PARTIAL_TIMEOUT_MS / 1000
+        connect = min(cap, max(connect, p95 * QUICK_DOMAINS.multiplier))
+        read = min(cap, max(read, p95 * QUICK_DOMAINS.multiplier))
+    return httpx.Timeout(connect=connect, read=read, write=read, pool=0.3)
+
+HEDGE_STATS = {"requests": 0, "hedged": 0, "hedge_wins": 0}
+
+def hedge_stats() -> Dict[str, Any]:
+    req, hedged = HEDGE_STATS["requests"], HEDGE_STATS["hedged"]
+    return {
+        **HEDGE_STATS,
+        "hedge_rate": round(hedged / req, 4) if req else 0.0,
+        "win_rate": round(HEDGE_STATS["hedge_wins"] / hedged, 4) if hedged else 0.0,
+    }
+
+# Alternate AliExpress storefronts serving the same /item/<id>.html pages
+AE_MIRROR_ORIGINS = [
+    "https://www.aliexpress.com",
+    "https://www.aliexpress.us",
+    "https://es.aliexpress.com",
+]
+
+def _aliexpress_mirror_url(url: str, origin: str) -> str:
+    item_id = url.split('/item/')[-1].split('?')[0].split('.')[0]
+    return f"{origin}/item/{item_id}.html"
+
+def _hedge_url(url: str) -> str:
+    if "aliexpress" in url.lower() and "/item/" in url:
+        return _aliexpress_mirror_url(url, AE_HEDGE_ORIGIN)
+    return url
+
 def _clean_title(raw: str) -> str:
     if not raw: return ""
     t = raw.strip()
@@ -150,112 +545,646 @@ def _first_non_empty(*vals) -> str:
             return v.strip()
     return ""
 
-async def quick_fetch_html_sample(url: str, max_bytes: int = QUICK_HTML_MAX_BYTES) -> str:
-    """Fetch only the first ~max_bytes to stay under the partial SLO."""
-    validate_public_url(url)
-    
-    # AliExpress-specific handling: larger limit and English headers
+async def quick_fetch_html_sample(url: str, max_bytes: int = QUICK_HTML_MAX_BYTES, on_headers=None) -> str:
+    """Breaker-guarded partial fetch; while the host's breaker is open, serve its last cached page instead."""
+    host = urlparse(url).hostname or ""
+    try:
+        async with BREAKERS.guard(host, failure=_quick_failure):
+            return await _stream_html_sample(url, max_bytes, on_headers)
+    except CircuitOpenError:
+        # Full pages are stored by the details path (cached_get_text), under its headers
+        cached = HTTP_CACHE.get(url, _page_headers(url))
+        if cached is None:
+            raise
+        return cached.text[:max_bytes]
+
+def _quick_headers(url: str) -> Dict[str, str]:
+    # AliExpress-specific handling: English headers
     is_aliexpress = "aliexpress" in url.lower()
-    actual_max_bytes = 1048576 if is_aliexpress else max_bytes  # 1MB for AE (was 256KB)
-    
     headers = {
         "User-Agent": "Mozilla/5.0 (Product-Intel/fast-partial)",
         "Accept-Language": "en-US,en;q=0.9" if is_aliexpress else "ar, en;q=0.8",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
     }
-    
     # Add AliExpress cookies for USD pricing
     if is_aliexpress:
         headers["Cookie"] = "aep_usuc_f=site=glo&b_locale=en_US&c_tp=USD&region=US"
-    
-    async with fast_client.stream("GET", url, headers=headers) as r:
-        r.raise_for_status()
-        total = 0
-        parts = []
-        async for chunk in r.aiter_bytes():
-            total += len(chunk)
-            parts.append(chunk)
-            if total >= actual_max_bytes:
-                break
-        return b"".join(parts).decode(errors="ignore")
+    return headers
 
-def quick_parse_head(html: str) -> Dict[str, Any]:
-    """Parse just enough for partial: title/name, price, one image."""
-    out = {"title": "", "price_amount": None, "price_currency": "USD", "image": ""}
+def _page_headers(url: str) -> Dict[str, str]:
+    """Request headers of the httpx details fetch (HttpxPage.goto)."""
+    is_aliexpress = "aliexpress" in url.lower()
+    headers = {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+        "Accept-Language": "en-US,en;q=0.9" if is_aliexpress else "en-US,en;q=0.8,ar;q=0.6",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    }
+    # Add AliExpress cookies for USD pricing
+    if is_aliexpress:
+        headers["Cookie"] = "aep_usuc_f=site=glo&b_locale=en_US&c_tp=USD&region=US"
+    return headers
 
-    # Try JSON-LD Product first (tiny soup parse)
-    soup = BeautifulSoup(html, "lxml")
-    for s in soup.find_all("script", attrs={"type": "application/ld+json"}):
-        try:
-            data = json.loads(s.string or "{}")
-        except Exception:
-            continue
-        nodes = data if isinstance(data, list) else [data]
-        for n in nodes:
-            if isinstance(n, dict) and (n.get("@type") == "Product" or ("@type" in n and "Product" in str(n.get("@type")))):
-                if not out["title"]:
-                    out["title"] = n.get("name", "") or out["title"]
-                offers = n.get("offers", {})
-                if isinstance(offers, dict):
-                    p = offers.get("price")
-                    c = offers.get("priceCurrency") or out["price_currency"]
+async def _stream_html_sample(url: str, max_bytes: int, on_headers=None) -> str:
+    """Fetch only the first ~max_bytes to stay under the partial SLO."""
+    await validate_public_url_async(url)
+    
+    # AliExpress-specific handling: larger limit
+    is_aliexpress = "aliexpress" in url.lower()
+    actual_max_bytes = 1048576 if is_aliexpress else max_bytes  # 1MB for AE (was 256KB)
+    headers = _quick_headers(url)
+    
+    # Feed chunks to an incremental parser and stop once JSON-LD has given
+    # title/price/image, instead of pulling max_bytes
+    signals: Optional[HeadSignalTarget] = HeadSignalTarget()
+    feeder = etree.HTMLParser(target=signals)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+
+    host = urlparse(url).hostname or ""
+    WARMER.note(host)
+    t0 = time.monotonic()
+    got_headers = False
+    try:
+        async with fast_client.stream("GET", url, headers=headers, timeout=_quick_timeout(host)) as r:
+            got_headers = True
+            elapsed = time.monotonic() - t0
+            if on_headers:
+                on_headers()
+            try:
+                r.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                # 5xx/429/403 are the host pushing back: AIMD halves the limit
+                QUICK_DOMAINS.observe(host, elapsed, ok=not is_upstream_failure(e))
+                raise
+            QUICK_DOMAINS.observe(host, elapsed, ok=True)
+            total = 0
+            parts = []
+            async for chunk in r.aiter_bytes():
+                total += len(chunk)
+                parts.append(chunk)
+                if signals is not None:
+                    try:
+                        feeder.feed(decoder.decode(chunk))
+                    except Exception:
+                        signals = None  # tracking is best-effort; keep downloading
+                if total >= actual_max_bytes or (signals is not None and signals.done):
+                    break
+            return b"".join(parts).decode(errors="ignore")
+    except httpx.TimeoutException:
+        # A timed-out attempt is still a (censored) latency sample, so a
+        # consistently slower domain stretches its own timeouts.
+        if not got_headers:
+            QUICK_DOMAINS.observe(host, time.monotonic() - t0, ok=False)
+        raise
+
+def _apply_jsonld_head(data: Any, out: Dict[str, Any]) -> None:
+    """Fill title/price/image in `out` from one decoded JSON-LD payload."""
+    nodes = data if isinstance(data, list) else [data]
+    for n in nodes:
+        if isinstance(n, dict) and (n.get("@type") == "Product" or ("@type" in n and "Product" in str(n.get("@type")))):
+            if not out["title"]:
+                out["title"] = n.get("name", "") or out["title"]
+            offers = n.get("offers", {})
+            if isinstance(offers, dict):
+                p = offers.get("price")
+                c = offers.get("priceCurrency") or out["price_currency"]
+                if p and str(p).strip() and str(p).strip() != "":
+                    try:
+                        price_str = str(p).replace(",", "").strip()
+                        if price_str and price_str != "" and price_str != "0" and price_str != "0.0":
+                            out["price_amount"] = float(price_str)
+                            out["price_currency"] = c
+                    except (ValueError, TypeError):
+                        pass
+            elif isinstance(offers, list):
+                for o in offers:
+                    p = o.get("price"); c = o.get("priceCurrency") or out["price_currency"]
                     if p and str(p).strip() and str(p).strip() != "":
                         try:
                             price_str = str(p).replace(",", "").strip()
                             if price_str and price_str != "" and price_str != "0" and price_str != "0.0":
                                 out["price_amount"] = float(price_str)
                                 out["price_currency"] = c
+                                break
                         except (ValueError, TypeError):
                             pass
-                elif isinstance(offers, list):
-                    for o in offers:
-                        p = o.get("price"); c = o.get("priceCurrency") or out["price_currency"]
-                        if p and str(p).strip() and str(p).strip() != "":
-                            try:
-                                price_str = str(p).replace(",", "").strip()
-                                if price_str and price_str != "" and price_str != "0" and price_str != "0.0":
-                                    out["price_amount"] = float(price_str)
-                                    out["price_currency"] = c
-                                    break
-                            except (ValueError, TypeError):
-                                pass
-                img = n.get("image")
-                if img:
-                    out["image"] = img[0] if isinstance(img, list) else img
+            img = n.get("image")
+            if img:
+                out["image"] = img[0] if isinstance(img, list) else img
+            break
+
+def _jsonld_head_complete(out: Dict[str, Any]) -> bool:
+    return bool(out["title"]) and out["price_amount"] is not None and bool(out["image"])
+
+# Script-embedded price patterns used by the quick path
+QUICK_PRICE_PATTERNS = [
+    r'"(?:price|currentPrice|salePrice)"\s*:\s*"?[^"\d]{0,8}(?P<price>\d[\d\.,]*)"?',
+    r'"(?:skuCalPrice|actSkuCalPrice)"\s*:\s*"(?P<price>[^"]+)"',
+]
+
+class HeadSignalTarget:
+    """
+    lxml feed-parser target for quick_fetch_html_sample: replays the
+    application/ld+json blocks through _apply_jsonld_head, as
+    quick_parse_head does, and is `done` once they have supplied a title,
+    a price and an image. quick_parse_head stops reading JSON-LD at that
+    point (first complete Product wins), so nothing later in the page can
+    change its answer and the download can stop. Builds no tree.
+    """
+    def __init__(self):
+        self.fields = {"title": "", "price_amount": None, "price_currency": "USD", "image": ""}
+        self._capture = False
+        self._buf: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return _jsonld_head_complete(self.fields)
+
+    def start(self, tag, attrib):
+        if tag.lower() == "script" and attrib.get("type") == "application/ld+json":
+            self._capture, self._buf = True, []
+
+    def data(self, text):
+        if self._capture:
+            self._buf.append(text)
+
+    def end(self, tag):
+        if not self._capture or tag.lower() != "script":
+            return
+        self._capture = False
+        if self.done:
+            return
+        try:
+            _apply_jsonld_head(json.loads("".join(self._buf) or "{}"), self.fields)
+        except Exception:
+            pass
+
+    def close(self):
+        return self
+
+async def hedged_quick_fetch(url: str) -> str:
+    """
+    quick_fetch_html_sample with hedging: if the primary has no response
+    headers within the HEDGE_PERCENTILE of observed latency, a second request
+    (an AliExpress mirror where possible) is fired; first success wins and
+    the loser is cancelled.
+    """
+    HEDGE_STATS["requests"] += 1
+    delay = QUICK_DOMAINS.percentile(urlparse(url).hostname or "", HEDGE_PERCENTILE) if HEDGE_ENABLED else None
+    headers_seen = asyncio.Event()
+    primary = asyncio.ensure_future(quick_fetch_html_sample(url, on_headers=headers_seen.set))
+    tasks = [primary]
+    try:
+        if delay is not None:
+            waiter = asyncio.ensure_future(headers_seen.wait())
+            done, _ = await asyncio.wait(
+                {primary, waiter}, timeout=max(delay, HEDGE_MIN_DELAY_MS / 1000),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            waiter.cancel()
+            if not done:
+                HEDGE_STATS["hedged"] += 1
+                tasks.append(asyncio.ensure_future(quick_fetch_html_sample(_hedge_url(url))))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if t is not primary:
+                        HEDGE_STATS["hedge_wins"] += 1
+                    return t.result()
+        return primary.result()  # every attempt failed: surface the primary's error
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+# ---------------------- Parsed document ----------------
+def _jsonld_types(node: Dict[str, Any]) -> set:
+    types = node.get("@type")
+    if not types:
+        graph = node.get("@graph")
+        types = graph[0].get("@type") if isinstance(graph, list) and graph and isinstance(graph[0], dict) else None
+    return {types.lower()} if isinstance(types, str) else {str(t).lower() for t in (types or [])}
+
+@dataclass
+class HeadNodes:
+    title: str
+    meta: List[Tuple[str, str, str]] # (property, name, content), document order
+    scripts: List[Tuple[str, str]]   # (type attribute, text), document order
+
+# ---------------------- lxml trees with a bs4-style element API ----------------------
+# Selectors on the lxml and strained backends are answered from a bare
+# lxml tree: the plain CSS the extractors use is translated to XPath and
+# the elements carry the slice of the bs4 Tag API callers rely on
+# (get/has_attr/get_text/select/select_one, always truthy). Anything the
+# translator does not cover falls back to BeautifulSoup.
+
+_RAW_TEXT_TAGS = frozenset({"script", "style", "template"})
+
+def _lxml_strings(el, own: bool = True):
+    if own and el.text:
+        yield el.text
+    for child in el:
+        # Comments contribute only their tail; raw-text children nothing, as in bs4
+        if isinstance(child.tag, str) and child.tag not in _RAW_TEXT_TAGS:
+            yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+class _LxmlElement(etree.ElementBase):
+    def __bool__(self):
+        return True  # lxml elements are falsy when childless; bs4 tags never are
+
+    def has_attr(self, name: str) -> bool:
+        return name in self.attrib
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        parts = _lxml_strings(self)
+        if strip:
+            parts = (p.strip() for p in parts)
+            parts = [p for p in parts if p]
+        return separator.join(parts)
+
+    def select(self, selector: str) -> list:
+        expr = _css_xpath(selector, "descendant")
+        return self.xpath(expr) if expr else _soup_fallback(self).select(selector)
+
+    def select_one(self, selector: str):
+        hits = self.select(selector)
+        return hits[0] if hits else None
+
+def _soup_fallback(el):
+    return BeautifulSoup(etree.tostring(el, encoding="unicode"), "lxml")
+
+_LXML_PARSERS = threading.local()  # lxml parsers must not be shared between threads
+
+def _lxml_root(html: str):
+    """Root of an lxml tree of _LxmlElement, or None when lxml refuses the input."""
+    parser = getattr(_LXML_PARSERS, "parser", None)
+    if parser is None:
+        parser = _LXML_PARSERS.parser = etree.HTMLParser()
+        parser.set_element_class_lookup(etree.ElementDefaultClassLookup(element=_LxmlElement))
+    try:
+        return etree.HTML(html, parser)
+    except (ValueError, etree.LxmlError):
+        return None  # e.g. str input carrying an XML encoding declaration
+
+_CSS_TOKEN = re.compile(
+    r"""\s*([>,])\s*|(\s+)|([a-zA-Z][\w-]*|\*)|\.([\w-]+)|\#([\w-]+)"""
+    r"""|\[\s*([\w-]+)\s*(?:([*^$~]?=)\s*(?:"([^"]*)"|'([^']*)'|([\w-]+))\s*)?\]"""
+)
+
+def _xpath_literal(value: str) -> Optional[str]:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return None
+
+def _css_attr_test(name: str, op: Optional[str], value: Optional[str]) -> Optional[str]:
+    attr = f"@{name.lower()}"
+    if op is None:
+        return attr
+    lit = _xpath_literal(value)
+    if lit is None or (op != "=" and not value.strip()):
+        return None  # empty ^=/$=/*=/~= match nothing in CSS; leave it to soupsieve
+    if op == "=":
+        return f"{attr}={lit}"
+    if op == "*=":
+        return f"contains({attr},{lit})"
+    if op == "^=":
+        return f"starts-with({attr},{lit})"
+    if op == "$=":
+        return f"substring({attr},string-length({attr})-string-length({lit})+1)={lit}"
+    if any(c.isspace() for c in value):
+        return None
+    return f"contains(concat(' ',normalize-space({attr}),' '),' {value} ')"  # ~=
+
+@lru_cache(maxsize=512)
+def _css_xpath(selector: str, scope: str) -> Optional[str]:
+    """
+    XPath for a selector list of type/.class/#id/[attr], [attr=|*=|^=|$=|~=v],
+    descendant and child combinators; None for anything else. scope is the
+    first step's axis: "descendant-or-self" from a document root (soupsieve
+    matches <html> too), "descendant" from an element.
+    """
+    paths: List[str] = []
+    steps: List[str] = []
+    tag, tests, axis, pos = None, [], scope, 0
+
+    def close_step():
+        steps.append(f"{axis}::{tag or '*'}" + "".join(f"[{t}]" for t in tests))
+
+    while pos < len(selector):
+        m = _CSS_TOKEN.match(selector, pos)
+        if not m:
+            return None
+        pos = m.end()
+        comb, space, name, cls, ident, attr = m.group(1, 2, 3, 4, 5, 6)
+        if comb or space:
+            if tag is None and not tests:
+                if comb:
+                    return None  # leading or doubled combinator
+                continue  # leading whitespace
+            close_step()
+            tag, tests = None, []
+            if comb == ",":
+                paths.append("/".join(steps))
+                steps, axis = [], scope
+            else:
+                axis = "child" if comb == ">" else "descendant"
+            continue
+        if name is not None:
+            if tag is not None or tests:
+                return None  # type selector must lead the compound
+            tag = name.lower()
+        elif cls is not None:
+            tests.append(f"contains(concat(' ',normalize-space(@class),' '),' {cls} ')")
+        elif ident is not None:
+            tests.append(f"@id='{ident}'")
+        else:
+            test = _css_attr_test(attr, m.group(7), next((g for g in m.group(8, 9, 10) if g is not None), None))
+            if test is None:
+                return None
+            tests.append(test)
+    if tag is None and not tests:
+        if axis == "child" or not steps:
+            return None  # dangling combinator or empty selector
+        # trailing whitespace only: the last step is already closed
+    else:
+        close_step()
+    paths.append("/".join(steps))
+    return " | ".join(paths)
+
+def _lxml_head_nodes(root) -> HeadNodes:
+    """Head views straight from an lxml tree (no BeautifulSoup objects)."""
+    if root is None:
+        return HeadNodes("", [], [])
+    t = next(root.iter("title"), None)
+    meta = []
+    for m in root.iter("meta"):
+        prop, name = m.get("property") or "", m.get("name") or ""
+        if prop or name:
+            meta.append((prop, name, m.get("content") or ""))
+    scripts = [(el.get("type") or "", el.text or "") for el in root.iter("script")]
+    return HeadNodes("".join(t.itertext()).strip() if t is not None else "", meta, scripts)
+
+def _bs4_head_nodes(soup: BeautifulSoup) -> HeadNodes:
+    t = soup.find("title")
+    meta = []
+    for m in soup.find_all("meta"):
+        prop, name = m.get("property") or "", m.get("name") or ""
+        if prop or name:
+            meta.append((prop, name, m.get("content") or ""))
+    scripts = [(s.get("type") or "", s.string or "") for s in soup.find_all("script")]
+    return HeadNodes(t.get_text(" ", strip=True) if t else "", meta, scripts)
+
+# Strained head scan: only <title>, <meta> and <script> become nodes.
+# Comments are skipped, and the bodies of raw-text elements are jumped
+# over so markup inside them is never mistaken for tags: style/script,
+# the ones lxml reads as text too (textarea, xmp, iframe, noembed,
+# noframes) and noscript/template, whose metas a browser never applies.
+# An unquoted attribute run stops at "<", so an unclosed tag fails at the
+# next one instead of rescanning to the end of the page.
+_SKIPPED_RAW_TEXT = ("style", "textarea", "noscript", "template", "xmp", "iframe", "noembed", "noframes")
+_HEAD_TAG = re.compile(
+    rf"<(?:(title|meta|script|plaintext|{'|'.join(_SKIPPED_RAW_TEXT)})\b((?:[^<>\"']|\"[^\"]*\"|'[^']*')*)>|!--)", re.I
+)
+_TAG_ATTR = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+)))?""")
+_RAW_TEXT_END = {t: re.compile(rf"</{t}\s*>", re.I) for t in ("title", "script", *_SKIPPED_RAW_TEXT)}
+
+def _tag_attrs(raw: str) -> Dict[str, str]:
+    attrs: Dict[str, str] = {}
+    for m in _TAG_ATTR.finditer(raw):
+        name = m.group(1).lower()
+        if name not in attrs:  # first occurrence wins, as in the HTML parsers
+            value = next((g for g in m.group(2, 3, 4) if g is not None), "")
+            attrs[name] = html_unescape(value)
+    return attrs
+
+def _strained_head_nodes(html: str) -> HeadNodes:
+    """
+    Head views without building a tree: tags other than title/meta/script
+    are never materialised, so body markup costs one regex skip instead
+    of a DOM node. Same HeadNodes as the lxml backend on real pages.
+    """
+    title: Optional[str] = None
+    meta: List[Tuple[str, str, str]] = []
+    scripts: List[Tuple[str, str]] = []
+    pos = 0
+    while True:
+        m = _HEAD_TAG.search(html, pos)
+        if not m:
+            break
+        tag = m.group(1)
+        if tag is None:  # <!-- comment -->
+            end = html.find("-->", m.end())
+            pos = len(html) if end < 0 else end + 3
+            continue
+        tag = tag.lower()
+        pos = m.end()
+        if tag == "meta":
+            attrs = _tag_attrs(m.group(2))
+            prop, name = attrs.get("property", ""), attrs.get("name", "")
+            if prop or name:
+                meta.append((prop, name, attrs.get("content", "")))
+            continue
+        if tag == "plaintext":
+            break  # everything after it is text
+        close = _RAW_TEXT_END[tag].search(html, pos)
+        end = close.start() if close else len(html)
+        if tag == "title" and title is None:
+            title = html_unescape(html[pos:end]).strip()
+        elif tag == "script":
+            scripts.append((_tag_attrs(m.group(2)).get("type", ""), html[pos:end]))
+        pos = close.end() if close else end
+    return HeadNodes(title or "", meta, scripts)
+
+class ParsedDocument:
+    """
+    A fetched page parsed once and shared by every extractor. The tree and
+    each view over it (JSON-LD payloads, meta tags, script blobs) are built
+    on first use, so a page that is answered from runParams never pays for
+    the views it does not touch.
+
+    Head views (title, meta, scripts, JSON-LD) come from PARSER_BACKEND:
+    "lxml" reads them off a bare lxml tree, "bs4" off BeautifulSoup and
+    "strained" off a tag scan that builds no tree at all. CSS selectors
+    go through the same lxml tree on the lxml and strained backends and
+    through BeautifulSoup (soupsieve) on bs4 or when lxml cannot answer;
+    either tree is built only when first used.
+    """
+    def __init__(self, html: str, url: str = "", backend: Optional[str] = None):
+        self.html = html or ""
+        self.url = url
+        self.backend = backend or PARSER_BACKEND
+
+    @cached_property
+    def head(self) -> HeadNodes:
+        if self.backend == "strained":
+            return _strained_head_nodes(self.html)
+        if self.backend == "lxml" and self.root is not None:
+            return _lxml_head_nodes(self.root)
+        return _bs4_head_nodes(self.soup)
+
+    @cached_property
+    def root(self):
+        """lxml tree for selectors (None on the bs4 backend or when lxml refuses the input)."""
+        return None if self.backend == "bs4" else _lxml_root(self.html)
+
+    def _xpath(self, selector: str) -> Optional[str]:
+        return _css_xpath(selector, "descendant-or-self") if self.root is not None else None
+
+    @classmethod
+    def of(cls, doc: Any) -> "ParsedDocument":
+        """Accept either raw HTML or an existing ParsedDocument."""
+        return doc if isinstance(doc, ParsedDocument) else cls(doc)
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        return BeautifulSoup(self.html, "lxml")
+
+    def select_one(self, selector: str):
+        expr = self._xpath(selector)
+        if expr is None:
+            return self.soup.select_one(selector)
+        hits = self.root.xpath(expr)
+        return hits[0] if hits else None
+
+    def select(self, selector: str):
+        expr = self._xpath(selector)
+        return self.root.xpath(expr) if expr else self.soup.select(selector)
+
+    def select_first_each(self, selectors: List[str]) -> Dict[str, Any]:
+        """First match (document order) for each selector; invalid selectors are skipped."""
+        found: Dict[str, Any] = {}
+        rest = []
+        for sel in selectors:
+            expr = self._xpath(sel)
+            if expr is None:
+                rest.append(sel)
+                continue
+            hits = self.root.xpath(expr)
+            if hits:
+                found[sel] = hits[0]
+        if rest:
+            found.update(self._soup_first_each(rest))
+        return found
+
+    def _soup_first_each(self, selectors: List[str]) -> Dict[str, Any]:
+        """select_first_each on the soup, in one walk of the tree."""
+        compiled = {}
+        for sel in selectors:
+            try:
+                compiled[sel] = self.soup.css.compile(sel)
+            except Exception:
+                continue
+        found: Dict[str, Any] = {}
+        if not compiled:
+            return found
+        for el in self.soup.descendants:
+            if not isinstance(el, Tag):
+                continue
+            for sel, matcher in compiled.items():
+                if sel not in found and matcher.match(el):
+                    found[sel] = el
+            if len(found) == len(compiled):
                 break
+        return found
+
+    @property
+    def title(self) -> str:
+        return self.head.title
+
+    @property
+    def meta(self) -> List[Tuple[str, str, str]]:
+        """(property, name, content) for every <meta>, in document order."""
+        return self.head.meta
+
+    def meta_first(self, *keys: Tuple[str, str]) -> str:
+        """
+        Content of the first meta tag (document order) matching any
+        (attribute, value) key, e.g. ("property", "og:image"), as the
+        meta[property=...] selectors did: <meta name="og:image"> is not
+        an og:image.
+        """
+        for prop, name, content in self.meta:
+            for attr, value in keys:
+                if (prop if attr == "property" else name) == value:
+                    return content
+        return ""
+
+    @cached_property
+    def scripts(self) -> List[str]:
+        return [text for _, text in self.head.scripts if text]
+
+    @cached_property
+    def price_scan(self) -> "PriceScan":
+        """Every price-pattern candidate in the raw HTML, found in one scan."""
+        return PRICE_SCANNER.scan(self.html)
+
+    @cached_property
+    def jsonld(self) -> List[Any]:
+        """Decoded application/ld+json payloads; invalid blocks are skipped."""
+        out = []
+        for typ, text in self.head.scripts:
+            if typ != "application/ld+json":
+                continue
+            try:
+                out.append(json.loads(text or "{}"))
+            except Exception:
+                continue
+        return out
+
+    @cached_property
+    def jsonld_products(self) -> List[Dict[str, Any]]:
+        out = []
+        for data in self.jsonld:
+            for node in (data if isinstance(data, list) else [data]):
+                if isinstance(node, dict) and "product" in _jsonld_types(node):
+                    out.append(node)
+        return out
+
+def quick_parse_head(html) -> Dict[str, Any]:
+    """Parse just enough for partial: title/name, price, one image."""
+    out = {"title": "", "price_amount": None, "price_currency": "USD", "image": ""}
+    if isinstance(html, ParsedDocument):
+        doc = html
+    else:
+        # Nothing below needs a DOM: scan only the head tags unless disabled
+        doc = ParsedDocument(html, backend="strained" if QUICK_PARSE_STRAINED else None)
+
+    # Try JSON-LD Product first; the first blocks that together give a
+    # title, price and image win (HeadSignalTarget stops the download there)
+    for data in doc.jsonld:
+        if _jsonld_head_complete(out):
+            break
+        _apply_jsonld_head(data, out)
 
     # Meta fallbacks
     if not out["title"]:
-        ogt = soup.select_one('meta[property="og:title"]')
-        twt = soup.select_one('meta[name="twitter:title"]')
-        doc_title = soup.find("title")
         out["title"] = _clean_title(_first_non_empty(
-            ogt.get("content") if ogt else "",
-            twt.get("content") if twt else "",
-            doc_title.get_text(" ", strip=True) if doc_title else ""
+            doc.meta_first(("property", "og:title")),
+            doc.meta_first(("name", "twitter:title")),
+            doc.title,
         ))
 
     if out["price_amount"] is None:
         # Meta price
-        ogp = soup.select_one('meta[property="product:price:amount"], meta[property="og:price:amount"]')
-        if ogp and ogp.get("content"):
+        price_str = doc.meta_first(("property", "product:price:amount"), ("property", "og:price:amount")).replace(",", "").strip()
+        if price_str:
             try:
-                price_str = ogp["content"].replace(",", "").strip()
-                if price_str:
-                    out["price_amount"] = float(price_str)
+                out["price_amount"] = float(price_str)
             except (ValueError, TypeError):
                 pass
 
     # If still none, handle strings like "US $12.34" and AE runParams
     if out["price_amount"] is None:
-        for patt in [
-            r'"(?:price|currentPrice|salePrice)"\s*:\s*"?[^"\d]{0,8}(?P<p>\d[\d\.,]*)"?',
-            r'"(?:skuCalPrice|actSkuCalPrice)"\s*:\s*"(?P<p>[^"]+)"',
-        ]:
-            m = re.search(patt, html, re.I)
-            if m:
+        for rule in ("quick_price", "quick_sku_cal_price"):
+            c = doc.price_scan.first(rule)
+            if c:
                 try:
-                    raw = m.group("p")
+                    raw = c.raw
                     digits = re.sub(r"[^\d\.,]", "", raw).replace(",", "")
                     if digits:
                         out["price_amount"] = float(digits)
@@ -264,9 +1193,7 @@ def quick_parse_head(html: str) -> Dict[str, Any]:
                     pass
 
     if not out["image"]:
-        ogi = soup.select_one('meta[property="og:image"], meta[name="twitter:image"]')
-        if ogi and ogi.get("content"):
-            out["image"] = ogi["content"]
+        out["image"] = doc.meta_first(("property", "og:image"), ("name", "twitter:image"))
 
     return out
 
@@ -279,101 +1206,274 @@ def _yer_str(amount: Optional[float], cur: str) -> str:
         return ""
 
 # ========= NEW: AliExpress extraction helpers =========
-def _extract_json_from_scripts(html: str, keys: list[str]) -> Optional[dict]:
+_JSON_DECODER = json.JSONDecoder()
+
+# Embedded-state anchors, tried in _SCRIPT_JSON_PRIORITY order. Anchors
+# are located with str.find (an alternation regex has no literal prefix
+# to skip ahead on and crawls through megabyte pages); the object itself
+# is cut by the JSON decoder, so scanning stays linear.
+_ASSIGN_VALUE = re.compile(r"\s*=\s*(?=[{\"])")
+_COLON_OBJECT = re.compile(r"\s*:\s*(?=\{)")
+_SCRIPT_JSON_PRIORITY = {
+    "window.runParams": 0, "__AERENDER_DATA__": 1, "data": 2,
+    "window.__DEFAULT_DATA__": 3, "runParams": 4, "window.runParams (string)": 5,
+}
+_JS_TOKEN = re.compile(r"""[{}]|"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'""")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_RENDERING_SUFFIX = re.compile(r"\s*,\s*rendering:")
+_RENDERED_OBJECT_END = re.compile(r"\}(?=\s*,\s*rendering:)")
+_SCRIPT_CLOSE = re.compile(r"</script")
+
+def _balanced_object_end(text: str, start: int, stop: Optional[int] = None) -> Optional[int]:
+    """Index just past the object opening at text[start], skipping braces inside strings."""
+    depth = 0
+    for m in _JS_TOKEN.finditer(text, start, len(text) if stop is None else stop):
+        tok = m.group()
+        if tok == "{":
+            depth += 1
+        elif tok == "}":
+            depth -= 1
+            if depth == 0:
+                return m.end()
+    return None
+
+def _brace_ends(text: str, start: int, stop: int) -> Tuple[Dict[int, int], set]:
+    """
+    ({offset of "{": index just past its matching "}"}, offsets of the "{"
+    left open) over text[start:stop], in one scan.
+    """
+    ends: Dict[int, int] = {}
+    opened: List[int] = []
+    for m in _JS_TOKEN.finditer(text, start, stop):
+        tok = m.group()
+        if tok == "{":
+            opened.append(m.start())
+        elif tok == "}" and opened:
+            ends[opened.pop()] = m.end()
+    return ends, set(opened)
+
+def _scanned_object_end(scans: list, text: str, start: int, stop: int) -> Optional[int]:
+    """
+    End of the object at text[start] (None: unbalanced before `stop`),
+    looked up in the `scans` of its script first. A "{" a scan did not
+    tokenize (it sat inside a string there) starts one more scan, so a
+    script is matched once per alignment rather than once per anchor.
+    """
+    for ends, unclosed in scans:
+        if start in ends:
+            return ends[start]
+        if start in unclosed:
+            return None
+    ends, unclosed = _brace_ends(text, start, stop)
+    scans.append((ends, unclosed))
+    return ends.get(start)
+
+def _decode_object_at(text: str, start: int, stop: Optional[int] = None,
+                      ends: Optional[Dict[int, int]] = None) -> Tuple[Optional[dict], int]:
+    """
+    Decode the JSON object starting at text[start]. Falls back to cutting the
+    balanced {...} span (from `ends` when the caller has matched the braces
+    already, else by scanning no further than `stop`) and dropping trailing
+    commas (common in inline JS). Returns (object or None, end offset).
+    """
+    try:
+        obj, end = _JSON_DECODER.raw_decode(text, start)
+        return (obj if isinstance(obj, dict) else None), end
+    except json.JSONDecodeError as e:
+        # Only a trailing comma is repaired below: fail anything else here
+        # rather than re-reading the whole span
+        j = e.pos
+        while j > start and text[j - 1].isspace():
+            j -= 1
+        if text[e.pos:e.pos + 1] not in ("}", "]") or text[j - 1:j] != ",":
+            return None, start
+    end = ends.get(start) if ends is not None else _balanced_object_end(text, start, stop)
+    if end is None:
+        return None, start
+    try:
+        obj = json.loads(_TRAILING_COMMA.sub(r"\1", text[start:end]))
+    except ValueError:
+        return None, end
+    return (obj if isinstance(obj, dict) else None), end
+
+def _json_has_any_key(obj: Any, keys) -> bool:
+    """True if any dict at any depth has one of `keys` as a key."""
+    keys = set(keys)
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            if not keys.isdisjoint(cur):
+                return True
+            stack.extend(v for v in cur.values() if isinstance(v, (dict, list)))
+        elif isinstance(cur, list):
+            stack.extend(v for v in cur if isinstance(v, (dict, list)))
+    return False
+
+def _anchor_name(literal: str, windowed: bool, quoted: bool) -> Optional[str]:
+    """Map an assignment anchor to its _SCRIPT_JSON_PRIORITY name (None: not an anchor we use)."""
+    if literal == "runParams":
+        if quoted:
+            return "window.runParams (string)" if windowed else None
+        return "window.runParams" if windowed else "runParams"
+    if quoted:
+        return None
+    if literal == "__DEFAULT_DATA__":
+        return "window.__DEFAULT_DATA__" if windowed else None
+    return literal
+
+def _script_json_candidates(html: str):
+    """(priority, offset) of every embedded-state anchor, best priority first."""
+    found = []
+    for literal in ("runParams", "__AERENDER_DATA__", "__DEFAULT_DATA__"):
+        i = html.find(literal)
+        while i != -1:
+            m = _ASSIGN_VALUE.match(html, i + len(literal))
+            if m:
+                name = _anchor_name(literal, html.endswith("window.", 0, i), html[m.end()] == '"')
+                if name:
+                    found.append((_SCRIPT_JSON_PRIORITY[name], m.end()))
+            i = html.find(literal, i + len(literal))
+    i = html.find("data:")
+    while i != -1:
+        m = _COLON_OBJECT.match(html, i + 4)
+        if m and (i == 0 or not (html[i - 1].isalnum() or html[i - 1] == "_")):
+            found.append((_SCRIPT_JSON_PRIORITY["data"], m.end()))
+        i = html.find("data:", i + 5)
+    found.sort()  # stable: document order within a priority
+    return found
+
+def _extract_json_from_scripts(html, keys: list[str]) -> Optional[dict]:
     """
     Robust JSON extraction from AliExpress scripts
     Handles multiple patterns and formats for maximum compatibility
     """
-    import re
-    import json
-    
-    # Pattern 1: window.runParams = {...}
-    patterns = [
-        r"window\.runParams\s*=\s*({.*?})\s*;",
-        r"__AERENDER_DATA__\s*=\s*({.*?})\s*;",
-        r"data:\s*({.*?})\s*,\s*rendering:",
-        r"window\.__DEFAULT_DATA__\s*=\s*({.*?})\s*;",
-        r"runParams\s*=\s*({[^;]+});",
-        r'window\.runParams\s*=\s*"({[^"]+})"',
-    ]
-    
-    for pattern in patterns:
+    doc = ParsedDocument.of(html)
+    html = doc.html
+
+    candidates = _script_json_candidates(html)
+    # Script ends, `}, rendering:` suffixes and matched braces are located
+    # once for all anchors; per-anchor scans would make pages full of JS
+    # quadratic
+    script_ends = [m.start() for m in _SCRIPT_CLOSE.finditer(html)]
+    rendered_ends = []
+    if any(p == _SCRIPT_JSON_PRIORITY["data"] for p, _ in candidates):
+        rendered_ends = [m.end() for m in _RENDERED_OBJECT_END.finditer(html)]
+    brace_scans: Dict[int, list] = {}  # script end -> _brace_ends scans of it
+
+    for priority, start in candidates:
+        # An object never runs past its own script
+        k = bisect.bisect_left(script_ends, start)
+        stop = script_ends[k] if k < len(script_ends) else len(html)
         try:
-            matches = re.findall(pattern, html, re.DOTALL)
-            for match in matches:
-                try:
-                    # Handle escaped JSON
-                    if match.startswith('"'):
-                        match = match.strip('"').replace('\\"', '"')
-                    data = json.loads(match)
-                    # Check if any of our keys are in this JSON
-                    json_str = json.dumps(data)
-                    if any(key in json_str for key in keys):
-                        return data
-                except json.JSONDecodeError:
-                    # Try to fix common JSON issues
-                    cleaned = re.sub(r',\s*}', '}', match)  # Remove trailing commas
-                    cleaned = re.sub(r',\s*]', ']', cleaned)
-                    try:
-                        data = json.loads(cleaned)
-                        json_str = json.dumps(data)
-                        if any(key in json_str for key in keys):
-                            return data
-                    except:
-                        continue
-        except Exception:
+            if priority == _SCRIPT_JSON_PRIORITY["window.runParams (string)"]:
+                # Escaped JSON inside a string literal
+                inner, _ = _JSON_DECODER.raw_decode(html, start)
+                data, _ = _decode_object_at(inner, 0) if isinstance(inner, str) and inner.startswith("{") else (None, 0)
+            elif priority == _SCRIPT_JSON_PRIORITY["data"]:
+                # Only `data: {...}, rendering:` counts: anchors with no such
+                # suffix ahead in their script (plain JS objects) are dropped
+                # unscanned
+                k = bisect.bisect_right(rendered_ends, start)
+                if k == len(rendered_ends) or rendered_ends[k] > stop:
+                    continue
+                end = _scanned_object_end(brace_scans.setdefault(stop, []), html, start, stop)
+                if end is None or not _RENDERING_SUFFIX.match(html, end):
+                    continue
+                data, _ = _decode_object_at(html, start, ends={start: end})
+            else:
+                # An object left open before its script ends is never JSON
+                end = _scanned_object_end(brace_scans.setdefault(stop, []), html, start, stop)
+                if end is None:
+                    continue
+                data, _ = _decode_object_at(html, start, ends={start: end})
+        except ValueError:
             continue
-    
+        if data is not None and _json_has_any_key(data, keys):
+            return data
+
     # Fallback: search for script tags with product data
-    soup = BeautifulSoup(html, 'lxml')
-    for script in soup.find_all('script'):
-        if script.string and any(key in script.string for key in keys):
+    for script in doc.scripts:
+        if any(key in script for key in keys):
+            start, end = script.find("{"), script.rfind("}")
+            if start == -1 or end < start:
+                continue
             try:
-                # Extract JSON from script text
-                json_text = re.search(r'({.*})', script.string, re.DOTALL)
-                if json_text:
-                    data = json.loads(json_text.group(1))
-                    return data
-            except:
+                return json.loads(script[start:end + 1])
+            except ValueError:
                 continue
-    
-    return None
 
-def _parse_aliexpress(html: str) -> dict:
-    """
-    Complete AliExpress product data parser
-    Returns: title, images, price_amount, price_currency, specifications, breadcrumbs
-    """
-    import re
-    import json
-    from bs4 import BeautifulSoup
-    
-    out = {
-        "title": "",
-        "images": [],
-        "price_amount": None,
-        "price_currency": "USD",
-        "specifications": {},
-        "breadcrumbs": []
-    }
+    return None
 
-    # Extract all potential JSON data
-    json_data = _extract_json_from_scripts(html, [
-        "priceModule", "imageModule", "specsModule", 
-        "titleModule", "descriptionModule", "storeModule"
-    ])
-    
-    if not json_data:
-        logger.warning("AliExpress parser: No JSON data found in scripts")
-        return out
+# runParams modules _extract_ae_fields reads
+AE_MODULES = (
+    "titleModule", "pageModule", "productInfoComponent", "imageModule",
+    "priceModule", "specsModule", "crossLinkModule",
+)
 
-    # Get the data root - AliExpress structures vary
-    root = json_data.get("data", json_data)
-    if not isinstance(root, dict):
-        root = json_data
+_OBJECT_KEY = re.compile(r'\s*(?:"((?:[^"\\]|\\.)*)"|([A-Za-z_$][\w$]*))\s*:\s*')
+_MEMBER_END = re.compile(r"\s*([,}])")
 
-    logger.info(f"AliExpress parser: Found JSON data with keys: {list(root.keys())}")
+def _object_members(text: str, start: int, wanted, descend: str = "") -> Tuple[Dict[str, Any], Optional[int]]:
+    """
+    The `wanted` members of the object at text[start] and its end offset.
+    Only its own top-level members count: each value is decoded on its own
+    and dropped unless wanted, so nothing nested can match and only the
+    wanted subtrees stay alive. The object under `descend` is walked the
+    same way and returned alone, under that key. Stops (end None) at the
+    first member that is not JSON, keeping what it has.
+    """
+    out: Dict[str, Any] = {}
+    pos = start + 1
+    empty = _MEMBER_END.match(text, pos)
+    if empty and empty.group(1) == "}":
+        return out, empty.end()
+    while True:
+        m = _OBJECT_KEY.match(text, pos)
+        if not m:
+            return out, None
+        key = m.group(2) if m.group(1) is None else m.group(1)
+        if "\\" in key:
+            try:
+                key = json.loads(f'"{key}"')
+            except ValueError:
+                return out, None
+        if key == descend and text.startswith("{", m.end()):
+            inner, _ = _object_members(text, m.end(), wanted)
+            return {key: inner}, None
+        try:
+            value, pos = _JSON_DECODER.raw_decode(text, m.end())
+        except ValueError:
+            return out, None
+        if key in wanted:
+            out[key] = value
+        sep = _MEMBER_END.match(text, pos)
+        if not sep:
+            return out, None
+        pos = sep.end()
+        if sep.group(1) == "}":
+            return out, pos
+
+def _decode_ae_modules(html: str) -> Optional[Dict[str, Any]]:
+    """
+    Selectively decode the AE_MODULES members of the first embedded-state
+    blob that has any, without materializing the rest of the (often
+    multi-hundred-KB) object. Modules count only as members of the data
+    root (the blob's "data" object, else the blob itself), never nested
+    deeper, e.g. inside recommendations. Returns {module: value} or None.
+    """
+    for priority, start in _script_json_candidates(html):
+        if priority == _SCRIPT_JSON_PRIORITY["window.runParams (string)"]:
+            continue  # escaped form: left to the full decode
+        members, _ = _object_members(html, start, AE_MODULES, descend="data")
+        root = members["data"] if isinstance(members.get("data"), dict) else members
+        modules = {k: v for k, v in root.items() if isinstance(v, dict)}
+        if modules:
+            return modules
+    return None
 
+def _extract_ae_fields(root: Dict[str, Any], out: Dict[str, Any]) -> None:
+    """Fill title/images/price/specs/breadcrumbs in `out` from a runParams data root."""
     # 1. Extract title
     title_paths = [
         ["titleModule", "subject"],
@@ -476,40 +1576,77 @@ def _parse_aliexpress(html: str) -> dict:
     except:
         pass
 
+def _parse_aliexpress(html) -> dict:
+    """
+    Complete AliExpress product data parser
+    Returns: title, images, price_amount, price_currency, specifications, breadcrumbs
+    """
+    doc = ParsedDocument.of(html)
+
+    out = {
+        "title": "",
+        "images": [],
+        "price_amount": None,
+        "price_currency": "USD",
+        "specifications": {},
+        "breadcrumbs": []
+    }
+
+    # Decode only the modules we read; the whole runParams blob is decoded
+    # only when they are missing or incomplete (older layouts keep fields
+    # at the root).
+    root = _decode_ae_modules(doc.html)
+    if root is not None:
+        logger.info(f"AliExpress parser: Decoded modules: {list(root.keys())}")
+        _extract_ae_fields(root, out)
+
+    if not out["title"] or out["price_amount"] is None:
+        json_data = _extract_json_from_scripts(doc, [
+            "priceModule", "imageModule", "specsModule",
+            "titleModule", "descriptionModule", "storeModule"
+        ])
+
+        if not json_data and root is None:
+            logger.warning("AliExpress parser: No JSON data found in scripts")
+            return out
+
+        if json_data:
+            # Get the data root - AliExpress structures vary
+            full_root = json_data.get("data", json_data)
+            if not isinstance(full_root, dict):
+                full_root = json_data
+            logger.info(f"AliExpress parser: Found JSON data with keys: {list(full_root.keys())}")
+            _extract_ae_fields(full_root, out)
+
     # Fallback: Try meta tags and JSON-LD if runParams failed
     if not out["title"] or not out["price_amount"]:
         logger.info("AliExpress parser: Using fallback meta tags and JSON-LD")
-        soup = BeautifulSoup(html, 'lxml')
-        
+
         # Title from meta tags
         if not out["title"]:
-            og_title = soup.find('meta', {'property': 'og:title'})
-            if og_title and og_title.get('content'):
-                out["title"] = og_title['content']
+            og_title = doc.meta_first(('property', 'og:title'))
+            if og_title:
+                out["title"] = og_title
                 logger.info(f"AliExpress parser: Title from meta: {out['title'][:60]}...")
-            else:
-                title_tag = soup.find('title')
-                if title_tag:
-                    out["title"] = title_tag.get_text(strip=True)
-                    logger.info(f"AliExpress parser: Title from title tag: {out['title'][:60]}...")
-        
+            elif doc.title:
+                out["title"] = doc.title
+                logger.info(f"AliExpress parser: Title from title tag: {out['title'][:60]}...")
+
         # Price from meta or structured data
         if not out["price_amount"]:
             # Check meta tags
-            price_meta = soup.find('meta', {'property': 'product:price:amount'})
-            if price_meta and price_meta.get('content'):
+            price_meta = doc.meta_first(('property', 'product:price:amount'))
+            if price_meta:
                 try:
-                    out["price_amount"] = float(price_meta['content'])
+                    out["price_amount"] = float(price_meta)
                     logger.info(f"AliExpress parser: Price from meta: {out['price_amount']}")
                 except:
                     pass
-            
+
             # Check JSON-LD
             if not out["price_amount"]:
-                json_ld_scripts = soup.find_all('script', {'type': 'application/ld+json'})
-                for script in json_ld_scripts:
+                for data in doc.jsonld:
                     try:
-                        data = json.loads(script.string)
                         if isinstance(data, dict) and data.get('@type') == 'Product':
                             offers = data.get('offers', {})
                             if isinstance(offers, dict):
@@ -520,12 +1657,12 @@ def _parse_aliexpress(html: str) -> dict:
                                     logger.info(f"AliExpress parser: Price from JSON-LD: {out['price_amount']} {out['price_currency']}")
                     except:
                         continue
-        
+
         # Images from meta if needed
         if not out["images"]:
-            og_image = soup.find('meta', {'property': 'og:image'})
-            if og_image and og_image.get('content'):
-                out["images"] = [og_image['content']]
+            og_image = doc.meta_first(('property', 'og:image'))
+            if og_image:
+                out["images"] = [og_image]
                 logger.info(f"AliExpress parser: Image from meta: {out['images'][0]}")
 
     # Clean up title
@@ -540,6 +1677,65 @@ def _parse_aliexpress(html: str) -> dict:
     
     return out
 
+# Current pdp API (mtop.aliexpress.pdp.pc.query) component -> runParams
+# module path that _extract_ae_fields already reads
+_AE_API_COMPONENTS = (
+    (("PRODUCT_TITLE", "text"), ("titleModule", "subject")),
+    (("HEADER_IMAGE_PC", "imagePathList"), ("imageModule", "imagePathList")),
+    (("PRICE", "targetSkuPriceInfo", "salePriceString"), ("priceModule", "formatedActivityPrice")),
+    (("PRICE", "targetSkuPriceInfo", "originalPrice", "formatedAmount"), ("priceModule", "formatedPrice")),
+    (("PRODUCT_PROP_PC", "showedProps"), ("specsModule", "props")),
+)
+
+def _ae_api_root(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Data root of an AliExpress product API payload, in runParams module shape."""
+    root = payload.get("data", payload)
+    if isinstance(root, dict) and isinstance(root.get("result"), dict):
+        root = root["result"]
+    if not isinstance(root, dict):
+        return {}
+    root = dict(root)
+    for src, dst in _AE_API_COMPONENTS:
+        value: Any = root
+        for key in src:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value and not isinstance(root.get(dst[0]), dict):
+            root[dst[0]] = {}
+        if value and dst[1] not in root[dst[0]]:
+            root[dst[0]] = {**root[dst[0]], dst[1]: value}
+    return root
+
+def parse_ae_payloads(bodies: List[bytes]) -> Dict[str, Any]:
+    """
+    Pool worker: product fields from AliExpress product-data XHR bodies
+    (JSON or JSONP) captured during navigation, merged in arrival order.
+    Same shape as _parse_aliexpress.
+    """
+    out = {"title": "", "images": [], "price_amount": None, "price_currency": "USD",
+           "specifications": {}, "breadcrumbs": []}
+    for body in bodies:
+        text = bytes(body).decode("utf-8", "ignore")
+        start = text.find("{")  # skips a JSONP callback prefix
+        payload, _ = _decode_object_at(text, start) if start >= 0 else (None, 0)
+        if not isinstance(payload, dict):
+            continue
+        found = {"title": "", "images": [], "price_amount": None, "price_currency": "USD",
+                 "specifications": {}, "breadcrumbs": []}
+        _extract_ae_fields(_ae_api_root(payload), found)
+        for key, value in found.items():
+            if key == "price_currency":
+                continue
+            if value and not out[key]:
+                out[key] = value
+                if key == "price_amount":
+                    out["price_currency"] = found["price_currency"]
+        if out["title"] and out["price_amount"] is not None:
+            break
+    if out["title"]:
+        out["title"] = _clean_title(out["title"])
+    out["images"] = [u for u in out["images"] if isinstance(u, str) and u.startswith(("http://","https://"))]
+    return out
+
 def _filter_images_by_host(urls: list[str], allowed_hosts: list[str]) -> list[str]:
     """Filter images to only allow specific hosts (e.g., aliexpress.com, alicdn.com)"""
     out = []
@@ -579,8 +1775,12 @@ async def fast_partial_from_url_hint(url: str, rid: str) -> Optional[Dict[str, A
     
     start = time.monotonic()
     try:
-        html = await asyncio.wait_for(quick_fetch_html_sample(url), timeout=PARTIAL_TIMEOUT_MS/1000)
-        parsed = quick_parse_head(html)
+        # Concurrent partials for the same product share one fetch
+        html = await asyncio.wait_for(
+            FLIGHTS.do(f"quick:{canonical_url(url)}", lambda: hedged_quick_fetch(url)),
+            timeout=PARTIAL_TIMEOUT_MS/1000,
+        )
+        parsed = await cached_parse(parse_head, PARSE_POOL.wire(html))
         
         # Always return a result, even if empty
         # Build price object
@@ -653,6 +1853,8 @@ async def lifespan(app: FastAPI):
     # SCRAPER/CURRENCY/clients are defined later in the module; they are
     # resolved at runtime when the server actually starts.
     print("Starting Product Analyzer API…")  # Use print for startup to avoid logging format issues
+    WARMER.start()  # handshakes run in the background while the rest starts up
+    await PARSE_POOL.start()
     await CURRENCY.ensure_fresh()
     if USE_PLAYWRIGHT:
         await SCRAPER.init()
@@ -660,6 +1862,8 @@ async def lifespan(app: FastAPI):
     print(f"Effective USD→YER rate: {YER_PER_USD} (from env: {os.getenv('YER_PER_USD', 'default')})")
     yield
     print("Shutting down…")  # Use print for shutdown to avoid logging format issues
+    await WARMER.stop()
+    PARSE_POOL.shutdown()
     try:
         await SCRAPER.shutdown()
     except Exception:
@@ -672,6 +1876,10 @@ async def lifespan(app: FastAPI):
         await fast_client.aclose()
     except Exception:
         pass
+    try:
+        await scrape_client.aclose()
+    except Exception:
+        pass
     print("Bye.")
 
 app = FastAPI(
@@ -771,51 +1979,197 @@ _PRIVATE_NETS = [
     ipaddress.ip_network("fe80::/10"),
 ]
 
-def is_private_host(host: str) -> bool:
-    # Trusted e-commerce domains (always allow)
-    TRUSTED_DOMAINS = {
-        "aliexpress.com", "ar.aliexpress.com", "www.aliexpress.com",
-        "amazon.com", "amazon.ae", "amazon.sa", "amazon.co.uk", "amazon.de", "amazon.fr",
-        "noon.com", "souq.com", "jumia.com", "daraz.com", "ebay.com", "etsy.com",
-        "shopify.com", "woocommerce.com", "alicdn.com",
-        # --- add these two safe CDNs used in tests/demos ---
-        "via.placeholder.com", "picsum.photos"
-    }
-    
-    # Check if it's a trusted domain first
-    for trusted in TRUSTED_DOMAINS:
-        if host == trusted or host.endswith("." + trusted):
-            return False  # Allow trusted domains
-    
+# Trusted e-commerce domains (always allowed, no DNS check)
+TRUSTED_DOMAINS = {
+    "aliexpress.com", "ar.aliexpress.com", "www.aliexpress.com",
+    "amazon.com", "amazon.ae", "amazon.sa", "amazon.co.uk", "amazon.de", "amazon.fr",
+    "noon.com", "souq.com", "jumia.com", "daraz.com", "ebay.com", "etsy.com",
+    "shopify.com", "woocommerce.com", "alicdn.com",
+    # --- add these two safe CDNs used in tests/demos ---
+    "via.placeholder.com", "picsum.photos"
+}
+
+def _is_trusted_host(host: str) -> bool:
+    return any(host == t or host.endswith("." + t) for t in TRUSTED_DOMAINS)
+
+def _is_ip_literal(host: str) -> bool:
     try:
-        # Resolve all addresses
-        infos = socket.getaddrinfo(host, None)
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+def _any_private(addrs) -> bool:
+    for a in addrs:
+        try:
+            ip = ipaddress.ip_address(a)
+        except ValueError:
+            return True  # unparseable (e.g. scoped v6) -> treat as unsafe
+        if any(ip in net for net in _PRIVATE_NETS):
+            return True
+    return False
+
+class AsyncResolver:
+    """
+    getaddrinfo off the event loop with a positive/negative TTL cache.
+    The system resolver does not expose record TTLs, so successes live for
+    DNS_CACHE_TTL_S and failures for DNS_NEGATIVE_TTL_S. Concurrent lookups
+    of the same host share one in-flight query.
+    """
+    def __init__(self, ttl: float = 60.0, negative_ttl: float = 10.0, capacity: int = 1024):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.capacity = capacity
+        self.od: OrderedDict[str, CacheItem] = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, host: str) -> Optional[Tuple[str, ...]]:
+        """Cached addresses, () for a cached failure, None when unknown."""
+        entry = self.od.get(host)
+        if entry is None:
+            return None
+        if time.monotonic() > entry.expires:
+            del self.od[host]
+            return None
+        self.od.move_to_end(host)
+        return entry.data
+
+    def _store(self, host: str, addrs: Tuple[str, ...]):
+        ttl = self.ttl if addrs else self.negative_ttl
+        self.od[host] = CacheItem(time.monotonic() + ttl, addrs)
+        self.od.move_to_end(host)
+        if len(self.od) > self.capacity:
+            self.od.popitem(last=False)
+
+    @staticmethod
+    def _addresses(infos) -> Tuple[str, ...]:
+        out: List[str] = []
         for fam, _, _, _, sockaddr in infos:
-            if fam == socket.AF_INET:
-                ip = ipaddress.ip_address(sockaddr[0])
-            elif fam == socket.AF_INET6:
-                ip = ipaddress.ip_address(sockaddr[0])
-            else:
-                continue
-            if any(ip in net for net in _PRIVATE_NETS):
-                return True
+            if fam in (socket.AF_INET, socket.AF_INET6) and sockaddr[0] not in out:
+                out.append(sockaddr[0])
+        return tuple(out)
+
+    async def _lookup(self, host: str) -> Tuple[str, ...]:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            addrs = self._addresses(infos)
+        except (OSError, UnicodeError):  # idna rejects e.g. empty or >63-char labels
+            addrs = ()
+        self._store(host, addrs)
+        return addrs
+
+    async def resolve(self, host: str) -> Tuple[str, ...]:
+        """Resolve without blocking the loop; () when resolution failed."""
+        cached = self.cached(host)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        fut = self._inflight.get(host)
+        if fut is None:
+            self.misses += 1
+            fut = asyncio.ensure_future(self._lookup(host))
+            self._inflight[host] = fut
+            fut.add_done_callback(lambda _f: self._inflight.pop(host, None))
+        return await asyncio.shield(fut)
+
+    def resolve_sync(self, host: str) -> Tuple[str, ...]:
+        """Blocking variant for sync callers; shares the same cache."""
+        cached = self.cached(host)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        try:
+            addrs = self._addresses(socket.getaddrinfo(host, None, type=socket.SOCK_STREAM))
+        except (OSError, UnicodeError):  # idna rejects e.g. empty or >63-char labels
+            addrs = ()
+        self._store(host, addrs)
+        return addrs
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.od), "hits": self.hits, "misses": self.misses}
+
+RESOLVER = AsyncResolver(ttl=DNS_CACHE_TTL_S, negative_ttl=DNS_NEGATIVE_TTL_S)
+
+class ResolverBackend(httpcore.AsyncNetworkBackend):
+    """
+    httpcore network backend that connects through RESOLVER, so SSRF
+    validation and the TCP connect share one lookup and the socket goes to
+    exactly the addresses that were validated. TLS still verifies against
+    the original hostname (httpcore passes it as SNI separately).
+    """
+    MAX_ADDRESSES = 3
+
+    def __init__(self):
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if _is_ip_literal(host):
+            addrs: Tuple[str, ...] = (host,)
+        else:
+            addrs = await RESOLVER.resolve(host)
+            if not addrs:
+                raise httpcore.ConnectError(f"DNS resolution failed for {host}")
+        # Every connect is checked, not only the validated first hop:
+        # redirects and re-resolution after the TTL land here too
+        if not _is_trusted_host(host) and _any_private(addrs):
+            raise httpcore.ConnectError(f"Refusing to connect to private address for {host}")
+        last_exc: Optional[Exception] = None
+        for addr in addrs[:self.MAX_ADDRESSES]:
+            try:
+                return await self._backend.connect_tcp(
+                    addr, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as exc:
+                last_exc = exc
+        raise last_exc
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+def _use_resolver(transport: httpx.AsyncHTTPTransport) -> httpx.AsyncHTTPTransport:
+    # httpx does not expose network_backend, so set it on the underlying pool
+    transport._pool._network_backend = ResolverBackend()
+    return transport
+
+def is_private_host(host: str) -> bool:
+    # Check if it's a trusted domain first
+    if _is_trusted_host(host):
+        return False  # Allow trusted domains
+    addrs = RESOLVER.resolve_sync(host)
+    # If resolution fails, treat as unsafe (except for trusted domains)
+    return not addrs or _any_private(addrs)
+
+async def is_private_host_async(host: str) -> bool:
+    """Non-blocking is_private_host; the lookup is reused by the connect."""
+    if _is_trusted_host(host):
         return False
-    except Exception:
-        # If resolution fails, treat as unsafe (except for trusted domains)
-        return True
+    addrs = await RESOLVER.resolve(host)
+    return not addrs or _any_private(addrs)
 
-def validate_public_url(url: str):
-    from urllib.parse import urlparse
+def _check_url_shape(url: str) -> str:
     p = urlparse(url)
     if p.scheme not in {"http", "https"} or p.scheme in _DENY_SCHEMES:
         raise HTTPException(400, detail="Unsupported URL scheme")
     if not p.hostname:
         raise HTTPException(400, detail="Invalid URL")
-    if is_private_host(p.hostname):
+    return p.hostname
+
+def validate_public_url(url: str):
+    if is_private_host(_check_url_shape(url)):
+        raise HTTPException(400, detail="Private or unsafe host blocked")
+
+async def validate_public_url_async(url: str):
+    if await is_private_host_async(_check_url_shape(url)):
         raise HTTPException(400, detail="Private or unsafe host blocked")
 
 # ---------------------- HTTPX client -------------------
-_transport = httpx.AsyncHTTPTransport(retries=1)
+_transport = httpx.AsyncHTTPTransport(retries=1, limits=_POOL_LIMITS)  # images: warmed CDN connections
 client = httpx.AsyncClient(
     timeout=httpx.Timeout(8.0, connect=5.0),
     headers={
@@ -826,6 +2180,112 @@ client = httpx.AsyncClient(
     http2=False,  # Disable http2 to avoid import issues
 )
 
+# Long-lived pool shared by every scraping path (HttpxPage fetches, AE
+# retries, FX rates). httpx keeps a keep-alive pool per origin inside the
+# client, so repeat fetches to a marketplace skip the TCP+TLS handshake.
+_scrape_transport = httpx.AsyncHTTPTransport(retries=0, http2=SCRAPE_HTTP2, limits=_POOL_LIMITS)
+scrape_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(12.0, connect=5.0),
+    follow_redirects=True,
+    transport=_scrape_transport,
+    http2=SCRAPE_HTTP2,
+)
+
+# All outbound clients connect through the shared resolver cache
+for _t in (_fast_transport, _transport, _scrape_transport):
+    _use_resolver(_t)
+
+# ---------------------- Connection warming -------------
+class ConnectionWarmer:
+    """
+    Keeps a few TLS connections open to the marketplace hosts scraped in
+    the last WARM_RECENT_S seconds and to the image CDNs. The partial path
+    has a ~150 ms connect budget, which a cold handshake alone can exceed;
+    re-touching idle connections before keep-alive expiry means repeat
+    requests ride an open connection. The WARM_STOREFRONT_HOSTS count as
+    scraped at start, so the first requests after a deploy are warm too;
+    other hosts nobody scrapes (the allowlist also names platforms such as
+    shopify.com) are never pinged.
+    """
+    MAX_HOSTS = 64
+
+    def __init__(self, per_host: int = 2, interval: float = 20.0, recent_s: float = 600.0):
+        self.per_host = per_host
+        self.interval = interval
+        self.recent_s = recent_s
+        self._task: Optional[asyncio.Task] = None
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # host -> last scrape (monotonic)
+        self.stats_ = {"rounds": 0, "ok": 0, "failed": 0}
+
+    def note(self, host: Optional[str]):
+        """Record a scrape of `host`; it is warmed until WARM_RECENT_S passes without another."""
+        if not host:
+            return
+        self._seen[host.lower()] = time.monotonic()
+        self._seen.move_to_end(host.lower())
+        while len(self._seen) > self.MAX_HOSTS:
+            self._seen.popitem(last=False)
+
+    def recent_hosts(self) -> List[str]:
+        cutoff = time.monotonic() - self.recent_s
+        while self._seen and next(iter(self._seen.values())) < cutoff:
+            self._seen.popitem(last=False)
+        return list(self._seen)
+
+    def targets(self) -> List[Tuple[httpx.AsyncClient, str, int]]:
+        """(client, host, connections): partial and scrape pools for marketplaces, image client for CDNs."""
+        out = []
+        for host in self.recent_hosts():
+            out.append((fast_client, host, self.per_host))
+            out.append((scrape_client, host, 1))
+        for host in WARM_EXTRA_HOSTS.split(","):
+            if host.strip():
+                out.append((client, host.strip().lower(), self.per_host))
+        return out
+
+    async def _touch(self, http: httpx.AsyncClient, host: str):
+        try:
+            # HEAD without redirects: only the connection matters, not the answer
+            await http.head(f"https://{host}/", timeout=httpx.Timeout(5.0), follow_redirects=False)
+            self.stats_["ok"] += 1
+        except Exception:
+            self.stats_["failed"] += 1
+
+    async def warm(self):
+        # Concurrent requests per host force distinct pooled connections;
+        # on refresh they reuse (and extend) the idle ones instead.
+        jobs = [self._touch(http, host) for http, host, n in self.targets() for _ in range(n)]
+        await asyncio.gather(*jobs)
+        self.stats_["rounds"] += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await self.warm()
+            except Exception as e:
+                logger.warning(f"Connection warming failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.per_host > 0 and self._task is None:
+            for host in WARM_STOREFRONT_HOSTS.split(","):
+                self.note(host.strip())
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.per_host > 0, "hosts": len(self._seen), **self.stats_}
+
+WARMER = ConnectionWarmer(per_host=WARM_CONNECTIONS_PER_HOST, interval=WARM_REFRESH_S, recent_s=WARM_RECENT_S)
+
 # ---------------------- Vision client ------------------
 try:
     # Use API key authentication
@@ -889,9 +2349,213 @@ class LruTtlCache:
         if len(self.od) > self.capacity:
             self.od.popitem(last=False)
 
-    def size(self): return len(self.od)
+    def size(self): return len(self.od)
+
+CACHE = LruTtlCache()
+
+# ---------------------- HTTP response cache -------------
+_CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+
+@dataclass
+class CachedResponse:
+    content: bytes  # as received, so it always matches content_type's charset
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: str
+
+    @property
+    def text(self) -> str:
+        """Body decoded with the charset content_type declares (UTF-8 otherwise), as httpx does."""
+        m = _CHARSET.search(self.content_type)
+        try:
+            return self.content.decode(m.group(1) if m else "utf-8", errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+    def conditional_headers(self) -> Dict[str, str]:
+        h = {}
+        if self.etag:
+            h["If-None-Match"] = self.etag
+        if self.last_modified:
+            h["If-Modified-Since"] = self.last_modified
+        return h
+
+class HttpResponseCache:
+    """
+    Validator-aware page cache: keeps bodies that came with an ETag or
+    Last-Modified so the next fetch revalidates with If-None-Match /
+    If-Modified-Since and an unchanged page costs a 304. Entries are keyed
+    on the URL plus the request headers pages vary on (KEY_HEADERS), so a
+    page fetched in another locale or currency is never served back.
+    """
+    # Request headers marketplaces vary the page on: locale and the
+    # currency/region cookies. Vary on anything else is not cached.
+    KEY_HEADERS = ("accept-language", "cookie")
+
+    def __init__(self, capacity=256, max_bytes=64 * 1024 * 1024):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.od: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.revalidated = 0
+        self.refetched = 0
+
+    @classmethod
+    def key(cls, url: str, request_headers) -> str:
+        sent = {k.lower(): v for k, v in (request_headers or {}).items()}
+        varying = "\n".join(sent.get(name, "") for name in cls.KEY_HEADERS)
+        return f"{url}#{hashlib.blake2b(varying.encode(), digest_size=8).hexdigest()}"
+
+    def get(self, url: str, request_headers=None) -> Optional[CachedResponse]:
+        key = self.key(url, request_headers)
+        entry = self.od.get(key)
+        if entry is not None:
+            self.od.move_to_end(key)
+        return entry
+
+    def _drop(self, key: str):
+        old = self.od.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old.content)
+
+    def store(self, url: str, request_headers, headers, content: bytes):
+        """Remember `content` if the response is revalidatable; forget it otherwise."""
+        key = self.key(url, request_headers)
+        self._drop(key)
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if not (etag or last_modified) or "no-store" in (headers.get("cache-control") or "").lower():
+            return
+        vary = {v.strip().lower() for v in (headers.get("vary") or "").split(",") if v.strip()}
+        if vary - {"accept-encoding", *self.KEY_HEADERS}:
+            return  # varies on something the key does not carry (or "*")
+        if len(content) > self.max_bytes // 8:
+            return
+        self.od[key] = CachedResponse(content, etag, last_modified, headers.get("content-type") or "text/html")
+        self.bytes += len(content)
+        while self.od and (len(self.od) > self.capacity or self.bytes > self.max_bytes):
+            _, old = self.od.popitem(last=False)
+            self.bytes -= len(old.content)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.od), "bytes": self.bytes,
+                "revalidated_304": self.revalidated, "refetched": self.refetched}
+
+HTTP_CACHE = HttpResponseCache(
+    capacity=int(os.getenv("HTTP_CACHE_ENTRIES", "256")),
+    max_bytes=int(os.getenv("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+async def cached_get_text(url: str, headers: Dict[str, str], timeout: float) -> str:
+    """GET a page through scrape_client, revalidating against HTTP_CACHE."""
+    cached = HTTP_CACHE.get(url, headers)
+    req_headers = {**headers, **cached.conditional_headers()} if cached else headers
+    WARMER.note(urlparse(url).hostname)
+    r = await scrape_client.get(url, headers=req_headers, timeout=timeout)
+    if r.status_code == 304 and cached:
+        HTTP_CACHE.revalidated += 1
+        return cached.text
+    r.raise_for_status()
+    if cached:
+        HTTP_CACHE.refetched += 1
+    HTTP_CACHE.store(url, headers, r.headers, r.content)
+    return r.text
+
+# Response headers that no longer describe a body re-served via route.fulfill
+_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+async def conditional_document_route(route):
+    """
+    Playwright route handler applying HTTP_CACHE to top-level documents.
+    Subresources fall through to any other handler (or the network).
+    """
+    request = route.request
+    if request.resource_type != "document" or request.method != "GET":
+        await route.fallback()
+        return
+    # all_headers() carries the cookies, which request.headers leaves out
+    sent = await request.all_headers()
+    cached = HTTP_CACHE.get(request.url, sent)
+    # Revalidate with exactly what was sent (cookies included), so a 200 is
+    # the same locale/currency page as the key it is stored under
+    headers = {**sent, **cached.conditional_headers()} if cached else None
+    try:
+        response = await route.fetch(headers=headers, max_redirects=0)
+    except Exception:
+        await route.fallback()
+        return
+    if response.status == 304 and cached:
+        HTTP_CACHE.revalidated += 1
+        await route.fulfill(status=200, content_type=cached.content_type, body=cached.content)
+        return
+    # Raw bytes both ways: a decoded str would be re-encoded as UTF-8
+    # while the forwarded content-type still names the original charset
+    body = await response.body()
+    if response.status == 200:
+        if cached:
+            HTTP_CACHE.refetched += 1
+        HTTP_CACHE.store(request.url, sent, response.headers, body)
+    headers_out = {k: v for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS}
+    await route.fulfill(status=response.status, headers=headers_out, body=body)
+
+# ---------------------- Request coalescing -------------
+_TRACKING_PARAMS = {"spm", "scm", "gclid", "fbclid", "gatewayadapt", "btsid", "ws_ab_test", "sk", "ref"}
+_TRACKING_PREFIXES = ("utm_", "aff_", "algo_", "_randl_", "pdp_")
+
+def canonical_url(url: str) -> str:
+    """Stable key for a product URL: lower-cased origin, no fragment, no tracking params."""
+    p = urlparse(url)
+    host = (p.hostname or "").lower()
+    if p.port and not ((p.scheme == "http" and p.port == 80) or (p.scheme == "https" and p.port == 443)):
+        host = f"{host}:{p.port}"
+    query = sorted(
+        (k, v) for k, vs in parse_qs(p.query, keep_blank_values=True).items() for v in vs
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith(_TRACKING_PREFIXES)
+    )
+    qs = "&".join(f"{k}={v}" for k, v in query)
+    return f"{p.scheme.lower()}://{host}{p.path or '/'}" + (f"?{qs}" if qs else "")
+
+@dataclass
+class _Flight:
+    task: asyncio.Future
+    waiters: int = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one shared task; every
+    waiter receives the same result or exception. Cancelling a waiter only
+    detaches it - the shared work is cancelled once its last waiter leaves.
+    """
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.joined = 0
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, factory):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t, k=key, f=flight: self._forget(k, f))
+            self.leaders += 1
+        else:
+            self.joined += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "joined": self.joined}
 
-CACHE = LruTtlCache()
+FLIGHTS = SingleFlight()
 
 # ---------------------- Currency Converter --------------
 class CurrencyConverter:
@@ -903,12 +2567,11 @@ class CurrencyConverter:
 
     async def update(self):
         try:
-            async with httpx.AsyncClient(timeout=5.0) as c:
-                r = await c.get("https://api.exchangerate-api.com/v4/latest/USD")
-                if r.status_code == 200:
-                    data = r.json()
-                    self.exchange = data.get("rates", {}) or {}
-                    self.last_update = datetime.utcnow()
+            r = await scrape_client.get("https://api.exchangerate-api.com/v4/latest/USD", timeout=5.0)
+            if r.status_code == 200:
+                data = r.json()
+                self.exchange = data.get("rates", {}) or {}
+                self.last_update = datetime.utcnow()
         except Exception as e:
             logger.warning(f"Exchange update failed: {e}")
 
@@ -993,21 +2656,166 @@ class CurrencyConverter:
 
 CURRENCY = CurrencyConverter()
 
+# ---------------------- Price scanning ------------------
+@dataclass(frozen=True)
+class PriceRule:
+    name: str
+    starts: Tuple[str, ...]  # lowercase literals a match begins with ("" = anchorless)
+    pattern: "re.Pattern"
+
+def _rule(name: str, starts: Tuple[str, ...], pattern: str) -> PriceRule:
+    return PriceRule(name, starts, re.compile(pattern, re.I))
+
+_NUM = r'(?P<price>\d[\d\.,]*)'
+
+# Every price pattern the extractors use, keyed by name. Each consumer
+# applies its own priority order over the names.
+PRICE_RULES = {r.name: r for r in [
+    _rule("amazon_offscreen", ('aok-offscreen">',), r'aok-offscreen">\$?' + _NUM + '<'),
+    _rule("asin_attr", ("data-asin-price",), r'data-asin-price\s*=\s*"' + _NUM + '"'),
+    _rule("json_price", ('"price"',), r'"price"\s*:\s*"?' + _NUM + '"?'),
+    _rule("json_current_price", ('"currentprice"',), r'"currentPrice"\s*:\s*"?' + _NUM + '"?'),
+    _rule("json_price_value", ('"pricevalue"',), r'"priceValue"\s*:\s*"?' + _NUM + '"?'),
+    _rule("price_assign", ("price",), r'price\s*[:=]\s*"?' + _NUM + '"?'),
+    _rule("data_price", ("data-price",), r'data-price\s*=\s*"' + _NUM + '"'),
+    _rule("data_current_price", ("data-current-price",), r'data-current-price\s*=\s*"' + _NUM + '"'),
+    _rule("meta_product_price", ('product:price:amount"',), r'product:price:amount"\s*content="\s*' + _NUM),
+    _rule("meta_og_price", ('og:price:amount"',), r'og:price:amount"\s*content="\s*' + _NUM),
+    _rule("generic", ("",), r'\$?\s*(?P<price>\d{1,4}(?:[,]\d{3})*(?:\.\d{1,2})?)'),  # generic $999.99
+    # Site-specific JSON fields
+    _rule("json_trade_price", ('"tradeprice"',), r'"tradePrice"\s*:\s*"' + _NUM + '"'),
+    _rule("json_discounted_price", ('"discountedprice"',), r'"discountedPrice"\s*:\s*"' + _NUM + '"'),
+    _rule("json_sale_price", ('"saleprice"',), r'"salePrice"\s*:\s*"' + _NUM + '"'),
+    _rule("ae_act_sku_cal_price", ('"skuval"',), r'"skuVal"\s*:\s*{[^}]*"actSkuCalPrice"\s*:\s*"(?P<price>[^"]+)"'),
+    _rule("ae_sku_cal_price", ('"skuval"',), r'"skuVal"\s*:\s*{[^}]*"skuCalPrice"\s*:\s*"(?P<price>[^"]+)"'),
+    _rule("ae_current_price_text", ('"currentprice"',), r'"currentPrice"\s*:\s*"(?P<price>[^"]+)"'),
+    _rule("ae_price_text", ('"price"',), r'"price"\s*:\s*"(?P<price>[^"]+)"'),
+    _rule("json_price_amount", ('"priceamount"',), r'"priceAmount"\s*:\s*"' + _NUM + '"'),
+    _rule("json_offer_price", ('"offerprice"',), r'"offerPrice"\s*:\s*"' + _NUM + '"'),
+    _rule("json_price_quoted", ('"price"',), r'"price"\s*:\s*"' + _NUM + '"'),
+    # Partial path (see QUICK_PRICE_PATTERNS)
+    _rule("quick_price", ('"price"', '"currentprice"', '"saleprice"'), QUICK_PRICE_PATTERNS[0]),
+    _rule("quick_sku_cal_price", ('"skucalprice"', '"actskucalprice"'), QUICK_PRICE_PATTERNS[1]),
+]}
+
+@dataclass
+class PriceCandidate:
+    rule: str
+    offset: int
+    end: int
+    raw: str
+
+class PriceScan:
+    """Candidates of one document, grouped per rule in document order."""
+    def __init__(self, html: str, candidates: List[PriceCandidate], scripts: List[Tuple[int, int]]):
+        self.html = html
+        self.scripts = scripts  # (start, end) of each <script> body
+        self.by_rule: Dict[str, List[PriceCandidate]] = defaultdict(list)
+        for c in sorted(candidates, key=lambda c: c.offset):
+            self.by_rule[c.rule].append(c)
+        self._offsets = {rule: [c.offset for c in cs] for rule, cs in self.by_rule.items()}
+
+    def first(self, rule: str, start: int = 0, end: Optional[int] = None) -> Optional[PriceCandidate]:
+        """Earliest match of `rule` lying inside html[start:end] (re.search semantics)."""
+        end = len(self.html) if end is None else end
+        if PRICE_RULES[rule].starts == ("",):
+            # Anchorless (generic number): only scanned when a consumer gets this far
+            m = PRICE_RULES[rule].pattern.search(self.html, start, end)
+            return PriceCandidate(rule, m.start(), m.end(), m.group("price")) if m else None
+        cands = self.by_rule.get(rule, [])
+        for c in cands[bisect.bisect_left(self._offsets.get(rule, []), start):]:
+            if c.offset >= end:
+                break
+            if c.end <= end:
+                return c
+        return None
+
+class PriceScanner:
+    """
+    One-pass price candidate scanner. Every anchored rule starts with a
+    literal containing one of ANCHORS, so the document is lowercased once
+    and only the anchor hits are searched (str.find); rules are then
+    matched at the implied start offsets. Script body spans are collected
+    in the same pass for the inline-JSON tier.
+    """
+    ANCHORS = ("price", "skuval", "aok-offscreen")
+
+    def __init__(self, rules: Dict[str, PriceRule]):
+        by_lit: Dict[str, List[PriceRule]] = defaultdict(list)
+        for rule in rules.values():
+            for lit in rule.starts:
+                if lit:
+                    by_lit[lit].append(rule)
+        # anchor -> char before the anchor ("" = literal starts at it) -> entries,
+        # so each hit only checks the few literals that can surround it
+        self.index: Dict[str, Dict[str, List[Tuple[str, int, List[PriceRule]]]]] = defaultdict(lambda: defaultdict(list))
+        for lit, lit_rules in by_lit.items():
+            key = next((a for a in self.ANCHORS if a in lit), lit)
+            k = lit.index(key)
+            self.index[key][lit[k - 1] if k else ""].append((lit, k, lit_rules))
+
+    @staticmethod
+    def _hits(html: str, lower: str, key: str):
+        if lower is not html:
+            i = lower.find(key)
+            while i != -1:
+                yield i
+                i = lower.find(key, i + 1)
+        else:  # lowercasing changed offsets (e.g. "İ"): fall back to a regex
+            for m in re.finditer(re.escape(key), html, re.I):
+                yield m.start()
+
+    @staticmethod
+    def _script_spans(lower: str) -> List[Tuple[int, int]]:
+        spans = []
+        i = lower.find("<script")
+        while i != -1:
+            body = lower.find(">", i)
+            close = lower.find("</script>", body) if body != -1 else -1
+            if close == -1:
+                break
+            spans.append((body + 1, close))
+            i = lower.find("<script", close)
+        return spans
+
+    def scan(self, html: str) -> PriceScan:
+        lower = html.lower()
+        if len(lower) != len(html):
+            lower = html  # offsets must line up with html; _hits switches to a regex
+        aligned = lower is not html
+        out: List[PriceCandidate] = []
+        for key, by_prev in self.index.items():
+            at_anchor = by_prev.get("", [])
+            for p in self._hits(html, lower, key):
+                before = by_prev.get(lower[p - 1], []) if p else []
+                for lit, k, lit_rules in (at_anchor + before if before else at_anchor):
+                    s = p - k
+                    if s < 0:
+                        continue
+                    if not (lower.startswith(lit, s) if aligned else html[s:s + len(lit)].lower() == lit):
+                        continue
+                    for rule in lit_rules:
+                        m = rule.pattern.match(html, s)
+                        if m:
+                            out.append(PriceCandidate(rule.name, s, m.end(), m.group("price")))
+        return PriceScan(html, out, self._script_spans(lower))
+
+PRICE_SCANNER = PriceScanner(PRICE_RULES)
+
 # ---------------------- Price Extractor -----------------
 class PriceExtractor:
-    PRICE_PATTERNS = [
-        r'aok-offscreen">\$?(?P<price>\d[\d\.,]*)<',           # Amazon DOM
-        r'data-asin-price\s*=\s*"(?P<price>\d[\d\.,]*)"',      # Amazon attr
-        r'"price"\s*:\s*"?(?P<price>\d[\d\.,]*)"?',
-        r'"currentPrice"\s*:\s*"?(?P<price>\d[\d\.,]*)"?',
-        r'"priceValue"\s*:\s*"?(?P<price>\d[\d\.,]*)"?',
-        r'price\s*[:=]\s*"?(?P<price>\d[\d\.,]*)"?',
-        r'data-price\s*=\s*"(?P<price>\d[\d\.,]*)"',
-        r'data-current-price\s*=\s*"(?P<price>\d[\d\.,]*)"',
-        r'product:price:amount"\s*content="\s*(?P<price>\d[\d\.,]*)',
-        r'og:price:amount"\s*content="\s*(?P<price>\d[\d\.,]*)',
-        r'\$?\s*(?P<price>\d{1,4}(?:[,]\d{3})*(?:\.\d{1,2})?)',  # generic $999.99
-    ]
+    # Priority order shared by the inline-JSON and whole-page regex tiers
+    PRICE_RULE_ORDER = (
+        "amazon_offscreen", "asin_attr", "json_price", "json_current_price", "json_price_value",
+        "price_assign", "data_price", "data_current_price", "meta_product_price", "meta_og_price",
+        "generic",
+    )
+    SITE_RULES = {
+        "aliexpress": ("json_trade_price", "json_discounted_price", "json_sale_price",
+                       "ae_act_sku_cal_price", "ae_sku_cal_price", "ae_current_price_text", "ae_price_text"),
+        "amazon": ("json_price_amount",),
+        "regional": ("json_offer_price", "json_price_quoted", "json_sale_price"),
+    }
 
     @staticmethod
     def _clean_price(val: str) -> Optional[float]:
@@ -1028,50 +2836,35 @@ class PriceExtractor:
             return None
 
     @staticmethod
-    def from_jsonld(html: str) -> Optional[Dict[str, Any]]:
+    def from_jsonld(html) -> Optional[Dict[str, Any]]:
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            for s in soup.find_all("script", type="application/ld+json"):
-                try:
-                    data = json.loads(s.string or "{}")
-                except Exception:
-                    continue
-                nodes = data if isinstance(data, list) else [data]
-                for node in nodes:
-                    if not isinstance(node, dict):
-                        continue
-                    types = node.get("@type") or node.get("@graph", [{}])[0].get("@type")
-                    tset = {types.lower()} if isinstance(types, str) else {str(t).lower() for t in (types or [])}
-                    if "product" in tset:
-                        offers = node.get("offers")
-                        if isinstance(offers, dict):
-                            p = offers.get("price")
-                            c = offers.get("priceCurrency", "USD")
-                            amount = PriceExtractor._clean_price(str(p) if p is not None else "")
-                            if amount:
-                                return {"amount": amount, "currency": c, "source": "jsonld_offers"}
-                        elif isinstance(offers, list):
-                            for off in offers:
-                                p = off.get("price")
-                                c = off.get("priceCurrency", "USD")
-                                amount = PriceExtractor._clean_price(str(p) if p is not None else "")
-                                if amount:
-                                    return {"amount": amount, "currency": c, "source": "jsonld_offers"}
+            for node in ParsedDocument.of(html).jsonld_products:
+                offers = node.get("offers")
+                if isinstance(offers, dict):
+                    p = offers.get("price")
+                    c = offers.get("priceCurrency", "USD")
+                    amount = PriceExtractor._clean_price(str(p) if p is not None else "")
+                    if amount:
+                        return {"amount": amount, "currency": c, "source": "jsonld_offers"}
+                elif isinstance(offers, list):
+                    for off in offers:
+                        p = off.get("price")
+                        c = off.get("priceCurrency", "USD")
+                        amount = PriceExtractor._clean_price(str(p) if p is not None else "")
+                        if amount:
+                            return {"amount": amount, "currency": c, "source": "jsonld_offers"}
         except Exception:
             pass
         return None
 
     @staticmethod
-    def from_meta(html: str) -> Optional[Dict[str, Any]]:
+    def from_meta(html) -> Optional[Dict[str, Any]]:
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            m = soup.select_one('meta[property="product:price:amount"], meta[property="og:price:amount"]')
-            if m and m.get("content"):
-                amount = PriceExtractor._clean_price(m["content"])
-                cur = "USD"
-                cmeta = soup.select_one('meta[property="product:price:currency"], meta[property="og:price:currency"]')
-                if cmeta and cmeta.get("content"):
-                    cur = cmeta["content"]
+            doc = ParsedDocument.of(html)
+            content = doc.meta_first(("property", "product:price:amount"), ("property", "og:price:amount"))
+            if content:
+                amount = PriceExtractor._clean_price(content)
+                cur = doc.meta_first(("property", "product:price:currency"), ("property", "og:price:currency")) or "USD"
                 if amount:
                     return {"amount": amount, "currency": cur, "source": "meta"}
         except Exception:
@@ -1079,120 +2872,975 @@ class PriceExtractor:
         return None
 
     @staticmethod
-    def from_inline_json(html: str) -> Optional[Dict[str, Any]]:
+    def from_inline_json(html) -> Optional[Dict[str, Any]]:
         # Pull out big script blobs commonly used by AE/Amazon/etc.
         try:
-            blobs = re.findall(r"<script[^>]*>(.*?)</script>", html, flags=re.S | re.I)
-            for blob in blobs:
-                for patt in PriceExtractor.PRICE_PATTERNS:
-                    m = re.search(patt, blob, flags=re.I)
-                    if m:
-                        amount = PriceExtractor._clean_price(m.group("price"))
+            scan = ParsedDocument.of(html).price_scan
+            for start, end in scan.scripts:
+                for rule in PriceExtractor.PRICE_RULE_ORDER:
+                    c = scan.first(rule, start, end)
+                    if c:
+                        amount = PriceExtractor._clean_price(c.raw)
                         if amount:
                             # Try currency near it
-                            tail = blob[max(0, m.start()-80): m.end()+80]
+                            tail = scan.html[max(start, c.offset - 80): min(end, c.end + 80)]
                             _, cur = CURRENCY.extract_price_and_currency(tail)
                             return {"amount": amount, "currency": cur, "source": "inline_json"}
         except Exception:
             pass
         return None
 
+    DOM_PRICE_SELECTORS = (
+        ".a-price .a-offscreen", ".a-price-whole", ".a-price .a-price-whole",
+        ".price, .product-price, .price-current, .price__current, .price-amount, .price-display, .product__price",
+        ".priceToPay .a-price .a-offscreen"
+    )
+
+    # Everything the DOM fallbacks read, gathered in one page.evaluate
+    # round trip: title, img srcs, the first video src and the text of the
+    # first match of each price selector (invalid selectors are skipped).
+    PAGE_SNAPSHOT_JS = """(priceSelectors) => {
+        const first = (sel) => { try { return document.querySelector(sel); } catch (e) { return null; } };
+        const prices = {};
+        for (const sel of priceSelectors) {
+            const el = first(sel);
+            if (el && el.textContent) prices[sel] = el.textContent;
+        }
+        const v = first("video source, video");
+        return {
+            title: document.title,
+            images: Array.from(document.images, (e) => e.src).filter(Boolean),
+            video: v ? (v.src || v.currentSrc || null) : null,
+            prices,
+        };
+    }"""
+
+    @staticmethod
+    async def page_snapshot(page) -> Dict[str, Any]:
+        try:
+            snap = await page.evaluate(PriceExtractor.PAGE_SNAPSHOT_JS, list(PriceExtractor.DOM_PRICE_SELECTORS))
+        except Exception as e:
+            logger.debug(f"page snapshot failed: {e}")
+            snap = None
+        return snap if isinstance(snap, dict) else {}
+
+    @staticmethod
+    def from_dom_texts(texts: Optional[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """Price from {selector: textContent}, in DOM_PRICE_SELECTORS priority."""
+        for sel in PriceExtractor.DOM_PRICE_SELECTORS:
+            txt = (texts or {}).get(sel)
+            if txt:
+                amt, cur = CURRENCY.extract_price_and_currency(txt.strip())
+                if amt > 0:
+                    return {"amount": amt, "currency": cur, "source": f"selector:{sel}"}
+        return None
+
     @staticmethod
-    async def from_dom_selectors(page_like, html: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    async def from_dom_selectors(page_like, html=None) -> Optional[Dict[str, Any]]:
         # Works with real Playwright page or HttpxPage mock
-        selectors = [
-            ".a-price .a-offscreen", ".a-price-whole", ".a-price .a-price-whole",
-            ".price, .product-price, .price-current, .price__current, .price-amount, .price-display, .product__price",
-            ".priceToPay .a-price .a-offscreen"
-        ]
-        for sel in selectors:
-            try:
-                txt = await page_like.eval_on_selector(sel, "el => el && el.textContent", strict=False)
-                if txt:
-                    amt, cur = CURRENCY.extract_price_and_currency(txt.strip())
-                    if amt > 0:
-                        return {"amount": amt, "currency": cur, "source": f"selector:{sel}"}
-            except Exception:
-                continue
+        static = getattr(page_like, "document", None)
+        if isinstance(static, ParsedDocument):
+            # HttpxPage: its cached tree answers every selector in one walk below
+            html = static
+        else:
+            # Live page: every selector in one evaluate, not one IPC each
+            snap = await PriceExtractor.page_snapshot(page_like)
+            hit = PriceExtractor.from_dom_texts(snap.get("prices"))
+            if hit:
+                return hit
         # As a last resort, scan HTML if provided
         if html:
-            try:
-                soup = BeautifulSoup(html, "html.parser")
-                for sel in selectors:
-                    el = soup.select_one(sel)
-                    if el:
-                        amt, cur = CURRENCY.extract_price_and_currency(el.get_text(" ", strip=True))
-                        if amt > 0:
-                            return {"amount": amt, "currency": cur, "source": f"selector_html:{sel}"}
-            except Exception:
-                pass
+            return PriceExtractor.from_dom_html(html)
+        return None
+
+    @staticmethod
+    def from_dom_html(html) -> Optional[Dict[str, Any]]:
+        selectors = PriceExtractor.DOM_PRICE_SELECTORS
+        try:
+            found = ParsedDocument.of(html).select_first_each(selectors)
+            for sel in selectors:
+                el = found.get(sel)
+                if el:
+                    amt, cur = CURRENCY.extract_price_and_currency(el.get_text(" ", strip=True))
+                    if amt > 0:
+                        return {"amount": amt, "currency": cur, "source": f"selector_html:{sel}"}
+        except Exception:
+            pass
         return None
 
     @staticmethod
-    def site_specific(domain: str, html: str) -> Optional[Dict[str, Any]]:
+    def _first_priced(scan: "PriceScan", rules) -> Optional[Tuple[float, PriceCandidate]]:
+        # Per rule, only its earliest match is considered (re.search semantics)
+        for rule in rules:
+            c = scan.first(rule)
+            if c:
+                amount = PriceExtractor._clean_price(c.raw)
+                if amount:
+                    return amount, c
+        return None
+
+    @staticmethod
+    def site_specific(domain: str, html) -> Optional[Dict[str, Any]]:
         d = domain.lower()
         try:
+            scan = ParsedDocument.of(html).price_scan
             if "aliexpress" in d:
                 # AE has "runParams" or "meta" blocks with price/currentPrice
-                for patt in [
-                    r'"tradePrice"\s*:\s*"(?P<price>\d[\d\.,]*)"',
-                    r'"discountedPrice"\s*:\s*"(?P<price>\d[\d\.,]*)"',
-                    r'"salePrice"\s*:\s*"(?P<price>\d[\d\.,]*)"',
-                    r'"skuVal"\s*:\s*{[^}]*"actSkuCalPrice"\s*:\s*"(?P<price>[^"]+)"',
-                    r'"skuVal"\s*:\s*{[^}]*"skuCalPrice"\s*:\s*"(?P<price>[^"]+)"',
-                    r'"currentPrice"\s*:\s*"(?P<price>[^"]+)"',
-                    r'"price"\s*:\s*"(?P<price>[^"]+)"',
-                ]:
-                    m = re.search(patt, html, flags=re.I|re.S)
-                    if m:
-                        amount = PriceExtractor._clean_price(m.group("price"))
-                        if amount:
-                            return {"amount": amount, "currency": "USD", "source": "aliexpress"}
+                hit = PriceExtractor._first_priced(scan, PriceExtractor.SITE_RULES["aliexpress"])
+                if hit:
+                    return {"amount": hit[0], "currency": "USD", "source": "aliexpress"}
             if "amazon." in d:
                 # Amazon offscreen span contains price; fallback to JSON
-                m = re.search(r'"priceAmount"\s*:\s*"(?P<price>\d[\d\.,]*)"', html, re.I)
-                if m:
-                    amount = PriceExtractor._clean_price(m.group("price"))
-                    if amount:
-                        return {"amount": amount, "currency": "USD", "source": "amazon_json"}
+                hit = PriceExtractor._first_priced(scan, PriceExtractor.SITE_RULES["amazon"])
+                if hit:
+                    return {"amount": hit[0], "currency": "USD", "source": "amazon_json"}
             if "daraz." in d or "noon." in d:
-                for patt in [
-                    r'"offerPrice"\s*:\s*"(?P<price>\d[\d\.,]*)"',
-                    r'"price"\s*:\s*"(?P<price>\d[\d\.,]*)"',
-                    r'"salePrice"\s*:\s*"(?P<price>\d[\d\.,]*)"',
-                ]:
-                    m = re.search(patt, html, re.I)
-                    if m:
-                        amount = PriceExtractor._clean_price(m.group("price"))
-                        if amount:
-                            return {"amount": amount, "currency": "USD", "source": "regional_json"}
+                hit = PriceExtractor._first_priced(scan, PriceExtractor.SITE_RULES["regional"])
+                if hit:
+                    return {"amount": hit[0], "currency": "USD", "source": "regional_json"}
         except Exception:
             pass
         return None
 
     @staticmethod
-    def generic_regex(html: str) -> Optional[Dict[str, Any]]:
-        for patt in PriceExtractor.PRICE_PATTERNS:
-            m = re.search(patt, html, flags=re.I)
-            if m:
-                amount = PriceExtractor._clean_price(m.group("price"))
-                if amount:
-                    _, cur = CURRENCY.extract_price_and_currency(m.group(0))
-                    return {"amount": amount, "currency": cur, "source": "regex"}
+    def generic_regex(html) -> Optional[Dict[str, Any]]:
+        scan = ParsedDocument.of(html).price_scan
+        hit = PriceExtractor._first_priced(scan, PriceExtractor.PRICE_RULE_ORDER)
+        if hit:
+            amount, c = hit
+            _, cur = CURRENCY.extract_price_and_currency(scan.html[c.offset:c.end])
+            return {"amount": amount, "currency": cur, "source": "regex"}
+        return None
+
+# ---------------------- Parse executor -------
+def _parse_worker_ready() -> None:
+    """No-op submitted once per worker at startup: spawns it and imports this module there."""
+    return None
+
+class ParseExecutor:
+    """Runs CPU-bound page parsing off the event loop.
+
+    mode "inline" parses on the loop (the old behaviour), "thread" in a
+    thread pool and "process" in a process pool sized to the cores, so a
+    2 MB product page no longer stalls every other request. Work functions
+    are module-level, take the HTML as bytes and return plain dicts, which
+    keeps the process-pool round trip to two small pickles.
+    """
+
+    def __init__(self, mode: str = "thread", workers: int = 2):
+        self.mode = mode if mode in ("inline", "thread", "process") else "thread"
+        self.workers = max(1, workers)
+        self._pool: Optional[Executor] = None
+        self.runs = 0
+        self.inline_runs = 0
+        self.restarts = 0
+        self.busy_ms = 0.0
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                # spawn: forking a process that runs an event loop and
+                # Playwright's driver threads is not safe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+        return self._pool
+
+    async def start(self):
+        """
+        Create the pool and bring every worker up before traffic arrives.
+        A spawned worker takes ~2 s to start and import this module, far
+        past PARTIAL_TIMEOUT_MS, so the first requests must not pay for it.
+        """
+        if self.mode == "inline":
+            return
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        await asyncio.gather(*(loop.run_in_executor(pool, _parse_worker_ready) for _ in range(self.workers)))
+
+    async def run(self, fn, *args):
+        self.runs += 1
+        start = time.perf_counter()
+        try:
+            if self.mode == "inline":
+                self.inline_runs += 1
+                return fn(*args)
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor(), fn, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM, segfault in a parser): replace the
+                # pool for the next call and finish this one on the loop
+                logger.warning("parse pool broken; restarting")
+                self.restarts += 1
+                self._pool = None
+                self.inline_runs += 1
+                return fn(*args)
+        finally:
+            self.busy_ms += (time.perf_counter() - start) * 1000
+
+    def wire(self, html: str):
+        """HTML as a worker argument: bytes only when it must be pickled to another process."""
+        return html.encode("utf-8") if self.mode == "process" else html
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers if self.mode != "inline" else 0,
+            "runs": self.runs,
+            "inline_runs": self.inline_runs,
+            "restarts": self.restarts,
+            "avg_ms": round(self.busy_ms / self.runs, 2) if self.runs else None,
+        }
+
+PARSE_POOL = ParseExecutor(PARSE_EXECUTOR, PARSE_WORKERS)
+
+# Bump whenever an extractor changes what it returns for the same HTML
+EXTRACTOR_VERSION = "1"
+
+class ParseResultCache:
+    """
+    LRU of parse outputs keyed by a hash of the response body, so the same
+    page fetched again by partial, full and the background job is parsed
+    once. Keys also carry the worker name, its extra arguments and
+    EXTRACTOR_VERSION; values are deep-copied in and out because callers
+    mutate the dicts they get back.
+    """
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.od: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(fn, body, *args) -> str:
+        if isinstance(body, ParsedDocument):
+            body = body.html
+        if isinstance(body, str):
+            body = body.encode("utf-8", "ignore")
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        return f"{fn.__name__}:{EXTRACTOR_VERSION}:{digest}:" + "|".join(map(str, args))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.od.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.od.move_to_end(key)
+        return copy.deepcopy(entry)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if self.capacity <= 0:
+            return
+        self.od[key] = copy.deepcopy(value)
+        self.od.move_to_end(key)
+        while len(self.od) > self.capacity:
+            self.od.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"entries": len(self.od), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None}
+
+PARSE_CACHE = ParseResultCache(PARSE_CACHE_ENTRIES)
+
+async def cached_parse(fn, body, *args) -> Dict[str, Any]:
+    """PARSE_POOL.run(fn, body, *args), answered from PARSE_CACHE when the body was seen before."""
+    if PARSE_CACHE.capacity <= 0:
+        return await PARSE_POOL.run(fn, body, *args)
+    key = ParseResultCache.key(fn, body, *args)
+    hit = PARSE_CACHE.get(key)
+    if hit is not None:
+        return hit
+    out = await PARSE_POOL.run(fn, body, *args)
+    PARSE_CACHE.set(key, out)
+    return out
+
+def _as_document(body, url: str = "") -> "ParsedDocument":
+    if isinstance(body, ParsedDocument):
+        return body
+    if isinstance(body, (bytes, bytearray)):
+        body = bytes(body).decode("utf-8", "ignore")
+    return ParsedDocument(body, url)
+
+def parse_head(body) -> Dict[str, Any]:
+    """Pool worker: quick_parse_head on raw HTML (str, or bytes from another process)."""
+    if isinstance(body, (bytes, bytearray)):
+        body = bytes(body).decode("utf-8", "ignore")
+    return quick_parse_head(body)
+
+def _static_page_fallbacks(doc: "ParsedDocument", details: Dict[str, Any]):
+    """Title/images/video the way HttpxPage emulates page.title() and eval_on_selector(_all)."""
+    if not details.get("title"):
+        details["title"] = doc.title
+    if not details.get("images"):
+        srcs = (e.get("src") or e.get("data-src") or "" for e in doc.select("img"))
+        details["images"] = list(dict.fromkeys(urljoin(doc.url, s) for s in srcs if s))[:12]
+    if not details.get("video"):
+        el = doc.select_one("video source, video")
+        if el is None:
+            details["video"] = None
+        elif el.get("src") or el.get("data-src"):
+            details["video"] = urljoin(doc.url, el.get("src") or el.get("data-src"))
+        else:
+            details["video"] = el.get_text(" ", strip=True) or None
+
+def parse_product_static(body, url: str, static_page: bool = False) -> Dict[str, Any]:
+    """Pool worker: every extractor that needs only the HTML.
+
+    Returns the product fields plus the static price tiers the caller
+    splices around its live-DOM selector lookup, in priority order:
+    "_price_early" (JSON-LD, meta, site rules), "_price_dom" (selector scan
+    of the HTML) and "_price_late" (inline JSON, regex). Tiers after the
+    first hit are not computed. With static_page (the httpx fallback) the
+    title/images/video fallbacks are filled here too, from the same tree.
+    """
+    doc = _as_document(body, url)
+    domain = urlparse(url).netloc.lower()
+    if "aliexpress." in domain:
+        ae = _parse_aliexpress(doc)
+        details = {
+            "title": ae.get("title",""),
+            "images": ae.get("images",[]),
+            "price_amount": ae.get("price_amount"),
+            "price_currency": ae.get("price_currency","USD"),
+            "specifications": ae.get("specifications",{}),
+            "breadcrumbs": ae.get("breadcrumbs",[]),
+        }
+    else:
+        details = SCRAPER._parse_jsonld_product(doc)
+    if details.get("price_amount") is None:
+        tiers = (
+            ("_price_early", lambda: (PriceExtractor.from_jsonld(doc)
+                                      or PriceExtractor.from_meta(doc)
+                                      or PriceExtractor.site_specific(domain, doc))),
+            ("_price_dom", lambda: PriceExtractor.from_dom_html(doc)),
+            ("_price_late", lambda: (PriceExtractor.from_inline_json(doc)
+                                     or PriceExtractor.generic_regex(doc))),
+        )
+        for key, tier in tiers:
+            hit = tier()
+            if hit:
+                details[key] = hit
+                break
+    if static_page:
+        _static_page_fallbacks(doc, details)
+    return details
+
+# ---------------------- AliExpress mirror racing -------
+@dataclass
+class MirrorHealth:
+    failures: int = 0
+    retry_at: float = 0.0
+    latency: float = 0.0  # EWMA of successful fetches, seconds
+
+class MirrorRacer:
+    """
+    Races AliExpress storefronts for one item page with bounded fan-out.
+    The first response passing `accept` wins and the others are cancelled.
+    Storefronts that fail or serve skeleton pages back off exponentially
+    per origin instead of the old fixed sleeps between attempts.
+    """
+    def __init__(self, fanout: int = 2, base_backoff: float = 2.0, max_backoff: float = 120.0, timeout: float = 15.0):
+        self.fanout = max(1, fanout)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.health: Dict[str, MirrorHealth] = defaultdict(MirrorHealth)
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        p = urlparse(url)
+        return f"{p.scheme}://{p.netloc}".lower()
+
+    def candidates(self, url: str) -> List[str]:
+        urls = [url]
+        if "/item/" in url:
+            urls += [_aliexpress_mirror_url(url, o) for o in AE_MIRROR_ORIGINS]
+        seen, unique = set(), []
+        for u in urls:
+            if self._origin(u) not in seen:
+                seen.add(self._origin(u))
+                unique.append(u)
+        now = time.monotonic()
+        ready = [u for u in unique if self.health[self._origin(u)].retry_at <= now]
+        if not ready:
+            # Everything is cooling down: probe the one closest to recovery
+            return [min(unique, key=lambda u: self.health[self._origin(u)].retry_at)]
+        # Stable sort keeps the requested URL first among equally healthy mirrors
+        return sorted(ready, key=lambda u: (self.health[self._origin(u)].failures, self.health[self._origin(u)].latency))
+
+    def record(self, url: str, ok: bool, elapsed: float = 0.0):
+        h = self.health[self._origin(url)]
+        if ok:
+            h.failures = 0
+            h.retry_at = 0.0
+            h.latency = elapsed if not h.latency else 0.8 * h.latency + 0.2 * elapsed
+        else:
+            h.failures += 1
+            h.retry_at = time.monotonic() + min(self.max_backoff, self.base_backoff * 2 ** (h.failures - 1))
+
+    async def _attempt(self, url: str, headers: Dict[str, str]) -> Tuple[str, float]:
+        t0 = time.monotonic()
+        timeout = SCRAPE_DOMAINS.timeout(urlparse(url).hostname or "", self.timeout, 5.0, 30.0)
+        html = await cached_get_text(url, headers, timeout=timeout)
+        return html, time.monotonic() - t0
+
+    async def race(self, url: str, headers: Dict[str, str], accept) -> str:
+        """Best page for `url`: the first accepted one, else the largest seen."""
+        queue = self.candidates(url)
+        running: Dict[asyncio.Future, str] = {}
+        best = ""
+        try:
+            while queue or running:
+                while queue and len(running) < self.fanout:
+                    u = queue.pop(0)
+                    running[asyncio.ensure_future(self._attempt(u, headers))] = u
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    u = running.pop(t)
+                    if t.exception() is not None:
+                        logger.info(f"AliExpress fetch: {u} failed: {t.exception()}")
+                        self.record(u, ok=False)
+                        continue
+                    html, elapsed = t.result()
+                    if accept(html):
+                        logger.info(f"AliExpress fetch: {u} won with {len(html)} bytes in {elapsed:.2f}s")
+                        self.record(u, ok=True, elapsed=elapsed)
+                        return html
+                    logger.info(f"AliExpress fetch: {u} returned no product data ({len(html)} bytes)")
+                    self.record(u, ok=False)
+                    if len(html) > len(best):
+                        best = html
+            return best
+        finally:
+            for t in running:
+                t.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            origin: {"failures": h.failures, "cooling_s": round(max(0.0, h.retry_at - now), 1),
+                     "latency_ms": round(h.latency * 1000)}
+            for origin, h in self.health.items()
+        }
+
+AE_MIRRORS = MirrorRacer(fanout=AE_MIRROR_FANOUT)
+
+# ---------------------- Browser resource blocking ------
+# Third-party beacons and ad scripts; matched as substrings of the URL
+_TRACKER_PATTERNS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "facebook.net", "connect.facebook", "hotjar.com",
+    "criteo.", "bat.bing.com", "/beacon", "/collect?",
+)
+# Rough transfer sizes, used only to estimate what blocking saved
+_TYPICAL_BYTES = {"image": 40_000, "media": 400_000, "font": 35_000,
+                  "stylesheet": 25_000, "script": 20_000}
+
+@dataclass(frozen=True)
+class BlockPolicy:
+    resource_types: frozenset = frozenset()
+    url_patterns: Tuple[str, ...] = ()
+
+    def reason(self, resource_type: str, url: str) -> Optional[str]:
+        """Why a subresource should be aborted, or None to let it through."""
+        if resource_type == "document":
+            return None  # never block navigations (or their HTTP_CACHE route)
+        if resource_type in self.resource_types:
+            return resource_type
+        u = url.lower()
+        if any(p in u for p in self.url_patterns):
+            return "pattern"
+        return None
+
+def _policy(types, *pattern_groups) -> BlockPolicy:
+    return BlockPolicy(frozenset(types), tuple(p for g in pattern_groups for p in g))
+
+# Keyed by marketplace name, matched against the labels of the page host
+# (so "amazon" covers amazon.com, amazon.co.uk, ...). The extractors read
+# only the HTML, inline scripts and DOM attributes: images, media, fonts
+# and styles are never needed, first-party JS is.
+DEFAULT_BLOCK_POLICIES: Dict[str, BlockPolicy] = {
+    "*": _policy({"image", "media", "font"}, _TRACKER_PATTERNS),
+    "aliexpress": _policy({"image", "media", "font", "stylesheet"}, _TRACKER_PATTERNS,
+                          ("mmstat.com", "arms-retcode", "/alilog", "aplus_")),
+    "amazon": _policy({"image", "media", "font", "stylesheet"}, _TRACKER_PATTERNS,
+                      ("amazon-adsystem.com", "fls-na.amazon", "unagi.amazon", "/uedata", "aax-")),
+    "google": _policy({"image", "media", "font", "stylesheet"}, _TRACKER_PATTERNS),
+}
+
+class ResourceBlocker:
+    """
+    Route-interception policy for Playwright scrapes. attach() installs one
+    "**/*" handler per lease that aborts what the host's policy names and
+    hands everything else on with route.fallback(), so handlers registered
+    later by the job (conditional_document_route) still run first.
+    """
+    def __init__(self, policies: Dict[str, BlockPolicy], enabled: bool = True):
+        self.policies = policies
+        self.enabled = enabled
+        self.counters: Dict[str, Dict[str, Any]] = defaultdict(
+            lambda: {"blocked": 0, "allowed": 0, "by_reason": defaultdict(int), "est_bytes_saved": 0})
+
+    @classmethod
+    def from_env(cls, raw: str, enabled: bool) -> "ResourceBlocker":
+        policies = dict(DEFAULT_BLOCK_POLICIES)
+        if raw:
+            try:
+                for name, cfg in json.loads(raw).items():
+                    policies[name.lower()] = _policy(cfg.get("types", []), cfg.get("patterns", []))
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"BLOCK_POLICIES ignored: {e}")
+        return cls(policies, enabled)
+
+    def policy(self, host: str) -> Optional[BlockPolicy]:
+        labels = (host or "").lower().split(".")
+        for name, policy in self.policies.items():
+            if name in labels:
+                return policy
+        return self.policies.get("*")
+
+    def handler(self, host: str):
+        policy = self.policy(host)
+        stats = self.counters[host]
+
+        async def block(route):
+            request = route.request
+            why = policy.reason(request.resource_type, request.url)
+            if why is None:
+                stats["allowed"] += 1
+                await route.fallback()
+                return
+            stats["blocked"] += 1
+            stats["by_reason"][why] += 1
+            stats["est_bytes_saved"] += _TYPICAL_BYTES.get(request.resource_type, 5_000)
+            await route.abort("blockedbyclient")
+        return block
+
+    async def attach(self, page, host: str):
+        if self.enabled and self.policy(host) is not None:
+            await page.route("**/*", self.handler(host))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            host: {**c, "by_reason": dict(c["by_reason"])}
+            for host, c in self.counters.items()
+        }
+
+BLOCKER = ResourceBlocker.from_env(BLOCK_POLICIES, BLOCK_RESOURCES)
+
+# ---------------------- Browser page pool --------------
+def _available_memory_mb() -> Optional[int]:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2**20
+    except (ValueError, OSError, AttributeError):
+        return None  # Windows
+
+def browser_pool_size(max_pages: int = 0, contexts: int = 0,
+                      page_memory_mb: int = 300) -> Tuple[int, int]:
+    """(contexts, pages per context); zero settings are derived from cores and free RAM."""
+    cpus = os.cpu_count() or 2
+    total = max_pages
+    if total <= 0:
+        total = cpus * 2  # pages mostly wait on the network
+        avail = _available_memory_mb()
+        if avail is not None:
+            total = min(total, avail // max(1, page_memory_mb))
+        total = max(1, total)
+    if contexts <= 0:
+        contexts = max(1, min(total, cpus // 2))
+    return contexts, -(-total // contexts)
+
+_JS_HEAP_USED = "() => (performance.memory && performance.memory.usedJSHeapSize) || 0"
+
+class PooledPage:
+    """
+    A warm page on lease to one job. Calls are forwarded to the Playwright
+    page; routes, listeners and extra headers the job adds are recorded so
+    reset() can undo them before the next lease.
+    """
+    def __init__(self, page, slot: "PooledContext"):
+        self._page = page
+        self.slot = slot
+        self._routes: List[Tuple[Any, Any]] = []
+        self._listeners: List[Tuple[str, Any]] = []
+        self._headers = False
+
+    def __getattr__(self, name):
+        return getattr(self._page, name)
+
+    async def goto(self, url, **kwargs):
+        self.slot.navigations += 1
+        return await self._page.goto(url, **kwargs)
+
+    async def route(self, url, handler, **kwargs):
+        self._routes.append((url, handler))
+        return await self._page.route(url, handler, **kwargs)
+
+    def on(self, event, fn):
+        self._listeners.append((event, fn))
+        return self._page.on(event, fn)
+
+    def remove_listener(self, event, fn):
+        # Removed by the job itself: reset() must not remove it again
+        # (pyee raises KeyError once the event has no listeners left)
+        if (event, fn) in self._listeners:
+            self._listeners.remove((event, fn))
+        return self._page.remove_listener(event, fn)
+
+    async def set_extra_http_headers(self, headers):
+        self._headers = True
+        return await self._page.set_extra_http_headers(headers)
+
+    async def reset(self) -> int:
+        """Undo the job's changes and blank the page; returns the JS heap in bytes."""
+        for url, handler in self._routes:
+            await self._page.unroute(url, handler)
+        for event, fn in self._listeners:
+            try:
+                self._page.remove_listener(event, fn)
+            except (KeyError, ValueError):
+                pass  # already gone
+        self._routes.clear()
+        self._listeners.clear()
+        if self._headers:
+            await self._page.set_extra_http_headers({})
+            self._headers = False
+        await self._page.goto("about:blank")
+        return int(await self._page.evaluate(_JS_HEAP_USED) or 0)
+
+@dataclass
+class PooledContext:
+    context: Any
+    pages: List[PooledPage] = field(default_factory=list)
+    navigations: int = 0
+    heap: Dict[int, int] = field(default_factory=dict)  # id(page) -> last JS heap
+    baseline_heap: int = 0
+    in_use: int = 0
+    retiring: bool = False
+
+class BrowserPool:
+    """
+    N browser contexts x M warm pages, handed out by lease() instead of a
+    new_page()/close() per job. A context is retired once it has served
+    recycle_navigations page loads or its pages' JS heap has grown by
+    recycle_memory_mb: it stops lending pages, and is closed and replaced
+    by a fresh one when its last lease returns. A replacement that fails
+    to open is retried by the next lease(), so the pool never shrinks.
+    """
+    def __init__(self, new_context, contexts: int, pages_per_context: int,
+                 recycle_navigations: int = 200, recycle_memory_mb: float = 256):
+        self.new_context = new_context  # async () -> BrowserContext
+        self.contexts = contexts
+        self.pages_per_context = pages_per_context
+        self.recycle_navigations = recycle_navigations
+        self.recycle_bytes = recycle_memory_mb * 2**20
+        self.slots: List[PooledContext] = []
+        self.idle: asyncio.Queue = asyncio.Queue()
+        self.leases = 0
+        self.recycled = 0
+        self.replaced_pages = 0
+        self.missing = 0  # retired contexts whose replacement failed to open
+        self.wait_ms = 0.0
+
+    @property
+    def size(self) -> int:
+        return self.contexts * self.pages_per_context
+
+    async def _open_slot(self) -> PooledContext:
+        slot = PooledContext(await self.new_context())
+        try:
+            for _ in range(self.pages_per_context):
+                slot.pages.append(PooledPage(await slot.context.new_page(), slot))
+        except BaseException:
+            await self._close_slot(slot)  # not pooled yet: just don't leak it
+            raise
+        self.slots.append(slot)
+        for page in slot.pages:
+            self.idle.put_nowait(page)
+        return slot
+
+    async def start(self):
+        await asyncio.gather(*(self._open_slot() for _ in range(self.contexts)))
+
+    async def _refill(self) -> Optional[Exception]:
+        """Open replacements for the missing contexts; the error that stopped it, if any."""
+        while self.missing > 0:
+            self.missing -= 1
+            try:
+                await self._open_slot()
+            except Exception as e:
+                self.missing += 1
+                logger.warning(f"browser pool: could not open a context, retrying on next lease: {e}")
+                return e
         return None
 
+    async def _close_slot(self, slot: PooledContext):
+        if slot in self.slots:
+            self.slots.remove(slot)
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    def _should_retire(self, slot: PooledContext) -> bool:
+        grown = sum(slot.heap.values()) - slot.baseline_heap
+        return slot.navigations >= self.recycle_navigations or grown >= self.recycle_bytes
+
+    async def _release(self, page: PooledPage):
+        slot = page.slot
+        slot.in_use -= 1
+        try:
+            heap = await page.reset()
+            if id(page) not in slot.heap:
+                slot.baseline_heap += heap
+            slot.heap[id(page)] = heap
+        except Exception as e:
+            # Crashed or wedged page: replace it within the same context
+            logger.warning(f"browser pool: replacing page after failed reset: {e}")
+            self.replaced_pages += 1
+            slot.pages.remove(page)
+            slot.heap.pop(id(page), None)
+            try:
+                await page._page.close()
+            except Exception:
+                pass
+            try:
+                page = PooledPage(await slot.context.new_page(), slot)
+                slot.pages.append(page)
+            except Exception:
+                slot.retiring = True  # the context itself is gone
+                page = None
+        if not slot.retiring and self._should_retire(slot):
+            slot.retiring = True
+        if slot.retiring:
+            if slot.in_use == 0:
+                self.recycled += 1
+                await self._close_slot(slot)
+                self.missing += 1
+                await self._refill()  # runs in the job's finally: never raises
+            return
+        if page is not None:
+            self.idle.put_nowait(page)
+
+    @asynccontextmanager
+    async def lease(self):
+        start = time.perf_counter()
+        if self.missing:
+            err = await self._refill()
+            if err is not None and not self.slots:
+                raise err  # nothing left to wait for
+        while True:
+            page = await self.idle.get()
+            if not page.slot.retiring:
+                break  # pages of a retired context are dropped as they surface
+        self.wait_ms += (time.perf_counter() - start) * 1000
+        self.leases += 1
+        page.slot.in_use += 1
+        try:
+            yield page
+        finally:
+            # Shielded: a cancelled job must still hand its page back
+            await asyncio.shield(self._release(page))
+
+    async def close(self):
+        for slot in list(self.slots):
+            await self._close_slot(slot)
+        self.idle = asyncio.Queue()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "contexts": len(self.slots),
+            "pages": sum(len(s.pages) for s in self.slots),
+            "idle": self.idle.qsize(),
+            "leases": self.leases,
+            "recycled_contexts": self.recycled,
+            "replaced_pages": self.replaced_pages,
+            "missing_contexts": self.missing,
+            "avg_wait_ms": round(self.wait_ms / self.leases, 2) if self.leases else None,
+        }
+
+# ---------------------- Page readiness ------------------
+@dataclass(frozen=True)
+class ReadySignals:
+    """Concrete evidence that a marketplace page has rendered its product data."""
+    function: Optional[str] = None     # JS predicate for wait_for_function
+    responses: Tuple[str, ...] = ()    # URL substrings of the product-data XHR
+    selector: Optional[str] = None     # a price node
+    cap_ms: int = 8000                 # hard cap; the page is used as-is after it
+
+READY_SIGNALS: Dict[str, ReadySignals] = {
+    "aliexpress": ReadySignals(
+        function=("() => { const d = window.runParams && window.runParams.data;"
+                  " return !!(d && (d.priceModule || d.priceComponent || d.skuModule)); }"),
+        responses=("mtop.aliexpress.pdp.pc.query", "mtop.aliexpress.itemdetail"),
+        selector=".product-price-current, .product-price-value, [class*='price--current'], .uniform-banner-box-price",
+        cap_ms=READY_MAX_WAIT_MS,
+    ),
+}
+
+class ReadyWatch:
+    """
+    One navigation's readiness race. The response listener is attached
+    before goto() so an early product XHR is not missed; wait() then races
+    it against wait_for_function and the price selector and returns the
+    first signal that fired, or "cap" when none did in time. Matching
+    responses are kept so their JSON can be read instead of the DOM.
+    """
+    MAX_CAPTURED = 4
+
+    def __init__(self, page, signals: Optional[ReadySignals], on_ready=None):
+        self.page = page
+        self.signals = signals
+        self.on_ready = on_ready  # (signal, seconds since the watch began)
+        self.started = time.monotonic()
+        self.responses: List[Any] = []  # product-data responses, in arrival order
+        self._response_seen = asyncio.Event()
+        # HttpxPage (no JS engine) holds final HTML as soon as goto returns
+        self.static = signals is None or not hasattr(page, "wait_for_function")
+
+    @property
+    def response(self):
+        return self.responses[0] if self.responses else None
+
+    def on_response(self, response):
+        if len(self.responses) < self.MAX_CAPTURED and any(p in response.url for p in self.signals.responses):
+            self.responses.append(response)
+            self._response_seen.set()
+
+    async def payloads(self) -> List[bytes]:
+        """Bodies of the captured responses; ones that can no longer be read are skipped."""
+        out = []
+        for r in self.responses:
+            try:
+                out.append(await r.body())
+            except Exception as e:
+                logger.debug(f"captured response unreadable: {e}")
+        return out
+
+    async def wait(self, skip: Tuple[str, ...] = ()) -> str:
+        """First signal not in `skip`; the cap is shared by every wait() of this watch."""
+        signal = "static" if self.static else await self._race(skip)
+        if self.on_ready:
+            self.on_ready(signal, time.monotonic() - self.started)
+        return signal
+
+    def mark_captured(self):
+        """The captured JSON answered the scrape; counted per host as "captured_json"."""
+        if self.on_ready:
+            self.on_ready("captured_json", time.monotonic() - self.started)
+
+    async def settle(self):
+        """Let the document finish parsing before its HTML is read."""
+        if not self.static:
+            remaining = self.signals.cap_ms - (time.monotonic() - self.started) * 1000
+            try:
+                await self.page.wait_for_load_state("domcontentloaded", timeout=max(1.0, remaining))
+            except Exception:
+                pass  # capped: read whatever has rendered
+
+    async def _race(self, skip: Tuple[str, ...]) -> str:
+        sig = self.signals
+        deadline = self.started + sig.cap_ms / 1000
+        budget_ms = max(1.0, (deadline - time.monotonic()) * 1000)
+        waits = {}
+        if sig.responses and "response" not in skip:
+            waits[asyncio.ensure_future(self._response_seen.wait())] = "response"
+        if sig.function and "function" not in skip:
+            waits[asyncio.ensure_future(self.page.wait_for_function(sig.function, timeout=budget_ms))] = "function"
+        if sig.selector and "selector" not in skip:
+            waits[asyncio.ensure_future(
+                self.page.wait_for_selector(sig.selector, state="attached", timeout=budget_ms))] = "selector"
+        pending = set(waits)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                # A signal that errored (timeout, navigation) just drops out
+                for t in done:
+                    if not t.cancelled() and t.exception() is None:
+                        return waits[t]
+            return "cap"
+        finally:
+            for t in waits:
+                t.cancel()
+            await asyncio.gather(*waits, return_exceptions=True)
+
+class ReadinessEngine:
+    def __init__(self, signals: Dict[str, ReadySignals]):
+        self.signals = signals
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.ready_ms: Dict[str, LatencyWindow] = defaultdict(LatencyWindow)
+
+    def signals_for(self, host: str) -> Optional[ReadySignals]:
+        labels = (host or "").lower().split(".")
+        return next((sig for name, sig in self.signals.items() if name in labels), None)
+
+    @asynccontextmanager
+    async def watch(self, page, url: str):
+        host = urlparse(url).hostname or ""
+
+        def record(signal: str, elapsed: float):
+            self.counts[host][signal] += 1
+            if signal != "static":
+                self.ready_ms[host].add(elapsed)
+
+        watch = ReadyWatch(page, self.signals_for(host), record)
+        if watch.static:
+            yield watch
+            return
+        page.on("response", watch.on_response)
+        try:
+            yield watch
+        finally:
+            page.remove_listener("response", watch.on_response)
+
+    def stats(self) -> Dict[str, Any]:
+        out = {}
+        for host, counts in self.counts.items():
+            p50 = self.ready_ms[host].percentile(50) if host in self.ready_ms else None
+            out[host] = {**counts, "ready_p50_ms": round(p50 * 1000) if p50 is not None else None}
+        return out
+
+READINESS = ReadinessEngine(READY_SIGNALS)
+
 # ---------------------- Playwright Scraper --------------
 class WebScraper:
     def __init__(self):
         self.playwright = None
         self.browser: Optional[Browser] = None
-        self.context: Optional[BrowserContext] = None
-        self.sem = asyncio.Semaphore(3)
+        self.pool: Optional[BrowserPool] = None
+        self._init_lock = asyncio.Lock()
         self.playwright_enabled = USE_PLAYWRIGHT
 
     async def init(self):
-        if not self.playwright_enabled:
+        if not self.playwright_enabled or self.pool is not None:
             return
+        async with self._init_lock:
+            if self.pool is None:
+                await self._start()
+
+    async def _start(self):
         try:
             logger.info("Initializing Playwright…")
             self.playwright = await async_playwright().start()
@@ -1210,23 +3858,20 @@ class WebScraper:
                     '--disable-gpu',
                     '--disable-background-timer-throttling',
                     '--disable-backgrounding-occluded-windows',
-                    '--disable-renderer-backgrounding'
+                    '--disable-renderer-backgrounding',
+                    '--enable-precise-memory-info',  # real numbers for pool recycling
                 ]
             )
-            
-            # Enhanced context configuration
-            self.context = await self.browser.new_context(
-                user_agent=(
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/124.0.0.0 Safari/537.36"
-                ),
-                viewport={'width': 1920, 'height': 1080},
-                locale='en-US',
-                timezone_id='America/New_York'
+
+            contexts, pages = browser_pool_size(PLAYWRIGHT_MAX_PAGES, PLAYWRIGHT_CONTEXTS, PLAYWRIGHT_PAGE_MEMORY_MB)
+            self.pool = BrowserPool(
+                self._new_context, contexts, pages,
+                recycle_navigations=PLAYWRIGHT_RECYCLE_NAVIGATIONS,
+                recycle_memory_mb=PLAYWRIGHT_RECYCLE_MEMORY_MB,
             )
+            await self.pool.start()
             
-            logger.info("Playwright ready with enhanced configuration.")
+            logger.info(f"Playwright ready: {contexts} contexts x {pages} warm pages.")
         except NotImplementedError as e:
             logger.warning(f"Playwright disabled (NotImplementedError): {e}")
             self.playwright_enabled = False
@@ -1234,31 +3879,47 @@ class WebScraper:
             logger.warning(f"Playwright disabled: {e}")
             self.playwright_enabled = False
 
+    async def _new_context(self) -> BrowserContext:
+        # Enhanced context configuration
+        return await self.browser.new_context(
+            user_agent=(
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/124.0.0.0 Safari/537.36"
+            ),
+            viewport={'width': 1920, 'height': 1080},
+            locale='en-US',
+            timezone_id='America/New_York'
+        )
+
     async def shutdown(self):
         try:
-            if self.context:
-                await self.context.close()
+            if self.pool:
+                await self.pool.close()
             if self.browser:
                 await self.browser.close()
             if self.playwright:
                 await self.playwright.stop()
         except Exception:
             pass
-        self.context = None
+        self.pool = None
         self.browser = None
         self.playwright = None
 
-    async def _with_page(self, fn):
-        if not self.playwright_enabled:
-            return await self._httpx_fallback(fn)
-        await self.init()
-        async with self.sem:
-            page: Page = await self.context.new_page()
-            page.set_default_timeout(12000)
-            try:
+    async def _with_page(self, fn, url: str = ""):
+        host = urlparse(url).hostname or ""
+        # Breaker first (fail fast), then a per-domain slot, so a slow
+        # marketplace only queues behind itself
+        async with BREAKERS.guard(host), SCRAPE_DOMAINS.slot(host):
+            if not self.playwright_enabled:
+                return await self._httpx_fallback(fn)
+            await self.init()
+            if self.pool is None:  # browser failed to start
+                return await self._httpx_fallback(fn)
+            async with self.pool.lease() as page:
+                page.set_default_timeout(SCRAPE_DOMAINS.timeout(host, 12.0, 5.0, 30.0) * 1000)
+                await BLOCKER.attach(page, host)  # undone with the job's routes on release
                 return await fn(page)
-            finally:
-                await page.close()
 
     async def _httpx_fallback(self, fn):
         """Fallback scraping using httpx when Playwright is disabled/unavailable"""
@@ -1266,113 +3927,34 @@ class WebScraper:
             def __init__(self):
                 self._html = ""
                 self._url = ""
+                self._doc: Optional[ParsedDocument] = None
+
+            @property
+            def document(self) -> ParsedDocument:
+                """Tree of the current page, built on first query and reused until the next goto."""
+                if self._doc is None:
+                    self._doc = ParsedDocument(self._html, self._url)
+                return self._doc
 
             async def goto(self, url, wait_until="load"):
+                self._doc = None
                 self._url = url
-                validate_public_url(url)
+                await validate_public_url_async(url)
                 
                 # AliExpress-specific handling
                 is_aliexpress = "aliexpress" in url.lower()
-                
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (X11; Linux x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
-                    "Accept-Language": "en-US,en;q=0.9" if is_aliexpress else "en-US,en;q=0.8,ar;q=0.6",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                }
-                
-                # Add AliExpress cookies for USD pricing
-                if is_aliexpress:
-                    headers["Cookie"] = "aep_usuc_f=site=glo&b_locale=en_US&c_tp=USD&region=US"
+                headers = _page_headers(url)
                 
                 # For AliExpress, try multiple fetch attempts with increasing delays
                 if is_aliexpress:
                     self._html = await self._fetch_aliexpress_with_retry(url, headers)
                 else:
-                    async with httpx.AsyncClient(timeout=12.0, follow_redirects=True) as c:
-                        r = await c.get(url, headers=headers)
-                        r.raise_for_status()
-                        self._html = r.text
+                    host = urlparse(url).hostname or ""
+                    self._html = await cached_get_text(url, headers, timeout=SCRAPE_DOMAINS.timeout(host, 12.0, 5.0, 30.0))
 
             async def _fetch_aliexpress_with_retry(self, url: str, headers: dict) -> str:
-                """Multiple fetch attempts for AliExpress to get complete content"""
-                best_html = ""
-                max_content_length = 0
-                
-                print(f"AliExpress fetch: Starting multi-attempt fetch for {url}")
-                
-                # Try multiple fetch attempts with different delays
-                delays = [0, 2, 5, 10]  # seconds
-                
-                for delay in delays:
-                    if delay > 0:
-                        print(f"AliExpress fetch: Waiting {delay}s before next attempt...")
-                        await asyncio.sleep(delay)
-                    
-                    try:
-                        print(f"AliExpress fetch: Attempt with {delay}s delay...")
-                        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as c:
-                            r = await c.get(url, headers=headers)
-                            r.raise_for_status()
-                            html = r.text
-                            
-                            print(f"AliExpress fetch: Got {len(html)} bytes, status {r.status_code}")
-                            
-                            # Check if this fetch got more content
-                            if len(html) > max_content_length:
-                                max_content_length = len(html)
-                                best_html = html
-                                print(f"AliExpress fetch: New best result: {len(html)} bytes")
-                            
-                            # Check if we got the product data
-                            if self._has_product_data(html):
-                                print(f"AliExpress fetch: SUCCESS after {delay}s delay: {len(html)} bytes")
-                                return html
-                            else:
-                                print(f"AliExpress fetch: No product data found in this attempt")
-                                
-                    except Exception as e:
-                        print(f"AliExpress fetch: Attempt {delay}s failed: {e}")
-                        continue
-                
-                # If all attempts failed, try alternative AliExpress domains
-                if not best_html or len(best_html) < 50000:
-                    print("AliExpress fetch: Trying alternative domains...")
-                    alternative_domains = [
-                        "https://www.aliexpress.com",
-                        "https://www.aliexpress.us", 
-                        "https://es.aliexpress.com"
-                    ]
-                    
-                    for domain in alternative_domains:
-                        try:
-                            # Extract the item ID from the original URL
-                            item_id = url.split('/item/')[-1].split('?')[0].split('.')[0]
-                            alt_url = f"{domain}/item/{item_id}.html"
-                            
-                            print(f"AliExpress fetch: Trying alternative domain: {alt_url}")
-                            
-                            async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as c:
-                                r = await c.get(alt_url, headers=headers)
-                                r.raise_for_status()
-                                html = r.text
-                                
-                                print(f"AliExpress fetch: Alternative domain got {len(html)} bytes")
-                                
-                                if self._has_product_data(html):
-                                    print(f"AliExpress fetch: SUCCESS with alternative domain: {len(html)} bytes")
-                                    return html
-                                
-                                if len(html) > max_content_length:
-                                    max_content_length = len(html)
-                                    best_html = html
-                                    
-                        except Exception as e:
-                            print(f"AliExpress fetch: Alternative domain {domain} failed: {e}")
-                            continue
-                
-                # Return the best HTML we got
-                print(f"AliExpress fetch: COMPLETED: best result {len(best_html)} bytes")
-                return best_html
+                """Race AliExpress storefronts; first page with product data wins"""
+                return await AE_MIRRORS.race(url, headers, self._has_product_data)
             
             def _has_product_data(self, html: str) -> bool:
                 """Check if HTML contains product data"""
@@ -1404,6 +3986,10 @@ class WebScraper:
             async def content(self):
                 return self._html
 
+            async def route(self, url, handler):
+                # Conditional revalidation is already built into goto()
+                pass
+
             async def set_extra_http_headers(self, headers):
                 # Store headers for potential use
                 self._headers = headers
@@ -1417,8 +4003,7 @@ class WebScraper:
                 return True
 
             async def eval_on_selector(self, selector, script, strict=False):
-                soup = BeautifulSoup(self._html, "html.parser")
-                el = soup.select_one(selector)
+                el = self.document.select_one(selector)
                 if not el:
                     return None
                 # Best-effort attr extraction for video/img cases
@@ -1429,8 +4014,7 @@ class WebScraper:
                 return el.get_text(" ", strip=True)
 
             async def eval_on_selector_all(self, selector, script):
-                soup = BeautifulSoup(self._html, "html.parser")
-                els = soup.select(selector)
+                els = self.document.select(selector)
                 # Special-case imgs to approximate `els.map(e => e.src)`
                 if selector.strip().lower() in ("img", "img[src]", "img[data-src]"):
                     out = []
@@ -1445,9 +4029,7 @@ class WebScraper:
                 return [e.get_text(" ", strip=True) for e in els]
 
             async def title(self):
-                soup = BeautifulSoup(self._html, "html.parser")
-                t = soup.find("title")
-                return t.get_text(" ", strip=True) if t else ""
+                return self.document.title
 
             @property
             def url(self):
@@ -1475,8 +4057,8 @@ class WebScraper:
             html = await page.content()
             # Try static parse first, then selector if available
             items: List[Dict[str, Any]] = []
-            soup = BeautifulSoup(html, "html.parser")
-            for box in soup.select("div.sh-dgr__content")[:max_results]:
+            doc = ParsedDocument(html, url)
+            for box in doc.select("div.sh-dgr__content")[:max_results]:
                 title = box.select_one("h3, .tAxDx")
                 price = box.select_one(".a8Pemb, .XrAfOe")
                 img = box.select_one("img")
@@ -1490,7 +4072,7 @@ class WebScraper:
                 })
             return items[:max_results]
         try:
-            res = await self._with_page(job)
+            res = await self._with_page(job, url)
             return res or []
         except Exception as e:
             logger.warning(f"google shopping failed: {e}")
@@ -1499,8 +4081,16 @@ class WebScraper:
     async def get_product_details(self, url: str) -> Dict[str, Any]:
         if not self.is_allowed(url):
             raise HTTPException(status_code=400, detail="Domain not allowed for scraping")
-        
+        # Concurrent callers for the same product share one scrape; each
+        # gets its own deep copy, since callers mutate the nested lists too.
+        details = await FLIGHTS.do(f"details:{canonical_url(url)}", lambda: self._scrape_product_details(url))
+        return copy.deepcopy(details)
+
+    async def _scrape_product_details(self, url: str) -> Dict[str, Any]:
         async def job(page):
+            # Revalidate the product document against HTTP_CACHE (304 -> cached body)
+            await page.route(lambda u: u == url, conditional_document_route)
+
             # AliExpress-specific handling
             is_aliexpress = "aliexpress" in url.lower()
             
@@ -1511,95 +4101,76 @@ class WebScraper:
                     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
                     "Cookie": "aep_usuc_f=site=glo&b_locale=en_US&c_tp=USD&region=US"
                 })
-                
-                # Enhanced AliExpress page handling
-                await page.goto(url, wait_until="domcontentloaded")
-                
-                # Wait for critical product elements and JavaScript execution
-                await page.wait_for_timeout(5000)  # Increased wait for JS execution
-                
-                # Try to wait for multiple product indicators
-                selectors_to_wait = [
-                    '.product-title', '.product-price', '[data-price]',
-                    '.product-info', '.product-detail', '.sku-info'
-                ]
-                
-                for selector in selectors_to_wait:
-                    try:
-                        await page.wait_for_selector(selector, timeout=3000)
-                        logger.info(f"AliExpress: Found product element: {selector}")
-                        break
-                    except:
-                        continue
-                
-                # Additional wait for dynamic content
-                await page.wait_for_timeout(2000)
-                
-                # Try to scroll to trigger lazy loading
-                await page.evaluate("window.scrollTo(0, document.body.scrollHeight/2)")
-                await page.wait_for_timeout(1000)
-                
+
+                # Wait for product data (runParams, the pdp XHR or a price
+                # node), not fixed sleeps; capped at READY_MAX_WAIT_MS
+                async with READINESS.watch(page, url) as ready:
+                    await page.goto(url, wait_until="commit")
+                    signal = await ready.wait()
+                    if signal == "response":
+                        # The product XHR carries everything we read: no
+                        # DOM serialisation, no HTML parse
+                        captured = await PARSE_POOL.run(parse_ae_payloads, await ready.payloads())
+                        if captured["title"] and captured["price_amount"] is not None and captured["images"]:
+                            logger.info(f"AliExpress: product JSON captured from {len(ready.responses)} response(s)")
+                            ready.mark_captured()
+                            # The DOM has not rendered yet, so there is no video element to read
+                            return {**captured, "video": None, "price_source": "product_json"}
+                        signal = await ready.wait(skip=("response",))
+                    await ready.settle()
+
                 # Get fully rendered HTML
                 html = await page.content()
                 
-                logger.info(f"AliExpress: Page rendered, HTML size: {len(html)} bytes")
+                logger.info(f"AliExpress: Page ready via {signal}, HTML size: {len(html)} bytes")
             else:
                 await page.goto(url, wait_until="load")
                 html = await page.content()
 
-            details = {}
-            domain = self._domain(url).lower()
-
-            # ======= NEW: AliExpress fast-path parser =======
-            if "aliexpress." in domain:
-                ae = _parse_aliexpress(html)
+            # Parsing runs on PARSE_POOL; inline mode can reuse the tree the
+            # httpx page already holds for its selector emulation
+            doc = getattr(page, "document", None)
+            static = isinstance(doc, ParsedDocument)
+            body = doc if static and PARSE_POOL.mode == "inline" else PARSE_POOL.wire(html)
+            details = await cached_parse(parse_product_static, body, url, static)
+            price_early = details.pop("_price_early", None)
+            price_dom = details.pop("_price_dom", None)
+            price_late = details.pop("_price_late", None)
+            if "aliexpress." in self._domain(url).lower():
                 logger.info(
                     "AE parse hit | title=%r price=%r %s images=%d specs=%d",
-                    ae.get("title","")[:60],
-                    ae.get("price_amount"),
-                    ae.get("price_currency",""),
-                    len(ae.get("images",[])),
-                    len(ae.get("specifications",{})),
+                    details.get("title","")[:60],
+                    details.get("price_amount"),
+                    details.get("price_currency",""),
+                    len(details.get("images",[])),
+                    len(details.get("specifications",{})),
                 )
-                details.update({
-                    "title": ae.get("title",""),
-                    "images": ae.get("images",[]),
-                    "price_amount": ae.get("price_amount"),
-                    "price_currency": ae.get("price_currency","USD"),
-                    "specifications": ae.get("specifications",{}),
-                    "breadcrumbs": ae.get("breadcrumbs",[]),
-                })
-            else:
-                # old JSON-LD parse for other sites
-                details = self._parse_jsonld_product(html)
-
-            # Fallbacks (kept from your code)
-            if not details.get("title"):
-                try: details["title"] = await page.title()
-                except Exception: pass
-
-            if not details.get("images"):
-                try:
-                    imgs = await page.eval_on_selector_all("img", "els => els.map(e => e.src).filter(Boolean)")
-                except Exception:
-                    imgs = []
-                details["images"] = list(dict.fromkeys([i for i in (imgs or []) if i]))[:12]
 
-            if not details.get("video"):
-                try:
-                    vsrc = await page.eval_on_selector("video source, video", "el => el && (el.src || el.currentSrc)", strict=False)
-                except Exception:
-                    vsrc = None
-                details["video"] = vsrc or None
+            # Fallbacks (kept from your code). The httpx page's static
+            # fallbacks were filled by the worker from its own tree; a live
+            # page answers all of them, price selectors included, from one
+            # evaluate round trip.
+            snap = None
+            if not static and (not details.get("title") or not details.get("images")
+                               or not details.get("video") or details.get("price_amount") is None):
+                snap = await PriceExtractor.page_snapshot(page)
+
+            if snap is not None:
+                if not details.get("title"):
+                    details["title"] = snap.get("title") or details.get("title", "")
+                if not details.get("images"):
+                    details["images"] = list(dict.fromkeys([i for i in (snap.get("images") or []) if i]))[:12]
+                if not details.get("video"):
+                    details["video"] = snap.get("video") or None
 
             # ======= Price extractor (kept + site-specific) =======
             if details.get("price_amount") is None:
-                price_info = (PriceExtractor.from_jsonld(html)
-                              or PriceExtractor.from_meta(html)
-                              or PriceExtractor.site_specific(domain, html)
-                              or await PriceExtractor.from_dom_selectors(page, html)
-                              or PriceExtractor.from_inline_json(html)
-                              or PriceExtractor.generic_regex(html))
+                # Same tier order as before: the worker's static tiers wrap
+                # the live selector lookup, which only a real page can answer
+                live = None
+                if not price_early and snap is not None:
+                    live = PriceExtractor.from_dom_texts(snap.get("prices"))
+                price_info = price_early or live or price_dom or price_late
                 if price_info:
                     details["price_amount"] = price_info["amount"]
                     details["price_currency"] = price_info.get("currency","USD")
@@ -1607,8 +4178,15 @@ class WebScraper:
 
             return details
         try:
-            out = await self._with_page(job)
+            out = await self._with_page(job, url)
+            if out and (out.get("title") or out.get("price_amount") is not None):
+                # The cache keeps its own copy; `out` goes back to the flight's callers
+                CACHE.set(f"details:{canonical_url(url)}", copy.deepcopy(out))
             return out or {"url": url}
+        except CircuitOpenError as e:
+            # Marketplace is failing: serve the last good scrape, if any
+            logger.warning(f"details skipped: {e}")
+            return copy.deepcopy(CACHE.get(f"details:{canonical_url(url)}")) or {"url": url}
         except Exception as e:
             logger.warning(f"details failed: {e}")
             return {"url": url}
@@ -1617,51 +4195,40 @@ class WebScraper:
         from urllib.parse import urlparse
         return urlparse(url).netloc
 
-    def _parse_jsonld_product(self, html: str) -> Dict[str, Any]:
+    def _parse_jsonld_product(self, html) -> Dict[str, Any]:
         out: Dict[str, Any] = {"title": "", "images": [], "video": None, "specifications": {}}
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            scripts = soup.find_all("script", type="application/ld+json")
-            for s in scripts:
-                try:
-                    data = json.loads(s.string or "{}")
-                except Exception:
-                    continue
-                nodes = data if isinstance(data, list) else [data]
-                for node in nodes:
-                    if not isinstance(node, dict): continue
-                    typ = node.get("@type") or node.get("@graph", [{}])[0].get("@type")
-                    tset = {typ.lower()} if isinstance(typ, str) else {str(t).lower() for t in (typ or [])}
-                    if "product" in tset:
-                        out["title"] = node.get("name") or out["title"]
-                        imgs = node.get("image")
-                        if isinstance(imgs, list):
-                            out["images"] += imgs
-                        elif isinstance(imgs, str):
-                            out["images"].append(imgs)
-                        offers = node.get("offers", {})
-                        if isinstance(offers, dict):
-                            p = offers.get("price")
-                            c = offers.get("priceCurrency")
-                            if p:
-                                out["price_amount"] = PriceExtractor._clean_price(str(p))
-                            if c:
-                                out["price_currency"] = c
-                        elif isinstance(offers, list) and offers:
-                            o = offers[0]
-                            p = o.get("price")
-                            c = o.get("priceCurrency")
-                            if p:
-                                out["price_amount"] = PriceExtractor._clean_price(str(p))
-                            if c:
-                                out["price_currency"] = c
-                        addp = node.get("additionalProperty") or node.get("additionalProperties")
-                        if isinstance(addp, list):
-                            for p in addp:
-                                k = p.get("name") or p.get("propertyID")
-                                v = p.get("value")
-                                if k and v:
-                                    out["specifications"][str(k)] = str(v)
+            doc = ParsedDocument.of(html)
+            for node in doc.jsonld_products:
+                out["title"] = node.get("name") or out["title"]
+                imgs = node.get("image")
+                if isinstance(imgs, list):
+                    out["images"] += imgs
+                elif isinstance(imgs, str):
+                    out["images"].append(imgs)
+                offers = node.get("offers", {})
+                if isinstance(offers, dict):
+                    p = offers.get("price")
+                    c = offers.get("priceCurrency")
+                    if p:
+                        out["price_amount"] = PriceExtractor._clean_price(str(p))
+                    if c:
+                        out["price_currency"] = c
+                elif isinstance(offers, list) and offers:
+                    o = offers[0]
+                    p = o.get("price")
+                    c = o.get("priceCurrency")
+                    if p:
+                        out["price_amount"] = PriceExtractor._clean_price(str(p))
+                    if c:
+                        out["price_currency"] = c
+                addp = node.get("additionalProperty") or node.get("additionalProperties")
+                if isinstance(addp, list):
+                    for p in addp:
+                        k = p.get("name") or p.get("propertyID")
+                        v = p.get("value")
+                        if k and v:
+                            out["specifications"][str(k)] = str(v)
             out["images"] = list(dict.fromkeys([i for i in out["images"] if i]))
             
             # Enhanced video detection for non-Playwright scenarios
@@ -1682,7 +4249,7 @@ class WebScraper:
                     try:
                         if 'iframe' in selector or 'a[href*=' in selector:
                             # Handle iframe and link patterns
-                            elements = soup.select(selector)
+                            elements = doc.select(selector)
                             for element in elements:
                                 if 'iframe' in selector:
                                     src = element.get('src', '')
@@ -1696,7 +4263,7 @@ class WebScraper:
                                         break
                         else:
                             # Handle video elements
-                            video = soup.select_one(selector)
+                            video = doc.select_one(selector)
                             if video:
                                 src = video.get('src') or video.get('data-src')
                                 if src:
@@ -1836,17 +4403,23 @@ def b64_to_bytes(b64: str) -> bytes:
         raise HTTPException(400, detail="Invalid base64 image")
 
 async def download_bytes(url: str, hard_limit: int = MAX_IMAGE_BYTES) -> bytes:
-    validate_public_url(url)
-    async with client.stream("GET", url) as r:
-        r.raise_for_status()
-        total = 0
-        chunks = []
-        async for c in r.aiter_bytes():
-            total += len(c)
-            if total > hard_limit:
-                raise HTTPException(413, detail="Image too large")
-            chunks.append(c)
-        return b"".join(chunks)
+    await validate_public_url_async(url)
+    try:
+        # Image fetches get their own breaker per host, so a CDN that also
+        # serves pages (or vice versa) is not opened for the other use.
+        async with BREAKERS.guard(f"image:{urlparse(url).hostname or ''}", failure=_image_failure):
+            async with client.stream("GET", url) as r:
+                r.raise_for_status()
+                total = 0
+                chunks = []
+                async for c in r.aiter_bytes():
+                    total += len(c)
+                    if total > hard_limit:
+                        raise HTTPException(413, detail="Image too large")
+                    chunks.append(c)
+                return b"".join(chunks)
+    except CircuitOpenError:
+        raise HTTPException(503, detail="Image host temporarily unavailable")
 
 def image_center_crop(img_bytes: bytes) -> bytes:
     try:
@@ -2486,6 +5059,10 @@ async def analyze_with_fallbacks(img_bytes: bytes, product_url_hint: Optional[st
 # ---------------------- Background Analysis ------------
 async def analyze_full_background(payload: AnalyzeInput, img_bytes: bytes, ihash: str, rid: str):
     """Background full analysis to warm cache for future partial requests"""
+    hint = canonical_url(payload.product_url_hint) if payload.product_url_hint else "none"
+    await FLIGHTS.do(f"bg:{ihash}:{hint}", lambda: _analyze_full_background(payload, img_bytes, ihash, rid))
+
+async def _analyze_full_background(payload: AnalyzeInput, img_bytes: bytes, ihash: str, rid: str):
     try:
         # Vision analysis
         vd = await vision_annotate(img_bytes)
@@ -2867,6 +5444,18 @@ async def health():
         "status": "ok",
         "version": "2.3.0",
         "cache_size": CACHE.size(),
+        "http_cache": HTTP_CACHE.stats(),
+        "coalescing": FLIGHTS.stats(),
+        "hedging": hedge_stats(),
+        "ae_mirrors": AE_MIRRORS.stats(),
+        "domains": SCRAPE_DOMAINS.stats(),
+        "warming": WARMER.stats(),
+        "breakers": BREAKERS.stats(),
+        "parsing": PARSE_POOL.stats(),
+        "parse_cache": PARSE_CACHE.stats(),
+        "browser_pool": SCRAPER.pool.stats() if SCRAPER.pool else None,
+        "blocked_resources": BLOCKER.stats(),
+        "readiness": READINESS.stats(),
         "playwright_enabled": USE_PLAYWRIGHT
     }
 
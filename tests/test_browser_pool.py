@@ -0,0 +1,509 @@
+"""Browser pool, resource blocking and readiness against fake Playwright objects."""
+import asyncio
+import dataclasses
+
+import pytest
+
+import product_analyzer as pa
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = "about:blank"
+        self.routes = []
+        self.listeners = []
+        self.headers = {}
+        self.heap = 1000
+        self.closed = False
+        self.fail_reset = False
+
+    async def goto(self, url, **kwargs):
+        if self.fail_reset and url == "about:blank":
+            raise RuntimeError("Target crashed")
+        self.url = url
+        if url != "about:blank":
+            self.heap += 10 * 2**20
+
+    async def route(self, url, handler, **kwargs):
+        self.routes.append((url, handler))
+
+    async def unroute(self, url, handler=None):
+        self.routes.remove((url, handler))
+
+    def on(self, event, fn):
+        self.listeners.append((event, fn))
+
+    def remove_listener(self, event, fn):
+        self.listeners.remove((event, fn))
+
+    async def set_extra_http_headers(self, headers):
+        self.headers = headers
+
+    async def evaluate(self, script):
+        return self.heap
+
+    def set_default_timeout(self, ms):
+        self.timeout = ms
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.closed = False
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+def make_pool(contexts=1, pages=2, **kwargs):
+    created = []
+
+    async def new_context():
+        ctx = FakeContext()
+        created.append(ctx)
+        return ctx
+
+    return pa.BrowserPool(new_context, contexts, pages, **kwargs), created
+
+
+def test_pool_reuses_warm_pages_and_resets_job_state():
+    pool, created = make_pool(contexts=1, pages=1)
+
+    async def scenario():
+        await pool.start()
+        for i in range(3):
+            async with pool.lease() as page:
+                await page.route("https://shop.example/p", "handler")
+                page.on("response", "listener")
+                await page.set_extra_http_headers({"Cookie": "x"})
+                await page.goto(f"https://shop.example/p/{i}")
+        return created[0].pages[0]
+
+    raw = asyncio.run(scenario())
+    assert len(created[0].pages) == 1  # no new_page per job
+    assert raw.routes == [] and raw.listeners == [] and raw.headers == {}
+    assert raw.url == "about:blank"
+    assert pool.stats()["leases"] == 3 and pool.stats()["idle"] == 1
+
+
+def test_pool_bounds_concurrency_to_its_pages():
+    pool, _ = make_pool(contexts=2, pages=2)
+    active = peak = 0
+
+    async def job():
+        nonlocal active, peak
+        async with pool.lease():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def scenario():
+        await pool.start()
+        await asyncio.gather(*(job() for _ in range(12)))
+
+    asyncio.run(scenario())
+    assert peak == 4
+
+
+def test_pool_recycles_context_after_navigation_budget():
+    pool, created = make_pool(contexts=1, pages=1, recycle_navigations=2, recycle_memory_mb=10_000)
+
+    async def scenario():
+        await pool.start()
+        for _ in range(5):
+            async with pool.lease() as page:
+                await page.goto("https://shop.example/p")
+
+    asyncio.run(scenario())
+    assert pool.recycled == 2
+    assert [c.closed for c in created] == [True, True, False]
+    assert pool.stats()["contexts"] == 1
+
+
+def test_pool_recycles_context_on_heap_growth():
+    def run(budget_mb):
+        pool, created = make_pool(contexts=1, pages=1, recycle_navigations=1000, recycle_memory_mb=budget_mb)
+
+        async def scenario():
+            await pool.start()
+            for _ in range(3):
+                async with pool.lease() as page:
+                    await page.goto("https://shop.example/p")  # leaks 10 MB
+
+        asyncio.run(scenario())
+        return pool.recycled, created[0].closed
+
+    # Baseline is the heap after the first lease: 20 MB of growth follows
+    assert run(25) == (0, False)
+    assert run(15) == (1, True)
+
+
+def test_pool_replaces_page_whose_reset_fails():
+    pool, created = make_pool(contexts=1, pages=1)
+
+    async def scenario():
+        await pool.start()
+        async with pool.lease() as page:
+            page._page.fail_reset = True
+        async with pool.lease() as page:
+            return page._page
+
+    second = asyncio.run(scenario())
+    assert created[0].pages[0].closed
+    assert second is created[0].pages[1]
+    assert pool.replaced_pages == 1
+
+
+def test_pool_reopens_context_whose_replacement_failed_on_next_lease():
+    pool, created = make_pool(contexts=1, pages=1, recycle_navigations=1, recycle_memory_mb=10_000)
+    real_new_context = pool.new_context
+    failing = {"on": False}
+
+    async def new_context():
+        if failing["on"]:
+            raise RuntimeError("browser has been closed")
+        return await real_new_context()
+
+    pool.new_context = new_context
+
+    async def scenario():
+        await pool.start()
+        failing["on"] = True
+        async with pool.lease() as page:
+            await page.goto("https://shop.example/p")
+        # The failed replacement stayed inside the pool, not the job
+        assert pool.stats()["contexts"] == 0 and pool.missing == 1
+        failing["on"] = False
+        async with pool.lease() as page:
+            return page._page
+
+    page = asyncio.run(scenario())
+    assert created[0].closed and page.context is created[1]
+    assert pool.missing == 0 and pool.stats()["contexts"] == 1
+
+
+def test_pool_lease_raises_when_no_context_can_be_opened():
+    pool, _ = make_pool(contexts=1, pages=1)
+    pool.missing = 1
+
+    async def new_context():
+        raise RuntimeError("browser has been closed")
+
+    pool.new_context = new_context
+
+    async def scenario():
+        async with pool.lease():
+            pass
+
+    # An empty pool fails the job instead of waiting forever on its queue
+    with pytest.raises(RuntimeError, match="closed"):
+        asyncio.run(scenario())
+    assert pool.missing == 1
+
+
+def test_browser_pool_size_from_env_or_hardware(monkeypatch):
+    assert pa.browser_pool_size(max_pages=6, contexts=2) == (2, 3)
+    assert pa.browser_pool_size(max_pages=5, contexts=2) == (2, 3)
+    monkeypatch.setattr(pa.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(pa, "_available_memory_mb", lambda: 1200)
+    assert pa.browser_pool_size(page_memory_mb=300) == (4, 1)  # RAM caps 16 -> 4 pages
+    monkeypatch.setattr(pa, "_available_memory_mb", lambda: None)
+    assert pa.browser_pool_size(page_memory_mb=300) == (4, 4)
+
+
+# ---------------- ResourceBlocker ----------------
+
+class FakeRequest:
+    def __init__(self, resource_type, url):
+        self.resource_type = resource_type
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = FakeRequest(resource_type, url)
+        self.outcome = None
+
+    async def fallback(self):
+        self.outcome = "fallback"
+
+    async def abort(self, error_code=None):
+        self.outcome = "abort"
+
+
+def run_route(handler, resource_type, url):
+    route = FakeRoute(resource_type, url)
+    asyncio.run(handler(route))
+    return route.outcome
+
+
+def test_blocker_aborts_policy_types_and_trackers_but_never_documents():
+    blocker = pa.ResourceBlocker(pa.DEFAULT_BLOCK_POLICIES)
+    handler = blocker.handler("www.aliexpress.com")
+    assert run_route(handler, "image", "https://ae01.alicdn.com/kf/a.jpg") == "abort"
+    assert run_route(handler, "stylesheet", "https://assets.alicdn.com/x.css") == "abort"
+    assert run_route(handler, "script", "https://g.mmstat.com/tracker.js") == "abort"
+    assert run_route(handler, "script", "https://assets.alicdn.com/pdp.js") == "fallback"
+    assert run_route(handler, "document", "https://www.aliexpress.com/item/1.html") == "fallback"
+
+    stats = blocker.stats()["www.aliexpress.com"]
+    assert stats["blocked"] == 3 and stats["allowed"] == 2
+    assert stats["by_reason"] == {"image": 1, "stylesheet": 1, "pattern": 1}
+    assert stats["est_bytes_saved"] == 40_000 + 25_000 + 20_000
+
+
+def test_blocker_policy_per_marketplace_with_env_overrides():
+    blocker = pa.ResourceBlocker.from_env('{"amazon": {"types": ["media"], "patterns": ["/ads/"]}}', True)
+    amazon = blocker.policy("www.amazon.co.uk")
+    assert amazon.resource_types == frozenset({"media"}) and amazon.url_patterns == ("/ads/",)
+    assert blocker.policy("shop.example.org") is pa.DEFAULT_BLOCK_POLICIES["*"]
+    assert pa.ResourceBlocker.from_env("not json", True).policies == pa.DEFAULT_BLOCK_POLICIES
+
+
+def test_blocker_route_is_removed_with_the_lease():
+    pool, created = make_pool(contexts=1, pages=1)
+    blocker = pa.ResourceBlocker(pa.DEFAULT_BLOCK_POLICIES)
+
+    async def scenario():
+        await pool.start()
+        async with pool.lease() as page:
+            await blocker.attach(page, "www.amazon.com")
+            assert len(page._page.routes) == 1
+        async with pool.lease() as page:
+            return page._page.routes
+
+    assert asyncio.run(scenario()) == []
+    disabled = pa.ResourceBlocker(pa.DEFAULT_BLOCK_POLICIES, enabled=False)
+    page = FakePage(None)
+    asyncio.run(disabled.attach(page, "www.amazon.com"))
+    assert page.routes == []
+
+
+# ---------------- Readiness ----------------
+
+class SignalPage(FakePage):
+    """wait_for_function / wait_for_selector resolve after configurable delays."""
+    def __init__(self, function_s=None, selector_s=None):
+        super().__init__(None)
+        self.function_s = function_s
+        self.selector_s = selector_s
+
+    async def _after(self, delay, timeout):
+        if delay is None or delay * 1000 > timeout:
+            await asyncio.sleep(timeout / 1000)
+            raise TimeoutError("timeout")
+        await asyncio.sleep(delay)
+        return True
+
+    async def wait_for_function(self, script, timeout=None):
+        return await self._after(self.function_s, timeout)
+
+    async def wait_for_selector(self, selector, state=None, timeout=None):
+        return await self._after(self.selector_s, timeout)
+
+
+class FakeResponse:
+    def __init__(self, url):
+        self.url = url
+
+
+def race(page, url="https://www.aliexpress.com/item/1.html", cap_ms=500, on_goto=None):
+    signals = dict(pa.READY_SIGNALS)
+    signals["aliexpress"] = dataclasses.replace(signals["aliexpress"], cap_ms=cap_ms)
+    engine = pa.ReadinessEngine(signals)
+
+    async def scenario():
+        start = asyncio.get_running_loop().time()
+        async with engine.watch(page, url) as ready:
+            if on_goto:
+                on_goto(page)
+            signal = await ready.wait()
+        return signal, asyncio.get_running_loop().time() - start, ready
+
+    signal, elapsed, ready = asyncio.run(scenario())
+    return signal, elapsed, ready, engine
+
+
+def test_readiness_returns_on_first_signal():
+    signal, elapsed, _, engine = race(SignalPage(function_s=0.02, selector_s=0.3))
+    assert signal == "function" and elapsed < 0.2
+    assert engine.stats()["www.aliexpress.com"]["function"] == 1
+
+    signal, _, _, _ = race(SignalPage(selector_s=0.02))
+    assert signal == "selector"
+
+
+def test_readiness_product_response_wins_and_listener_is_removed():
+    def fire(page):
+        for event, fn in page.listeners:
+            fn(FakeResponse("https://acs.aliexpress.com/h5/mtop.aliexpress.pdp.pc.query/1.0/?x=1"))
+
+    page = SignalPage()
+    signal, elapsed, ready, _ = race(page, on_goto=fire)
+    assert signal == "response" and elapsed < 0.2
+    assert ready.response.url.startswith("https://acs.aliexpress.com/")
+    assert page.listeners == []
+
+
+def test_readiness_gives_up_at_the_cap():
+    signal, elapsed, _, engine = race(SignalPage(), cap_ms=100)
+    assert signal == "cap" and 0.09 < elapsed < 0.5
+    assert engine.stats()["www.aliexpress.com"]["cap"] == 1
+
+
+def test_readiness_is_immediate_for_static_pages():
+    class StaticPage:
+        pass
+
+    signal, elapsed, _, _ = race(StaticPage())
+    assert signal == "static" and elapsed < 0.05
+    signal, _, _, _ = race(SignalPage(function_s=0.01), url="https://www.amazon.com/dp/X")
+    assert signal == "static"  # no signals configured for this marketplace
+
+
+# ---------------- Product JSON capture ----------------
+
+PDP_PAYLOAD = (
+    'mtopjsonp2({"api": "mtop.aliexpress.pdp.pc.query", "ret": ["SUCCESS::ok"], "data": {"result": {'
+    '"PRODUCT_TITLE": {"text": "Mini Projector 4K"},'
+    '"HEADER_IMAGE_PC": {"imagePathList": ["https://ae01.alicdn.com/kf/p1.jpg", "/relative.jpg"]},'
+    '"PRICE": {"targetSkuPriceInfo": {"salePriceString": "US $59.90"}},'
+    '"PRODUCT_PROP_PC": {"showedProps": [{"attrName": "Brand", "attrValue": "Lumo"}]}}}})'
+)
+
+
+def test_parse_ae_payloads_maps_pdp_api_components():
+    out = pa.parse_ae_payloads([PDP_PAYLOAD.encode()])
+    assert out["title"] == "Mini Projector 4K"
+    assert out["price_amount"] == 59.9 and out["price_currency"] == "$"
+    assert out["images"] == ["https://ae01.alicdn.com/kf/p1.jpg"]
+    assert out["specifications"] == {"Brand": "Lumo"}
+
+
+def test_parse_ae_payloads_merges_partial_responses_in_order():
+    first = b'{"data": {"titleModule": {"subject": "Desk Lamp"}}}'
+    second = b'{"data": {"priceModule": {"formatedActivityPrice": "US $12.00"}, "titleModule": {"subject": "Other"}}}'
+    out = pa.parse_ae_payloads([b"not json", first, second])
+    assert out["title"] == "Desk Lamp" and out["price_amount"] == 12.0
+    assert pa.parse_ae_payloads([])["price_amount"] is None
+
+
+class CapturingResponse(FakeResponse):
+    def __init__(self, url, body):
+        super().__init__(url)
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+
+class CapturePage(SignalPage):
+    """Fires the pdp XHR as soon as navigation commits; content() must not be needed."""
+    async def goto(self, url, **kwargs):
+        await super().goto(url, **kwargs)
+        response = CapturingResponse("https://acs.aliexpress.com/h5/mtop.aliexpress.pdp.pc.query/1.0/", PDP_PAYLOAD.encode())
+        for event, fn in list(self.listeners):
+            fn(response)
+
+    async def content(self):
+        raise AssertionError("DOM serialised despite captured product JSON")
+
+
+def test_details_job_finishes_from_captured_product_json(monkeypatch):
+    page = CapturePage(function_s=5, selector_s=5)
+
+    async def with_page(fn, url=""):
+        return await fn(page)
+
+    monkeypatch.setattr(pa.SCRAPER, "_with_page", with_page)
+    monkeypatch.setattr(pa, "PARSE_POOL", pa.ParseExecutor("inline"))
+    out = asyncio.run(pa.SCRAPER._scrape_product_details("https://www.aliexpress.com/item/42.html"))
+    assert out["title"] == "Mini Projector 4K" and out["price_amount"] == 59.9
+    assert out["price_source"] == "product_json"
+    assert page.listeners == []
+
+
+# ---------------- One-round-trip page snapshot ----------------
+
+class LivePage(FakePage):
+    """Counts protocol round trips; only evaluate() is allowed to answer."""
+    def __init__(self, html, snapshot):
+        super().__init__(None)
+        self.html = html
+        self.snapshot = snapshot
+        self.round_trips = []
+
+    async def content(self):
+        return self.html
+
+    async def evaluate(self, script, arg=None):
+        self.round_trips.append("evaluate")
+        return self.snapshot
+
+    async def title(self):
+        raise AssertionError("title() round trip")
+
+    async def eval_on_selector(self, *args, **kwargs):
+        raise AssertionError("eval_on_selector round trip")
+
+    async def eval_on_selector_all(self, *args, **kwargs):
+        raise AssertionError("eval_on_selector_all round trip")
+
+
+def test_details_job_reads_dom_fallbacks_in_one_evaluate(monkeypatch):
+    snapshot = {
+        "title": "Rendered Title",
+        "images": ["https://img.example/a.jpg", "https://img.example/a.jpg", "https://img.example/b.jpg"],
+        "video": "https://video.example/v.mp4",
+        "prices": {".price, .product-price, .price-current, .price__current, .price-amount, .price-display, .product__price": "$17.25",
+                   ".a-price-whole": "not a price"},
+    }
+    page = LivePage("<html><body><p>bare</p></body></html>", snapshot)
+
+    async def with_page(fn, url=""):
+        return await fn(page)
+
+    monkeypatch.setattr(pa.SCRAPER, "_with_page", with_page)
+    monkeypatch.setattr(pa, "PARSE_POOL", pa.ParseExecutor("inline"))
+    out = asyncio.run(pa.SCRAPER._scrape_product_details("https://shop.example.org/p/snapshot"))
+    assert page.round_trips == ["evaluate"]
+    assert out["title"] == "Rendered Title"
+    assert out["images"] == ["https://img.example/a.jpg", "https://img.example/b.jpg"]
+    assert out["video"] == "https://video.example/v.mp4"
+    assert out["price_amount"] == 17.25 and out["price_source"].startswith("selector:.price")
+
+
+def test_from_dom_selectors_uses_one_evaluate_on_live_pages():
+    page = LivePage("", {"prices": {".a-price-whole": "12", ".a-price .a-offscreen": "$9.99"}})
+    hit = asyncio.run(pa.PriceExtractor.from_dom_selectors(page))
+    assert hit["amount"] == 9.99 and hit["source"] == "selector:.a-price .a-offscreen"
+    assert page.round_trips == ["evaluate"]
+    assert pa.PriceExtractor.from_dom_texts(None) is None
+
+
+def test_readiness_watch_on_leased_page_keeps_page_in_pool():
+    pool, created = make_pool(contexts=1, pages=1)
+
+    async def scenario():
+        await pool.start()
+        for _ in range(2):
+            async with pool.lease() as page:
+                page._page.wait_for_function = None  # a live page: the watch attaches its listener
+                async with pa.READINESS.watch(page, "https://www.aliexpress.com/item/7.html") as ready:
+                    assert not ready.static and len(page._page.listeners) == 1
+                    await page.goto("https://www.aliexpress.com/item/7.html")
+                assert page._page.listeners == []
+
+    asyncio.run(scenario())
+    assert pool.replaced_pages == 0
+    assert len(created[0].pages) == 1
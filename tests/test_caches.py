@@ -0,0 +1,136 @@
+"""In-process caches used by the scraping paths."""
+import asyncio
+
+import product_analyzer as pa
+
+
+# ---------------- HttpResponseCache ----------------
+
+def test_http_cache_stores_validators_and_builds_conditional_headers():
+    cache = pa.HttpResponseCache()
+    cache.store("https://shop.example/p/1", {}, {"etag": '"abc"', "last-modified": "Tue, 01 Oct 2024 10:00:00 GMT"}, b"<html>1</html>")
+    entry = cache.get("https://shop.example/p/1")
+    assert entry.content == b"<html>1</html>"
+    assert entry.text == "<html>1</html>"
+    assert entry.conditional_headers() == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Tue, 01 Oct 2024 10:00:00 GMT",
+    }
+
+
+def test_http_cache_skips_unvalidated_and_no_store_responses():
+    cache = pa.HttpResponseCache()
+    cache.store("https://shop.example/a", {}, {}, b"<html>a</html>")
+    cache.store("https://shop.example/b", {}, {"etag": '"b"', "cache-control": "private, no-store"}, b"<html>b</html>")
+    cache.store("https://shop.example/c", {}, {"etag": '"c"', "vary": "User-Agent"}, b"<html>c</html>")
+    assert cache.get("https://shop.example/a") is None
+    assert cache.get("https://shop.example/b") is None
+    assert cache.get("https://shop.example/c") is None
+
+
+def test_http_cache_evicts_oldest_past_byte_budget():
+    cache = pa.HttpResponseCache(capacity=10, max_bytes=800)
+    for i in range(10):
+        cache.store(f"https://shop.example/{i}", {}, {"etag": f'"{i}"'}, b"x" * 100)
+    assert cache.bytes <= 800
+    assert cache.get("https://shop.example/0") is None
+    assert cache.get("https://shop.example/9") is not None
+
+
+def test_http_cache_keys_on_locale_and_cookie_headers():
+    cache = pa.HttpResponseCache()
+    url = "https://www.aliexpress.com/item/1.html"
+    usd = {"Accept-Language": "en-US", "Cookie": "aep_usuc_f=c_tp=USD"}
+    eur = {"Accept-Language": "en-US", "Cookie": "aep_usuc_f=c_tp=EUR"}
+    cache.store(url, usd, {"etag": '"u"', "vary": "Accept-Encoding, Cookie"}, b"<html>$1</html>")
+    assert cache.get(url, eur) is None
+    assert cache.get(url, {"Accept-Language": "fr-FR", "Cookie": "aep_usuc_f=c_tp=USD"}) is None
+    # Header names are case-insensitive; headers outside KEY_HEADERS do not matter
+    assert cache.get(url, {"accept-language": "en-US", "cookie": "aep_usuc_f=c_tp=USD", "User-Agent": "x"}).etag == '"u"'
+
+
+def test_http_cache_text_uses_declared_charset():
+    cache = pa.HttpResponseCache()
+    body = "<html>Prix 10 €</html>".encode("cp1252")
+    cache.store("https://shop.example/fr", {}, {"etag": '"1"', "content-type": "text/html; charset=windows-1252"}, body)
+    entry = cache.get("https://shop.example/fr")
+    assert entry.content == body
+    assert entry.text == "<html>Prix 10 €</html>"
+
+
+class _FakeRequest:
+    resource_type = "document"
+    method = "GET"
+    url = "https://shop.example/fr"
+    headers = {"accept-language": "fr-FR"}
+
+    async def all_headers(self):
+        return {**self.headers, "cookie": "currency=EUR"}
+
+
+class _FakeResponse:
+    def __init__(self, status, headers, body=b""):
+        self.status, self.headers, self._body = status, headers, body
+
+    async def body(self):
+        return self._body
+
+
+class _FakeRoute:
+    def __init__(self, response):
+        self.request = _FakeRequest()
+        self.response = response
+        self.fetched, self.fulfilled = [], []
+
+    async def fetch(self, headers=None, max_redirects=None):
+        self.fetched.append(headers)
+        return self.response
+
+    async def fulfill(self, **kwargs):
+        self.fulfilled.append(kwargs)
+
+    async def fallback(self):
+        raise AssertionError("documents should be fulfilled")
+
+
+def test_conditional_document_route_fulfills_original_bytes(monkeypatch):
+    monkeypatch.setattr(pa, "HTTP_CACHE", pa.HttpResponseCache())
+    body = "<html>10 €</html>".encode("cp1252")
+    content_type = "text/html; charset=windows-1252"
+    route = _FakeRoute(_FakeResponse(200, {"etag": '"1"', "content-type": content_type, "content-length": "17"}, body))
+    asyncio.run(pa.conditional_document_route(route))
+    assert route.fetched == [None]
+    assert route.fulfilled == [{"status": 200, "headers": {"etag": '"1"', "content-type": content_type}, "body": body}]
+
+    route = _FakeRoute(_FakeResponse(304, {}))
+    asyncio.run(pa.conditional_document_route(route))
+    assert route.fetched[0]["If-None-Match"] == '"1"'
+    assert route.fetched[0]["cookie"] == "currency=EUR"  # revalidates the page it keyed on
+    assert route.fulfilled == [{"status": 200, "content_type": content_type, "body": body}]
+    assert pa.HTTP_CACHE.revalidated == 1
+
+
+# ---------------- ParseResultCache ----------------
+
+def test_parse_cache_hits_on_same_body_and_returns_copies(monkeypatch):
+    monkeypatch.setattr(pa, "PARSE_CACHE", pa.ParseResultCache(capacity=8))
+    monkeypatch.setattr(pa, "PARSE_POOL", pa.ParseExecutor("inline"))
+    body = b"<title>Kettle</title><meta property='og:image' content='https://cdn.example/k.jpg'>"
+
+    first = asyncio.run(pa.cached_parse(pa.parse_head, body))
+    first["title"] = "mutated"
+    second = asyncio.run(pa.cached_parse(pa.parse_head, body))
+    assert second["title"] == "Kettle"
+    assert pa.PARSE_POOL.stats()["runs"] == 1
+    assert pa.PARSE_CACHE.stats()["hits"] == 1 and pa.PARSE_CACHE.stats()["misses"] == 1
+
+
+def test_parse_cache_key_covers_body_worker_args_and_version(monkeypatch):
+    key = pa.ParseResultCache.key
+    base = key(pa.parse_product_static, b"<p>x</p>", "https://a.example/1")
+    assert key(pa.parse_product_static, "<p>x</p>", "https://a.example/1") == base
+    assert key(pa.parse_product_static, b"<p>y</p>", "https://a.example/1") != base
+    assert key(pa.parse_product_static, b"<p>x</p>", "https://b.example/1") != base
+    assert key(pa.parse_head, b"<p>x</p>", "https://a.example/1") != base
+    monkeypatch.setattr(pa, "EXTRACTOR_VERSION", "next")
+    assert key(pa.parse_product_static, b"<p>x</p>", "https://a.example/1") != base
@@ -3,13 +3,25 @@
 Fixtures are minimal, sanitized documents containing only the tags the
 parsers read — no network access involved.
 """
+import asyncio
+import time
 from pathlib import Path
 
+import pytest
+from lxml import etree
+
 import product_analyzer as pa
 
 FIXTURES = Path(__file__).parent / "fixtures"
 
 
+@pytest.fixture(autouse=True, params=["lxml", "bs4", "strained"])
+def parser_backend(request, monkeypatch):
+    """Every fixture test runs under each ParsedDocument backend."""
+    monkeypatch.setattr(pa, "PARSER_BACKEND", request.param)
+    return request.param
+
+
 def load(name: str) -> str:
     return (FIXTURES / name).read_text(encoding="utf-8")
 
@@ -68,6 +80,41 @@ def test_parse_aliexpress_runparams():
     assert out["breadcrumbs"] == ["Home", "Accessories", "Cables"]
 
 
+def test_parse_aliexpress_decodes_only_needed_modules(monkeypatch):
+    def full_decode(*args, **kwargs):
+        raise AssertionError("whole runParams blob decoded")
+
+    monkeypatch.setattr(pa, "_extract_json_from_scripts", full_decode)
+    out = pa._parse_aliexpress(load("aliexpress_runparams.html"))
+    assert out["title"] == "USB C Charging Cable 2m"
+    assert out["price_amount"] == 23.99
+
+
+def test_decode_ae_modules_skips_unwanted_subtrees():
+    html = (
+        '<script>window.runParams = {"data": {"tabs": ["priceModule"], '
+        '"descriptionModule": {"html": "%s"}, '
+        '"priceModule": {"formatedPrice": "US $4.50"}}};</script>' % ("x" * 1000)
+    )
+    assert pa._decode_ae_modules(html) == {"priceModule": {"formatedPrice": "US $4.50"}}
+    assert pa._decode_ae_modules("<script>var a = 1;</script>") is None
+
+
+def test_decode_ae_modules_takes_only_top_level_members_of_data():
+    html = (
+        '<script>window.runParams = {"data": {"recommendModule": {"items": [{"priceModule": '
+        '{"formatedPrice": "US $1.00"}, "titleModule": {"subject": "Other"}}]}, '
+        '"priceModule": {"formatedPrice": "US $4.50"}}, "titleModule": {"subject": "Not data"}};</script>'
+    )
+    assert pa._decode_ae_modules(html) == {"priceModule": {"formatedPrice": "US $4.50"}}
+    # Nested-only modules are not modules of this page
+    nested = '<script>window.runParams = {"data": {"recs": {"priceModule": {"formatedPrice": "US $1"}}}};</script>'
+    assert pa._decode_ae_modules(nested) is None
+    # JS-style unquoted keys around strict JSON values
+    js = '<script>window.runParams = {data: {"titleModule": {"subject": "Cup"}}, csrf: "x"};</script>'
+    assert pa._decode_ae_modules(js) == {"titleModule": {"subject": "Cup"}}
+
+
 def test_parse_aliexpress_without_data_returns_defaults():
     out = pa._parse_aliexpress("<html><body><p>no runParams here</p></body></html>")
     assert out["title"] == ""
@@ -75,3 +122,396 @@ def test_parse_aliexpress_without_data_returns_defaults():
     assert out["price_amount"] is None
     assert out["specifications"] == {}
     assert out["breadcrumbs"] == []
+
+
+# ---------------- _extract_json_from_scripts ----------------
+
+def test_extract_json_cuts_exactly_one_object_with_braces_in_strings():
+    html = (
+        '<script>window.runParams = {"data": {"titleModule": {"subject": "Case {v2}; new"}}};'
+        'var other = {"x": 1};</script>'
+    )
+    data = pa._extract_json_from_scripts(html, ["titleModule"])
+    assert data == {"data": {"titleModule": {"subject": "Case {v2}; new"}}}
+
+
+def test_extract_json_repairs_trailing_commas_and_checks_keys_not_values():
+    html = (
+        '<script>window.runParams = {"note": "priceModule"};</script>'
+        '<script>window.__DEFAULT_DATA__ = {"priceModule": {"formatedPrice": "US $1",},};</script>'
+    )
+    data = pa._extract_json_from_scripts(html, ["priceModule"])
+    assert data == {"priceModule": {"formatedPrice": "US $1"}}
+
+
+def test_extract_json_handles_string_encoded_and_data_rendering_forms():
+    encoded = '<script>window.runParams = "{\\"imageModule\\": {\\"imagePathList\\": []}}";</script>'
+    assert pa._extract_json_from_scripts(encoded, ["imageModule"]) == {"imageModule": {"imagePathList": []}}
+    rendered = '<script>init({data: {"specsModule": {}}, rendering: true})</script>'
+    assert pa._extract_json_from_scripts(rendered, ["specsModule"]) == {"specsModule": {}}
+
+
+def test_extract_json_unterminated_blob_is_rejected_quickly():
+    html = "<script>window.runParams = {" + '"a": "{", ' * 50000 + "</script>"
+    assert pa._extract_json_from_scripts(html, ["titleModule"]) is None
+
+
+def test_extract_json_matches_braces_once_for_every_anchor_kind(monkeypatch):
+    scans = []
+    real = pa._brace_ends
+    monkeypatch.setattr(pa, "_brace_ends", lambda *a: scans.append(a[1:]) or real(*a))
+    html = "<script>" + 'window.runParams = {"a": {' * 20000 + "</script>"
+    t0 = time.perf_counter()
+    assert pa._extract_json_from_scripts(html, ["titleModule"]) is None
+    # One scan per script, not one per anchor (~200s when each rescanned)
+    assert len(scans) == 1
+    assert time.perf_counter() - t0 < 2.0
+
+
+def test_extract_json_scans_data_anchors_once_per_script(monkeypatch):
+    scans = []
+    real = pa._brace_ends
+    monkeypatch.setattr(pa, "_brace_ends", lambda *a: scans.append(a[1:]) or real(*a))
+    monkeypatch.setattr(pa, "_balanced_object_end", None)  # no per-anchor scans at all
+    js = "var o = {data: {a: 1, b: function() { if (x) { y(); }" * 2000
+    # No `}, rendering:` ahead: every anchor is dropped unscanned
+    assert pa._extract_json_from_scripts(f"<script>{js}</script>", ["titleModule"]) is None
+    assert scans == []
+    rendered = f'<script>{js}</script><script>x = {{data: {{"titleModule": {{}},}}, rendering: 1}}</script>'
+    assert pa._extract_json_from_scripts(rendered, ["titleModule"]) == {"titleModule": {}}
+    assert len(scans) == 1
+
+
+# ---------------- PriceScanner ----------------
+
+def test_price_scanner_tags_candidates_with_rule_and_offset():
+    html = '<span class="aok-offscreen">$4.99</span><script>{"currentPrice": "12", "Price": 0}</script>'
+    scan = pa.PRICE_SCANNER.scan(html)
+    off = scan.first("amazon_offscreen")
+    assert (off.raw, html[off.offset:off.end]) == ("4.99", 'aok-offscreen">$4.99<')
+    assert scan.first("json_price").raw == "0"
+    assert scan.first("json_current_price").offset == html.index('"currentPrice"')
+
+
+def test_price_tiers_keep_priority_order_and_script_bounds():
+    # Pattern order beats document order; a zero price falls through to the next rule
+    html = '<p>data-price="7"</p><script>var p = {"price": "0", "priceValue": "3"}</script>'
+    assert pa.PriceExtractor.generic_regex(html)["amount"] == 3.0
+    # Inline tier only looks inside <script> bodies
+    assert pa.PriceExtractor.from_inline_json('<p>"price": 9</p><script>x</script>') is None
+    ae = '<script>{"skuVal": {"skuCalPrice": "5.25"}, "price": "US $1"}</script>'
+    assert pa.PriceExtractor.site_specific("www.aliexpress.com", ae)["amount"] == 5.25
+
+
+# ---------------- ParsedDocument (parse once) ----------------
+
+def test_parsed_document_feeds_every_extractor_with_one_parse(monkeypatch, parser_backend):
+    builds = []
+    real_soup, real_root = pa.BeautifulSoup, pa._lxml_root
+
+    def counting_soup(*args, **kwargs):
+        builds.append("soup")
+        return real_soup(*args, **kwargs)
+
+    def counting_root(html):
+        builds.append("lxml")
+        return real_root(html)
+
+    monkeypatch.setattr(pa, "BeautifulSoup", counting_soup)
+    monkeypatch.setattr(pa, "_lxml_root", counting_root)
+    doc = pa.ParsedDocument(load("jsonld_product.html"))
+
+    assert pa.quick_parse_head(doc)["price_amount"] == 49.99
+    assert pa.PriceExtractor.from_jsonld(doc)["currency"] == "EUR"
+    assert pa.PriceExtractor.from_meta(doc) is None
+    assert pa.SCRAPER._parse_jsonld_product(doc)["title"] == "Espresso Machine Deluxe"
+    assert pa.PriceExtractor.from_dom_html(doc) is None
+    # One tree per page; BeautifulSoup only on the bs4 backend
+    assert builds == ["soup" if parser_backend == "bs4" else "lxml"]
+
+
+def test_lxml_backend_answers_head_views_without_soup(parser_backend):
+    doc = pa.ParsedDocument(load("opengraph_product.html"))
+    assert pa.quick_parse_head(doc)["title"] == "Wireless Earbuds"
+    assert ("soup" in vars(doc)) == (parser_backend == "bs4")
+
+
+def test_strained_head_matches_lxml_on_awkward_markup():
+    html = (
+        "<HTML><HEAD><TITLE>Tea &amp; Cups</TITLE>"
+        "<!-- <meta property='og:title' content='commented out'> -->"
+        "<meta content=\"a > b\" property='og:description'>"
+        "<meta name=twitter:image content=tw.jpg>"
+        "<style>.x::after { content: '<meta name=\"bad\" content=\"1\">'; }</style>"
+        "<script type='application/ld+json'>{\"@type\": \"Product\", \"name\": \"<b>Cup</b>\"}</script>"
+        "</HEAD><body><p>text</p><script>var s = '<title>not this</title>';</script></body></HTML>"
+    )
+    for name in ("jsonld_product.html", "opengraph_product.html", "embedded_price.html", "aliexpress_runparams.html"):
+        assert pa._strained_head_nodes(load(name)) == pa._lxml_head_nodes(pa._lxml_root(load(name)))
+    assert pa._strained_head_nodes(html) == pa._lxml_head_nodes(pa._lxml_root(html))
+    assert pa._strained_head_nodes(html).title == "Tea & Cups"
+
+
+def test_strained_head_skips_metas_inside_raw_text_elements():
+    out = pa.quick_parse_head(load("raw_text_metas.html"))
+    assert out["title"] == "Ceramic Teapot 1L"
+    assert out["image"] == "https://cdn.example.org/teapot.jpg"
+    assert out["price_amount"] == 24.0
+
+
+def test_strained_head_is_linear_on_unclosed_tags():
+    out = pa.quick_parse_head(load("unclosed_tags.html"))
+    assert (out["title"], out["price_amount"]) == ("Steel Water Bottle", 15.0)
+    assert out["image"] == "https://cdn.example.org/bottle.jpg"
+    html = load("unclosed_tags.html").replace("<body>", "<body>" + "<meta " * 8000)
+    t0 = time.perf_counter()
+    assert pa.quick_parse_head(html) == out
+    # Each unclosed <meta used to rescan to the end of the page (~25s)
+    assert time.perf_counter() - t0 < 1.0
+
+
+def test_quick_parse_head_is_strained_for_raw_html(monkeypatch):
+    monkeypatch.setattr(pa, "_lxml_head_nodes", None)  # any tree build would fail
+    monkeypatch.setattr(pa, "BeautifulSoup", None)
+    assert pa.quick_parse_head(load("jsonld_product.html"))["price_amount"] == 49.99
+
+
+def test_parsed_document_meta_first_uses_document_order():
+    doc = pa.ParsedDocument(
+        '<meta name="twitter:image" content="tw.jpg"><meta property="og:image" content="og.jpg">'
+    )
+    assert doc.meta_first(("property", "og:image"), ("name", "twitter:image")) == "tw.jpg"
+    assert doc.meta_first(("property", "og:title")) == ""
+
+
+def test_parsed_document_meta_first_matches_the_named_attribute_only():
+    html = (
+        '<head><meta name="og:title" content="by name"><meta name="og:image" content="name.jpg">'
+        '<meta property="twitter:title" content="by property">'
+        '<meta property="og:title" name="twitter:title" content="both"></head>'
+    )
+    doc = pa.ParsedDocument(html)
+    assert doc.meta_first(("property", "og:title")) == "both"
+    assert doc.meta_first(("name", "twitter:title")) == "both"
+    assert doc.meta_first(("property", "og:image")) == ""
+    out = pa.quick_parse_head(html)
+    assert (out["title"], out["image"]) == ("both", "")
+
+
+SELECTOR_PAGE = (
+    "<html><head><title>T</title></head><body>"
+    "<div class='a-price x'><span class='a-offscreen'>$5<!-- c --></span><span class='a-price-whole'>5</span></div>"
+    "<p class='product-price'>7 <b>USD</b><script>var x = 1;</script></p><p class=\"price\" id=main>9</p>"
+    "<video><source src='/v.mp4'></video><iframe src='https://www.youtube.com/embed/x'></iframe>"
+    "<a href='https://vimeo.com/1'>v</a><img data-src='/lazy.jpg'><img src='/a.jpg' alt=''>"
+    "</body></html>"
+)
+
+
+def test_lxml_selectors_match_soupsieve():
+    selectors = list(pa.PriceExtractor.DOM_PRICE_SELECTORS) + [
+        "video source, video", 'iframe[src*="youtube"]', 'a[href*="vimeo.com/"]', "video source[src]",
+        "img", "p#main", "div > span", "body  p", "[data-src^='/lazy']", "img[src$='.jpg']",
+        "[class~=x]", "p:first-child",
+    ]
+
+    def view(el):
+        return el.get_text(" ", strip=True), [el.get(a) for a in ("id", "src", "data-src", "href")], el.has_attr("alt")
+
+    soup_doc = pa.ParsedDocument(SELECTOR_PAGE, backend="bs4")
+    doc = pa.ParsedDocument(SELECTOR_PAGE, backend="lxml")
+    for sel in selectors:
+        assert [view(e) for e in doc.select(sel)] == [view(e) for e in soup_doc.select(sel)], sel
+    assert "soup" in vars(doc)  # only for the pseudo-class
+    first = doc.select_first_each(selectors[:5])
+    assert all(first[sel] is doc.select_one(sel) for sel in first)
+    assert doc.select_one(".missing") is None
+
+
+def test_parse_jsonld_product_reads_video_from_lxml_tree(parser_backend):
+    doc = pa.ParsedDocument(SELECTOR_PAGE)
+    assert pa.SCRAPER._parse_jsonld_product(doc)["video"] == "/v.mp4"
+    assert ("soup" in vars(doc)) == (parser_backend == "bs4")
+
+
+# ---------------- HeadSignalTarget (early-stop tracking) ----------------
+
+def feed_in_chunks(html: str, size: int = 64) -> "pa.HeadSignalTarget":
+    target = pa.HeadSignalTarget()
+    parser = etree.HTMLParser(target=target)
+    for i in range(0, len(html), size):
+        parser.feed(html[i:i + size])
+        if target.done:
+            break
+    return target
+
+
+def test_head_signals_complete_on_jsonld_product():
+    assert feed_in_chunks(load("jsonld_product.html")).done
+
+
+def test_head_signals_stop_after_first_complete_jsonld_product():
+    first = ('<script type="application/ld+json">{"@type": "Product", "name": "Kettle",'
+             ' "image": "https://img.example/k.jpg", "offers": {"price": "34.99"}}</script>')
+    later = '<script type="application/ld+json">{"@type": "Product", "offers": {"price": "12.00"}}</script>'
+    html = f"<html><head>{first}</head><body>" + "<p>filler</p>" * 20000 + later + "</body></html>"
+    target = pa.HeadSignalTarget()
+    parser = etree.HTMLParser(target=target)
+    fed = 0
+    for i in range(0, len(html), 4096):
+        parser.feed(html[i:i + 4096])
+        fed = i + 4096
+        if target.done:
+            break
+    assert target.done and fed <= 8192
+    # First complete Product wins, so the sample and the full page agree
+    assert pa.quick_parse_head(html[:fed]) == pa.quick_parse_head(html)
+    assert pa.quick_parse_head(html)["price_amount"] == 34.99
+
+
+def test_head_signals_wait_for_body_jsonld_when_head_is_incomplete():
+    jsonld = '<script type="application/ld+json">{"@type": "Product", "offers": {"price": "12.00"}}</script>'
+    page = load("opengraph_product.html").replace("</body>", "<p>filler</p>" * 2000 + jsonld + "</body>")
+    target = feed_in_chunks(page, 4096)
+    # Metas alone never stop the download: body JSON-LD still fills the price
+    assert not target.done and target.fields["price_amount"] == 12.0
+    assert pa.quick_parse_head(page)["price_amount"] == 12.0
+
+
+def test_head_signals_not_done_without_image():
+    target = feed_in_chunks(load("embedded_price.html"))
+    assert not target.done
+
+
+def test_select_first_each_matches_select_one_per_selector():
+    doc = pa.ParsedDocument(
+        '<div class="a-price"><span class="a-offscreen">$5</span></div>'
+        '<p class="product-price">7</p><p class="price">9</p>'
+    )
+    selectors = [".a-price .a-offscreen", ".price, .product-price", ".missing", "p:::bad"]
+    found = doc.select_first_each(selectors)
+    assert found[".a-price .a-offscreen"].get_text() == "$5"
+    # Selector lists resolve to the first element in document order
+    assert found[".price, .product-price"] is doc.select_one(".price, .product-price")
+    assert ".missing" not in found and "p:::bad" not in found
+
+
+def test_httpx_page_reuses_tree_until_next_goto(monkeypatch):
+    pages = {
+        "https://www.amazon.com/dp/A": "<title>First</title><p class='price'>$3</p>",
+        "https://www.amazon.com/dp/B": "<title>Second</title>",
+    }
+
+    async def fake_get(url, headers, timeout):
+        return pages[url]
+
+    async def allow(url):
+        return None
+
+    monkeypatch.setattr(pa, "cached_get_text", fake_get)
+    monkeypatch.setattr(pa, "validate_public_url_async", allow)
+
+    async def job(page):
+        await page.goto("https://www.amazon.com/dp/A")
+        first = page.document
+        assert await page.title() == "First"
+        assert await page.eval_on_selector(".price", "") == "$3"
+        assert page.document is first
+        await page.goto("https://www.amazon.com/dp/B")
+        return await page.title(), page.document is first
+
+    assert asyncio.run(pa.SCRAPER._httpx_fallback(job)) == ("Second", False)
+
+
+# ---------------- Parse executor ----------------
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_parse_executor_modes_return_identical_results(mode, parser_backend):
+    if mode == "process" and parser_backend != "lxml":
+        pytest.skip("worker processes read PARSER_BACKEND from the environment")
+    pages = [
+        ("aliexpress_runparams.html", "https://www.aliexpress.com/item/1.html"),
+        ("jsonld_product.html", "https://shop.example.org/p/1"),
+        ("embedded_price.html", "https://shop.example.org/p/2"),
+    ]
+    expected = [pa.parse_product_static(load(n).encode(), u) for n, u in pages]
+    expected.append(pa.parse_head(load("opengraph_product.html").encode()))
+
+    async def run_all(pool):
+        out = [await pool.run(pa.parse_product_static, load(n).encode(), u) for n, u in pages]
+        out.append(await pool.run(pa.parse_head, load("opengraph_product.html").encode()))
+        return out
+
+    pool = pa.ParseExecutor(mode, 2)
+    try:
+        assert asyncio.run(run_all(pool)) == expected
+    finally:
+        pool.shutdown()
+    assert pool.stats()["runs"] == 4
+    assert pool.stats()["inline_runs"] == (4 if mode == "inline" else 0)
+
+
+def test_parse_executor_start_spawns_every_worker_up_front(parser_backend):
+    if parser_backend != "lxml":
+        pytest.skip("pool start-up does not depend on the backend")
+    pool = pa.ParseExecutor("process", 2)
+
+    async def main():
+        await pool.start()
+        return len(pool._pool._processes)
+
+    try:
+        assert asyncio.run(main()) == 2
+    finally:
+        pool.shutdown()
+    assert pool.stats()["runs"] == 0  # priming is not counted as parse work
+
+
+def test_httpx_details_parse_off_loop_without_rebuilding_tree(monkeypatch):
+    html = ("<html><head><title>Bare Kettle</title></head><body><span class='price'>$5</span>"
+            "<img src='/a.jpg'><img data-src='/b.jpg'><video src='/v.mp4'></video></body></html>")
+    seen = {}
+
+    async def fake_get(url, headers, timeout):
+        return html
+
+    async def allow(url):
+        return None
+
+    class Recording(pa.ParseExecutor):
+        async def run(self, fn, *args):
+            seen["body"] = args[0]
+            return await super().run(fn, *args)
+
+    async def fallback(fn):
+        async def job(page):
+            out = await fn(page)
+            seen["doc"] = page.document
+            return out
+        return await pa.SCRAPER._httpx_fallback(job)
+
+    monkeypatch.setattr(pa, "cached_get_text", fake_get)
+    monkeypatch.setattr(pa, "validate_public_url_async", allow)
+    monkeypatch.setattr(pa.SCRAPER, "_with_page", lambda fn, url="": fallback(fn))
+    monkeypatch.setattr(pa, "PARSE_POOL", Recording("thread", 1))
+    monkeypatch.setattr(pa, "PARSE_CACHE", pa.ParseResultCache(8))
+    try:
+        out = asyncio.run(pa.SCRAPER._scrape_product_details("https://shop.example.org/p/off-loop"))
+    finally:
+        pa.PARSE_POOL.shutdown()
+    assert isinstance(seen["body"], str)
+    assert out["title"] == "Bare Kettle" and out["price_amount"] == 5.0
+    assert out["images"] == ["https://shop.example.org/a.jpg", "https://shop.example.org/b.jpg"]
+    assert out["video"] == "/v.mp4"
+    # The worker answered the fallbacks; the loop never built a tree of its own
+    assert "soup" not in vars(seen["doc"]) and "head" not in vars(seen["doc"])
+
+
+def test_parse_product_static_stops_at_first_price_tier():
+    html = (b"<html><head><meta property='product:price:amount' content='12.50'></head>"
+            b"<body><span class='price'>$99</span></body></html>")
+    out = pa.parse_product_static(html, "https://shop.example.org/p/3")
+    assert out["_price_early"]["amount"] == 12.5
+    assert "_price_dom" not in out and "_price_late" not in out
+    out = pa.parse_product_static(b"<body><span class='price'>$99</span></body>", "https://shop.example.org/p/3")
+    assert out["_price_dom"]["source"].startswith("selector_html:")
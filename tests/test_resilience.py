@@ -0,0 +1,395 @@
+"""Request coalescing and other load-shedding helpers."""
+import asyncio
+
+import httpx
+import pytest
+
+import product_analyzer as pa
+
+
+# ---------------- canonical_url ----------------
+
+def test_canonical_url_drops_tracking_params_and_fragment():
+    a = pa.canonical_url("https://AR.AliExpress.com:443/item/1005.html?spm=a2g0o&gatewayAdapt=glo2ara&sku_id=7#reviews")
+    b = pa.canonical_url("https://ar.aliexpress.com/item/1005.html?sku_id=7&utm_source=x")
+    assert a == b == "https://ar.aliexpress.com/item/1005.html?sku_id=7"
+
+
+# ---------------- SingleFlight ----------------
+
+def test_single_flight_shares_one_call():
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "page"
+
+    async def main():
+        sf = pa.SingleFlight()
+        results = await asyncio.gather(*(sf.do("k", work) for _ in range(5)))
+        return sf, results
+
+    sf, results = asyncio.run(main())
+    assert results == ["page"] * 5
+    assert calls == 1
+    assert sf.stats() == {"in_flight": 0, "leaders": 1, "joined": 4}
+
+
+def test_single_flight_survives_one_cancelled_waiter():
+    async def work():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def main():
+        sf = pa.SingleFlight()
+        first = asyncio.create_task(sf.do("k", work))
+        second = asyncio.create_task(sf.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == 42
+
+
+def test_single_flight_propagates_errors_to_all_waiters():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        sf = pa.SingleFlight()
+        return await asyncio.gather(sf.do("k", work), sf.do("k", work), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+# ---------------- LatencyWindow / hedging ----------------
+
+def test_latency_window_percentile_needs_min_samples():
+    w = pa.LatencyWindow(min_samples=3)
+    w.add(0.1)
+    w.add(0.2)
+    assert w.percentile(90) is None
+    w.add(0.3)
+    assert w.percentile(50) == 0.2
+    assert w.percentile(100) == 0.3
+
+
+def _fake_fetch(delays):
+    async def fetch(url, max_bytes=0, on_headers=None):
+        await asyncio.sleep(delays[url])
+        if on_headers:
+            on_headers()
+        return url
+    return fetch
+
+
+def test_hedged_fetch_fires_mirror_and_takes_winner(monkeypatch):
+    primary = "https://www.aliexpress.com/item/1005.html"
+    mirror = "https://www.aliexpress.us/item/1005.html"
+    monkeypatch.setattr(pa, "quick_fetch_html_sample", _fake_fetch({primary: 0.5, mirror: 0.01}))
+    domains = pa.DomainController(min_samples=1)
+    domains.observe("www.aliexpress.com", 0.02, ok=True)
+    monkeypatch.setattr(pa, "QUICK_DOMAINS", domains)
+    monkeypatch.setattr(pa, "HEDGE_STATS", {"requests": 0, "hedged": 0, "hedge_wins": 0})
+
+    assert asyncio.run(pa.hedged_quick_fetch(primary)) == mirror
+    assert pa.hedge_stats()["hedge_rate"] == 1.0
+    assert pa.hedge_stats()["win_rate"] == 1.0
+
+
+def test_hedged_fetch_without_history_sends_single_request(monkeypatch):
+    url = "https://www.amazon.com/dp/B01"
+    monkeypatch.setattr(pa, "quick_fetch_html_sample", _fake_fetch({url: 0.01}))
+    monkeypatch.setattr(pa, "QUICK_DOMAINS", pa.DomainController(min_samples=5))
+    monkeypatch.setattr(pa, "HEDGE_STATS", {"requests": 0, "hedged": 0, "hedge_wins": 0})
+
+    assert asyncio.run(pa.hedged_quick_fetch(url)) == url
+    assert pa.HEDGE_STATS == {"requests": 1, "hedged": 0, "hedge_wins": 0}
+
+
+# ---------------- MirrorRacer ----------------
+
+ITEM = "https://ar.aliexpress.com/item/1005.html?spm=x"
+
+
+def test_mirror_racer_returns_first_accepted_page():
+    racer = pa.MirrorRacer(fanout=2)
+    pages = {
+        "https://ar.aliexpress.com": (0.01, "skeleton"),
+        "https://www.aliexpress.com": (0.03, "FULL PRODUCT"),
+        "https://www.aliexpress.us": (0.5, "FULL PRODUCT slow"),
+    }
+
+    async def attempt(url, headers):
+        delay, body = pages[racer._origin(url)]
+        await asyncio.sleep(delay)
+        return body, delay
+
+    racer._attempt = attempt
+    html = asyncio.run(racer.race(ITEM, {}, lambda h: h.startswith("FULL")))
+    assert html == "FULL PRODUCT"
+    # The skeleton-serving storefront is now cooling down
+    assert racer.health["https://ar.aliexpress.com"].failures == 1
+    assert racer.health["https://www.aliexpress.com"].failures == 0
+
+
+def test_mirror_racer_skips_cooling_mirrors_and_falls_back_to_best():
+    racer = pa.MirrorRacer(fanout=4)
+    racer.record("https://www.aliexpress.us/item/1005.html", ok=False)
+    candidates = racer.candidates(ITEM)
+    assert all("aliexpress.us" not in c for c in candidates)
+    assert candidates[0] == ITEM
+
+    async def attempt(url, headers):
+        return "x" * len(url), 0.0
+
+    racer._attempt = attempt
+    # Nothing accepted: the largest page seen is returned
+    html = asyncio.run(racer.race(ITEM, {}, lambda h: False))
+    assert len(html) == max(len(c) for c in candidates)
+
+
+# ---------------- DomainController ----------------
+
+def test_domain_controller_aimd_limits():
+    ctl = pa.DomainController(initial=2, max_limit=4)
+    for _ in range(20):
+        ctl.observe("www.amazon.com", 0.1, ok=True)
+    assert ctl.state("www.amazon.com").limit == 4
+    ctl.observe("www.amazon.com", 5.0, ok=False)
+    assert ctl.state("www.amazon.com").limit == 2
+    # Other domains are unaffected
+    assert ctl.state("www.aliexpress.com").limit == 2
+
+
+def test_domain_controller_slot_bounds_concurrency_per_host():
+    ctl = pa.DomainController(initial=1, max_limit=1)
+    running = {"now": 0, "peak": 0}
+
+    async def job(host):
+        async with ctl.slot(host):
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+
+    async def main():
+        await asyncio.gather(*(job("www.amazon.com") for _ in range(4)))
+
+    asyncio.run(main())
+    assert running["peak"] == 1
+    assert ctl.state("www.amazon.com").in_use == 0
+
+
+def test_domain_controller_timeout_tracks_p95():
+    ctl = pa.DomainController(min_samples=3, multiplier=2.0)
+    assert ctl.timeout("slow.example", 12.0, 5.0, 30.0) == 12.0
+    for _ in range(5):
+        ctl.observe("slow.example", 10.0, ok=True)
+        ctl.observe("fast.example", 0.5, ok=True)
+    assert ctl.timeout("slow.example", 12.0, 5.0, 30.0) == 20.0
+    assert ctl.timeout("fast.example", 12.0, 5.0, 30.0) == 5.0
+
+
+# ---------------- ConnectionWarmer ----------------
+
+def test_warmer_targets_only_recently_scraped_hosts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pa.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(pa, "WARM_EXTRA_HOSTS", "")
+    warmer = pa.ConnectionWarmer(per_host=2, recent_s=60)
+    assert warmer.targets() == []  # nothing scraped yet: shopify.com & co. are never pinged
+    warmer.note("www.amazon.com")
+    now[0] += 30
+    warmer.note("WWW.AliExpress.us")
+    assert [(h, n) for _, h, n in warmer.targets()] == [
+        ("www.amazon.com", 2), ("www.amazon.com", 1), ("www.aliexpress.us", 2), ("www.aliexpress.us", 1),
+    ]
+    now[0] += 45
+    assert warmer.recent_hosts() == ["www.aliexpress.us"]
+
+
+def test_transports_keep_connection_caps_and_outlive_warming():
+    for transport in (pa._fast_transport, pa._transport, pa._scrape_transport):
+        pool = transport._pool
+        assert pool._max_connections == pa.SCRAPE_MAX_CONNECTIONS
+        assert pool._max_keepalive_connections == pa.SCRAPE_MAX_KEEPALIVE
+        assert pool._keepalive_expiry == pa.SCRAPE_KEEPALIVE_EXPIRY_S > pa.WARM_REFRESH_S
+
+
+def test_warmer_start_warms_storefronts_before_any_scrape(monkeypatch):
+    monkeypatch.setattr(pa, "WARM_STOREFRONT_HOSTS", "www.aliexpress.com, WWW.Amazon.sa,")
+    warmer = pa.ConnectionWarmer(per_host=1)
+    rounds = []
+
+    async def warm():
+        rounds.append([h for _, h, _ in warmer.targets()])
+
+    warmer.warm = warm
+
+    async def main():
+        warmer.start()
+        await asyncio.sleep(0)
+        await warmer.stop()
+
+    asyncio.run(main())
+    assert warmer.recent_hosts() == ["www.aliexpress.com", "www.amazon.sa"]
+    assert {"www.aliexpress.com", "www.amazon.sa"} <= set(rounds[0])
+
+
+def test_warmer_opens_requested_connections_and_counts_failures():
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.host)
+        if request.url.host == "down.example":
+            raise httpx.ConnectError("refused")
+        return httpx.Response(301)
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    warmer = pa.ConnectionWarmer(per_host=2)
+    warmer.targets = lambda: [(http, "www.amazon.com", 2), (http, "down.example", 1)]
+    asyncio.run(warmer.warm())
+    assert sorted(seen) == ["down.example", "www.amazon.com", "www.amazon.com"]
+    assert warmer.stats() == {"enabled": True, "hosts": 0, "rounds": 1, "ok": 2, "failed": 1}
+
+
+# ---------------- CircuitBreakers ----------------
+
+def _fail(breakers, host, exc=None):
+    async def call():
+        async with breakers.guard(host):
+            raise exc or httpx.ConnectError("refused")
+
+    with pytest.raises(Exception):
+        asyncio.run(call())
+
+
+def _succeed(breakers, host):
+    async def call():
+        async with breakers.guard(host):
+            return "ok"
+
+    return asyncio.run(call())
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    breakers = pa.CircuitBreakers(threshold=3, reset_s=30)
+    for _ in range(3):
+        _fail(breakers, "www.aliexpress.com")
+    assert breakers.is_open("www.aliexpress.com")
+    with pytest.raises(pa.CircuitOpenError):
+        _succeed(breakers, "www.aliexpress.com")
+    # Other hosts and non-upstream errors are unaffected
+    assert _succeed(breakers, "www.amazon.com") == "ok"
+    _fail(breakers, "www.amazon.com", ValueError("parse bug"))
+    assert breakers.state("www.amazon.com").failures == 0
+    assert breakers.stats()["www.aliexpress.com"]["state"] == "open"
+
+
+def test_breaker_half_open_probe_closes_or_reopens_with_backoff():
+    breakers = pa.CircuitBreakers(threshold=1, reset_s=30, max_reset_s=300)
+    _fail(breakers, "h.example")
+    st = breakers.state("h.example")
+    st.opened_at -= 31  # reset window elapsed
+    _fail(breakers, "h.example")  # failed probe
+    assert st.state == "open" and st.reset_after == 60
+    st.opened_at -= 61
+    assert _succeed(breakers, "h.example") == "ok"
+    assert st.state == "closed" and st.reset_after == 30 and st.probes == 0
+
+
+def test_quick_fetch_serves_cached_page_while_breaker_open(monkeypatch):
+    url = "https://www.amazon.com/dp/B01"
+    breakers = pa.CircuitBreakers(threshold=1)
+    breakers.record("www.amazon.com", ok=False)
+    monkeypatch.setattr(pa, "BREAKERS", breakers)
+    monkeypatch.setattr(pa, "HTTP_CACHE", pa.HttpResponseCache())
+
+    def handler(request):
+        return httpx.Response(200, headers={"etag": '"v1"'}, text="<html>cached</html>")
+
+    # Seed the cache the way production does: a details-path fetch
+    monkeypatch.setattr(pa, "scrape_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    asyncio.run(pa.cached_get_text(url, pa._page_headers(url), timeout=5.0))
+
+    assert asyncio.run(pa.quick_fetch_html_sample(url)) == "<html>cached</html>"
+    with pytest.raises(pa.CircuitOpenError):
+        asyncio.run(pa.quick_fetch_html_sample("https://www.amazon.com/dp/B02"))
+
+
+def test_image_fetch_failures_use_their_own_breaker(monkeypatch):
+    breakers = pa.CircuitBreakers(threshold=1)
+    status = {"code": 403}
+
+    def handler(request):
+        return httpx.Response(status["code"])
+
+    async def allow(url):
+        return None
+
+    monkeypatch.setattr(pa, "BREAKERS", breakers)
+    monkeypatch.setattr(pa, "validate_public_url_async", allow)
+    monkeypatch.setattr(pa, "client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    url = "https://shop.example.org/img/1.jpg"
+    # A 403 on one image is that object, not the host
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(pa.download_bytes(url))
+    assert not breakers.hosts["image:shop.example.org"].failures
+    status["code"] = 503
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(pa.download_bytes(url))
+    assert breakers.is_open("image:shop.example.org")
+    assert not breakers.is_open("shop.example.org")  # page fetches to the same host still go out
+
+
+def test_product_details_callers_and_cache_get_independent_copies(monkeypatch):
+    cache = pa.LruTtlCache()
+    monkeypatch.setattr(pa, "CACHE", cache)
+
+    async def with_page(fn, url=""):
+        return {"title": "Kettle", "images": ["https://img.example/a.jpg"], "specifications": {"Volume": "1.7L"}}
+
+    monkeypatch.setattr(pa.SCRAPER, "_with_page", with_page)
+    url = "https://www.amazon.com/dp/B0COPY"
+
+    async def scenario():
+        return await asyncio.gather(pa.SCRAPER.get_product_details(url), pa.SCRAPER.get_product_details(url))
+
+    first, second = asyncio.run(scenario())
+    first["images"].append("https://img.example/mutated.jpg")
+    first["specifications"]["Volume"] = "2L"
+    assert second["images"] == ["https://img.example/a.jpg"]
+    cached = cache.get(f"details:{pa.canonical_url(url)}")
+    assert cached["images"] == ["https://img.example/a.jpg"] and cached["specifications"] == {"Volume": "1.7L"}
+
+
+def test_stream_sample_backs_off_domain_on_5xx_and_429(monkeypatch):
+    ctl = pa.DomainController(initial=4, max_limit=8)
+    status = {"code": 503}
+
+    def handler(request):
+        return httpx.Response(status["code"], text="<html></html>")
+
+    async def allow(url):
+        return None
+
+    monkeypatch.setattr(pa, "QUICK_DOMAINS", ctl)
+    monkeypatch.setattr(pa, "validate_public_url_async", allow)
+    monkeypatch.setattr(pa, "fast_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    url = "https://shop.example.org/p/1"
+    # A 404 is an answer about the page, not the host pushing back
+    for code, limit in ((503, 2), (429, 1), (404, 2)):
+        status["code"] = code
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(pa._stream_html_sample(url, 1024))
+        assert ctl.state("shop.example.org").limit == limit
+    status["code"] = 200
+    asyncio.run(pa._stream_html_sample(url, 1024))
+    assert ctl.state("shop.example.org").limit == 2.5
@@ -1,4 +1,6 @@
 """SSRF protections: validate_public_url / is_private_host."""
+import asyncio
+
 import pytest
 from fastapi import HTTPException
 
@@ -60,3 +62,52 @@ def test_unresolvable_host_fails_closed():
     # .invalid never resolves (RFC 2606); resolution failure must be
     # treated as unsafe rather than allowed through.
     assert pa.is_private_host("definitely-not-real.invalid") is True
+
+
+# ---------------- async resolver path ----------------
+
+def test_async_validation_blocks_private_hosts():
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(pa.validate_public_url_async("http://127.0.0.1:8000/admin"))
+    assert exc.value.status_code == 400
+
+
+def test_async_validation_allows_trusted_hosts_without_lookup():
+    resolver = pa.RESOLVER
+    before = resolver.stats()["misses"]
+    asyncio.run(pa.validate_public_url_async("https://www.aliexpress.com/item/1.html"))
+    assert resolver.stats()["misses"] == before
+
+
+def test_resolver_caches_failed_lookups():
+    resolver = pa.AsyncResolver(ttl=60, negative_ttl=60)
+    assert asyncio.run(resolver.resolve("definitely-not-real.invalid")) == ()
+    # Second call is served from the negative cache
+    assert resolver.cached("definitely-not-real.invalid") == ()
+    asyncio.run(resolver.resolve("definitely-not-real.invalid"))
+    assert resolver.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+@pytest.mark.parametrize("url", ["http://foo..bar/x", f"http://{'a' * 70}.com/x"])
+def test_malformed_hostnames_are_rejected_with_400(url):
+    with pytest.raises(HTTPException) as exc:
+        pa.validate_public_url(url)
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(pa.validate_public_url_async(url))
+    assert exc.value.status_code == 400
+
+
+def test_resolver_backend_refuses_private_addresses_on_connect(monkeypatch):
+    import httpcore
+
+    async def resolve(host):
+        return ("10.0.0.5",)
+
+    monkeypatch.setattr(pa.RESOLVER, "resolve", resolve)
+    backend = pa.ResolverBackend()
+    # e.g. a redirect target, or a public host re-resolved after the TTL
+    with pytest.raises(httpcore.ConnectError):
+        asyncio.run(backend.connect_tcp("rebind.example.net", 80))
+    with pytest.raises(httpcore.ConnectError):
+        asyncio.run(backend.connect_tcp("169.254.169.254", 80))